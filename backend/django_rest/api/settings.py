@@ -620,6 +620,19 @@ CELERY_RESULT_BACKEND = os.environ.get(
     'redis://127.0.0.1:6379/0'
 )
 
+# Specify the periodic tasks of Celery beat scheduler.
+# Note: the schedule value is the interval in seconds.
+CELERY_BEAT_SCHEDULE = {
+    # Refresh the price records of product items those their promotion has
+    # been started or ended.
+    'refresh-expired-product-item-prices': {
+        'task': 'core.tasks.refresh_expired_product_item_prices',
+        'schedule': float(
+            os.environ.get('PRODUCT_ITEM_PRICES_REFRESH_INTERVAL', 60)
+        ),
+    },
+}
+
 # Specify caches of your backend.
 # Note: 'CACHE' directory will be created for media files in MEDIA_ROOT.
 CACHES = {
@@ -635,6 +648,35 @@ CACHES = {
     },
 }
 
+# Specify the timeout (in seconds) of cached responses of read-only views,
+# the cached responses are invalidated by the generation counters of models,
+# so the timeout only cleans up the unreachable keys.
+RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('RESPONSE_CACHE_TIMEOUT', 60 * 60 * 24)
+)
+
+# Specify the timeout (in seconds) of cached fragments of product details,
+# the fragments are invalidated by the generation counters of their product
+# and the price records, but the other changes of related products (other
+# products) aren't part of it, so the timeout bounds how long they may be
+# stale (0 disables the cache).
+PRODUCT_DETAILS_CACHE_TIMEOUT = int(
+    os.environ.get('PRODUCT_DETAILS_CACHE_TIMEOUT', 60 * 10)
+)
+
+# Specify the timeout (in seconds) of materialized home payload, the payload
+# is rebuilt by celery worker after the delay (in seconds) when the home
+# content changes. Set HOME_PAYLOAD_FILE to a path (e.g. inside STATIC_ROOT)
+# to also write the payload as static file that nginx can serve, the payload
+# is built per language of LANGUAGES, so the path should have '{language}'
+# placeholder (e.g. 'static/home/{language}.json') in case of more than one
+# language.
+HOME_PAYLOAD_TIMEOUT = int(os.environ.get('HOME_PAYLOAD_TIMEOUT', 60 * 60 * 24))
+HOME_PAYLOAD_REBUILD_DELAY = int(
+    os.environ.get('HOME_PAYLOAD_REBUILD_DELAY', 2)
+)
+HOME_PAYLOAD_FILE = os.environ.get('HOME_PAYLOAD_FILE', None)
+
 # Specify store phone numbers strings in database.
 # Choices: 'E164', 'INTERNATIONAL', 'NATIONAL', 'RFC3966'.
 PHONENUMBER_DB_FORMAT = 'E164'
@@ -774,6 +816,81 @@ ELASTICSEARCH_DSL = {
     }
 }
 
+# Specify the count of product items indexed per bulk request by the search
+# indexer, and the delay (in seconds) of indexer task so the signals of one
+# admin save are indexed together (see core/indexer.py).
+SEARCH_INDEXER_CHUNK_SIZE = int(
+    os.environ.get('SEARCH_INDEXER_CHUNK_SIZE', 500)
+)
+SEARCH_INDEXER_DELAY = int(os.environ.get('SEARCH_INDEXER_DELAY', 2))
+
+# Specify the search backend of search APIViews (see core/search.py):
+# 1- 'core.search.ElasticsearchBackend': search the documents of
+#    elasticsearch.
+# 2- 'core.search.PostgresSearchBackend': search the stored full text search
+#    columns of database, so elasticsearch is not required (the suggestions
+#    and facets of search are available with elasticsearch only).
+SEARCH_BACKEND = os.environ.get(
+    'SEARCH_BACKEND',
+    'core.search.ElasticsearchBackend'
+)
+# Specify the text search configuration of postgres search backend.
+SEARCH_POSTGRES_CONFIG = os.environ.get('SEARCH_POSTGRES_CONFIG', 'english')
+# Specify the minimum trigram similarity of query words (with typos) to the
+# words of product items in the fallback of postgres search backend.
+SEARCH_TRIGRAM_THRESHOLD = float(
+    os.environ.get('SEARCH_TRIGRAM_THRESHOLD', 0.4)
+)
+
+# Specify the timeout (in seconds) of search requests of elasticsearch, and
+# the circuit breaker of elasticsearch: it's opened after the count of
+# failures (within the window in seconds) reached the threshold, and the
+# requests are not allowed until the reset timeout (in seconds) is passed.
+SEARCH_REQUEST_TIMEOUT = float(os.environ.get('SEARCH_REQUEST_TIMEOUT', 2))
+SEARCH_BREAKER_FAILURE_THRESHOLD = int(
+    os.environ.get('SEARCH_BREAKER_FAILURE_THRESHOLD', 5)
+)
+SEARCH_BREAKER_FAILURE_WINDOW = int(
+    os.environ.get('SEARCH_BREAKER_FAILURE_WINDOW', 30)
+)
+SEARCH_BREAKER_RESET_TIMEOUT = int(
+    os.environ.get('SEARCH_BREAKER_RESET_TIMEOUT', 30)
+)
+# Specify the timeout (in seconds) of the last responses of searches, those
+# are served in degraded mode when elasticsearch is not available.
+SEARCH_STALE_RESULTS_TIMEOUT = int(
+    os.environ.get('SEARCH_STALE_RESULTS_TIMEOUT', 60 * 60 * 24)
+)
+# Specify the buckets (in milliseconds) of latency histogram of search
+# metrics.
+SEARCH_LATENCY_BUCKETS = [25, 50, 100, 250, 500, 1000, 2500]
+
+# Specify the engine of products list of category, 'sql' (database) or
+# 'elasticsearch' (listing documents of products, falls back to the database
+# in case elasticsearch is down).
+PRODUCT_LISTING_ENGINE = os.environ.get('PRODUCT_LISTING_ENGINE', 'sql')
+
+# Specify the maximum count of options of each search facet, and the price
+# ranges (from, to) of price facet.
+SEARCH_FACET_SIZE = int(os.environ.get('SEARCH_FACET_SIZE', 50))
+SEARCH_PRICE_RANGES = [
+    (None, 25), (25, 50), (50, 100), (100, 250), (250, 500), (500, None)
+]
+
+# Specify the maximum count of search suggestions of a prefix, and the
+# timeout (in seconds) of cached suggestions of hot prefixes.
+SEARCH_SUGGEST_SIZE = int(os.environ.get('SEARCH_SUGGEST_SIZE', 8))
+SEARCH_SUGGEST_CACHE_TIMEOUT = int(
+    os.environ.get('SEARCH_SUGGEST_CACHE_TIMEOUT', 60 * 5)
+)
+
+# Specify the timeout (in seconds) of cached results of search queries (0 to
+# disable the cache), the results are invalidated by the generation of search
+# index anyway.
+SEARCH_RESULTS_CACHE_TIMEOUT = int(
+    os.environ.get('SEARCH_RESULTS_CACHE_TIMEOUT', 60 * 10)
+)
+
 # Set website brand title
 WEBSITE_BRAND_TITLE = 'Jamie and Cassie'
 
@@ -0,0 +1,103 @@
+""" Tests for cart views"""
+
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from datetime import timedelta
+
+from core.tests.catalog import generate_catalog
+from core import models
+
+
+# Disable the auto sync of elasticsearch documents, since the tests don't
+# connect to elasticsearch server.
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+class CartCheckApiViewTest(TestCase):
+    """Test class for cart check view"""
+
+    def setUp(self):
+        """Create api client, sample catalog and coupon"""
+
+        self.client = APIClient()
+        self.url = reverse('cart:cart-check')
+
+        self.catalog = generate_catalog(products=4, items=2)
+
+        self.coupon = models.Promotion.objects.create(
+            title='Coupon',
+            promotion_type='Coupon',
+            discount_percentage=20,
+            start_date=timezone.now() - timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1)
+        )
+        models.PromotionItem.objects.create(
+            promotion=self.coupon,
+            product_item=self.catalog.product_items[0]
+        )
+
+    def post_cart(self, count):
+        """Post cart with coupon of the first 'count' product items and
+        return the response with count of queries"""
+
+        data = {
+            'coupon': self.coupon.title,
+            'cart': {
+                'items': [
+                    {'sku': item.sku, 'quantity': 1}
+                    for item in self.catalog.product_items[:count]
+                ]
+            }
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(self.url, data, format='json')
+
+        return res, len(queries)
+
+    def test_count_of_queries_not_grow_with_cart_size(self):
+        """Test that cart check runs the same count of queries for any cart
+        size"""
+
+        res, small_cart_queries = self.post_cart(2)
+        self.assertEqual(res.status_code, 200)
+
+        res, big_cart_queries = self.post_cart(8)
+        self.assertEqual(res.status_code, 200)
+
+        self.assertEqual(small_cart_queries, big_cart_queries)
+
+    def test_total_price_without_price_records(self):
+        """Test that the total price is the same if the price records don't
+        exist and the deal prices are read from the annotations"""
+
+        res, _ = self.post_cart(8)
+
+        models.ProductItemPrice.objects.all().delete()
+
+        res_without_records, _ = self.post_cart(8)
+
+        self.assertEqual(res_without_records.data, res.data)
+        self.assertNotEqual(res.data['total_discount_amount'], '0.00')
+
+    def test_first_invalid_sku_is_reported(self):
+        """Test that the first invalid sku of cart is reported"""
+
+        data = {
+            'cart': {
+                'items': [
+                    {'sku': self.catalog.product_items[0].sku},
+                    {'sku': 'INVALID-1'},
+                    {'sku': 'INVALID-2'}
+                ]
+            }
+        }
+
+        res = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data['sku'], 'INVALID-1')
@@ -0,0 +1,190 @@
+"""Define the process-local index of attribute trees of your project"""
+
+from core.models import Attribute
+from core.cache import ProcessSnapshot
+
+
+# Note: the serializers of products need the root (and parent) title of each
+#       attribute, where get_root() (and the parent relation) runs a query
+#       for every single attribute, so each process keeps an index of all the
+#       attributes read with one query, with the root, parent and leaf nodes
+#       of each attribute computed once.
+
+# Important: the index is versioned by the generation counter of Attribute
+#            model in redis (see ProcessSnapshot in core/cache.py), which is
+#            bumped whenever an attribute is saved or deleted (see
+#            core/signals.py).
+
+
+class AttributeNode:
+    """Node of attribute index"""
+
+    __slots__ = ('pk', 'title', 'parent_id', 'parent_title', 'root_id',
+                 'root_title', 'tree_id', 'level', 'display_order',
+                 'input_class', 'ancestor_ids', 'leaf_ids')
+
+    def __init__(self, pk, title, parent_id, tree_id, level, display_order,
+                 input_class):
+        """Initialize the node with the fields of attribute"""
+
+        self.pk = pk
+        self.title = title
+        self.parent_id = parent_id
+        self.tree_id = tree_id
+        self.level = level
+        self.display_order = display_order
+        self.input_class = input_class
+
+        # Set by the index.
+        self.parent_title = None
+        self.root_id = pk
+        self.root_title = title
+        self.ancestor_ids = []
+        self.leaf_ids = []
+
+
+class AttributeIndex:
+    """Index of attributes with the lookups of MPTT tree"""
+
+    def __init__(self, rows):
+        """Build the nodes of given attribute rows (ordered by the tree
+        order)"""
+
+        self.nodes = self.build_nodes(rows)
+        self.missing_ids = set()
+
+    @staticmethod
+    def build_nodes(rows):
+        """Return dictionary of {pk: node} of the given attribute rows"""
+
+        nodes = {}
+
+        for row in rows:
+            node = AttributeNode(**row)
+            nodes[node.pk] = node
+
+        has_children = set()
+
+        # The parent is always before its children in the tree order.
+        for node in nodes.values():
+            parent = nodes.get(node.parent_id, None)
+
+            if parent is not None:
+                has_children.add(parent.pk)
+
+                node.parent_title = parent.title
+                node.root_id = parent.root_id
+                node.root_title = parent.root_title
+                node.ancestor_ids = parent.ancestor_ids + [parent.pk]
+
+        for node in nodes.values():
+            if node.pk not in has_children:
+                for pk in [*node.ancestor_ids, node.pk]:
+                    nodes[pk].leaf_ids.append(node.pk)
+
+        return nodes
+
+    def get_nodes(self, pk):
+        """Return the dictionary of nodes that has the given attribute id
+        (unless it doesn't exist)"""
+
+        nodes = self.nodes
+
+        if pk in nodes or pk in self.missing_ids:
+            return nodes
+
+        # Note: the attribute may be newer than the index (e.g. it's read
+        #       before the generation of attributes is bumped after the
+        #       commit), so a fresh index is built from database and
+        #       replaces the index of process, where its nodes are swapped in
+        #       as a whole (never changed in place). The attributes those
+        #       don't exist in the fresh index aren't looked up again.
+        nodes = attribute_index_snapshot.rebuild().nodes
+        self.nodes = nodes
+
+        if pk not in nodes:
+            self.missing_ids.add(pk)
+
+        return nodes
+
+    def get_node(self, pk):
+        """Return the node of given attribute id"""
+
+        return self.get_nodes(pk)[pk]
+
+    def get_root_title(self, pk):
+        """Return the title of root attribute of the given attribute (as
+        get_root().title)"""
+
+        return self.get_node(pk).root_title
+
+    def get_parent_title(self, pk):
+        """Return the title of parent attribute of the given attribute (as
+        parent.title)"""
+
+        return self.get_node(pk).parent_title
+
+    def get_ancestor(self, pk, level):
+        """Return the node of the given level within the family of the given
+        attribute, the attribute itself if it's of that level or None (as
+        get_family().filter(level=level) for the ancestors)"""
+
+        nodes = self.get_nodes(pk)
+        node = nodes[pk]
+
+        if node.level == level:
+            return node
+
+        if level < node.level:
+            return nodes[node.ancestor_ids[level]]
+
+        return None
+
+    def get_leafnode_ids(self, pk, include_self=False):
+        """Return list of ids of the leaf nodes of the given attribute (as
+        get_leafnodes(), where the attribute itself is included only if it's
+        a leaf node)"""
+
+        node = self.get_node(pk)
+
+        if node.leaf_ids == [node.pk] and not include_self:
+            return []
+
+        return list(node.leaf_ids)
+
+
+def get_attribute_rows():
+    """Return the rows of all attributes ordered by the tree order"""
+
+    return Attribute.objects.order_by('tree_id', 'lft').values(
+        'pk', 'title', 'parent_id', 'tree_id', 'level', 'display_order',
+        'input_class'
+    )
+
+
+def build_attribute_index():
+    """Return new index of attributes read with one query"""
+
+    return AttributeIndex(get_attribute_rows())
+
+
+# Define the index of current process.
+attribute_index_snapshot = ProcessSnapshot(Attribute, build_attribute_index)
+
+
+def get_attribute_index():
+    """Return the index of attributes of current generation"""
+
+    return attribute_index_snapshot.get()
+
+
+def get_context_attribute_index(context):
+    """Return the index of attributes of the given serializer context, so all
+    the instances of a response are serialized with the same index"""
+
+    # Note: the nested and child serializers share the context of root
+    #       serializer.
+    if 'attribute_index' not in context:
+        context['attribute_index'] = get_attribute_index()
+
+    return context['attribute_index']
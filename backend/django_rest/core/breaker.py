@@ -0,0 +1,129 @@
+"""Define the circuit breaker of external services of your project"""
+
+from django.core.cache import cache
+
+import logging
+
+
+# Note: the state of circuit breaker is stored in the default cache (redis),
+#       so it's shared by all the workers (and nodes) of project:
+#       1- closed: the requests are allowed, and the failures are counted
+#          within a window of time.
+#       2- open: the count of failures reached the threshold, so the requests
+#          are not allowed until the reset timeout is passed (the key of open
+#          state expires).
+#       3- half-open: after the reset timeout, only one trial request is
+#          allowed (for each reset timeout), if it succeeds the breaker is
+#          closed, otherwise it's opened again.
+
+# Important: in case the cache is not available, the requests are allowed
+#            and the results of requests are not recorded.
+
+
+class CircuitBreaker:
+    """Circuit breaker with shared state in the cache"""
+
+    def __init__(self, name, failure_threshold, failure_window,
+                 reset_timeout):
+        """Initialize the breaker with its name and thresholds (the window
+        and reset timeout in seconds)"""
+
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.reset_timeout = reset_timeout
+
+        self.failures_key = f'breaker:{name}:failures'
+        self.open_key = f'breaker:{name}:open'
+        self.tripped_key = f'breaker:{name}:tripped'
+        self.trial_key = f'breaker:{name}:trial'
+
+        # Set by allow_request() method, so the success of closed breaker
+        # without failures doesn't write into the cache.
+        self._dirty = True
+
+    def get_state(self):
+        """Return the current state of breaker ('closed', 'open' or
+        'half-open') and the count of failures"""
+
+        values = cache.get_many(
+            [self.open_key, self.tripped_key, self.failures_key]
+        )
+
+        if values.get(self.open_key):
+            state = 'open'
+        elif values.get(self.tripped_key):
+            state = 'half-open'
+        else:
+            state = 'closed'
+
+        return state, int(values.get(self.failures_key) or 0)
+
+    def allow_request(self):
+        """Return True if the request is allowed by the breaker"""
+
+        try:
+            state, failures = self.get_state()
+
+            self._dirty = state != 'closed' or failures > 0
+
+            if state == 'open':
+                return False
+
+            if state == 'half-open':
+                # Only one worker gets the trial request (add() method sets
+                # the key only if it doesn't exist).
+                return cache.add(self.trial_key, 1, timeout=self.reset_timeout)
+
+        except Exception as e:
+            logging.exception(e)
+
+        return True
+
+    def record_success(self):
+        """Close the breaker after successful request"""
+
+        if not self._dirty:
+            return
+
+        try:
+            cache.delete_many(
+                [self.failures_key, self.tripped_key, self.trial_key]
+            )
+            self._dirty = False
+        except Exception as e:
+            logging.exception(e)
+
+    def record_failure(self):
+        """Count the failure of request, and return True if the breaker has
+        been opened (tripped) by this failure"""
+
+        try:
+            # The trial request of half-open breaker has failed.
+            if cache.get(self.tripped_key):
+                self.trip()
+                return True
+
+            # The failures are counted within the window of its first one.
+            cache.add(self.failures_key, 0, timeout=self.failure_window)
+            failures = cache.incr(self.failures_key)
+
+            self._dirty = True
+
+            if failures >= self.failure_threshold:
+                self.trip()
+                return True
+
+        except Exception as e:
+            logging.exception(e)
+
+        return False
+
+    def trip(self):
+        """Open the breaker until the reset timeout is passed"""
+
+        cache.set(self.open_key, 1, timeout=self.reset_timeout)
+        cache.set(self.tripped_key, 1, timeout=None)
+        cache.delete_many([self.failures_key, self.trial_key])
+
+        logging.warning(f'Circuit breaker {self.name} is open')
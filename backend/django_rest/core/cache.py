@@ -0,0 +1,207 @@
+"""Define the versioned cache helpers of your project"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+from rest_framework.response import Response
+
+import hashlib
+import logging
+import threading
+import time
+
+
+# Note: instead of deleting the cached responses when the admin edits a
+#       model instance, each model has a generation counter in redis and the
+#       key of a cached response contains the generations of all the models
+#       that its payload depends on. Bumping the generation of a model makes
+#       every key built with the old value unreachable, and the unreachable
+#       keys expire after RESPONSE_CACHE_TIMEOUT seconds.
+
+# Important: a missing generation counter (e.g. evicted by redis) is
+#            initialized with the current timestamp in milliseconds, not 0,
+#            so it never repeats a generation value that has been used before.
+
+
+def get_model_label(model):
+    """Return the label of model class (or instance) that is used in the
+    generation key"""
+
+    return model._meta.label_lower
+
+
+def get_instance_label(model, pk):
+    """Return the label of single model instance that is used in the
+    generation key, e.g. the cached fragments of product details those are
+    invalidated per product (see product/views.py)"""
+
+    return f'{get_model_label(model)}:{pk}'
+
+
+def get_generation_key(label):
+    """Return the cache key of model generation counter"""
+
+    return f'generation:{label}'
+
+
+def get_generations(labels):
+    """Return dictionary of {label: generation} for the given model labels
+    in one round trip to redis"""
+
+    keys = {get_generation_key(label): label for label in labels}
+
+    generations = cache.get_many(list(keys))
+
+    # Initialize the missing counters.
+    for key in set(keys) - set(generations):
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        generations[key] = cache.get(key)
+
+    return {label: generations[key] for key, label in keys.items()}
+
+
+def bump_generations(labels):
+    """Increment the generation counters of the given model labels"""
+
+    for label in labels:
+        key = get_generation_key(label)
+
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The counter doesn't exist yet.
+            cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+class ProcessSnapshot:
+    """Process-local snapshot of the data built from a model (e.g. a tree),
+    which is rebuilt on the first read after the generation of the model
+    has been bumped"""
+
+    # Important: in case redis is down (or the generation isn't kept, e.g.
+    #            dummy cache), the snapshot is built for every read, so the
+    #            stale data is never served.
+
+    def __init__(self, model, build):
+        """Initialize the snapshot with the model and the function that
+        builds the data from database"""
+
+        self.model = model
+        self.build = build
+        self.generation = None
+        self.value = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return the data of the current generation of model"""
+
+        label = get_model_label(self.model)
+
+        try:
+            generation = get_generations([label])[label]
+        except Exception as e:
+            logging.exception(e)
+            return self.build()
+
+        if generation is None:
+            return self.build()
+
+        if self.generation != generation:
+            # Only one thread of process rebuilds the snapshot.
+            with self.lock:
+                if self.generation != generation:
+                    # Note: the generation is read before the data, so a
+                    #       change while building is rebuilt by the next
+                    #       read.
+                    self.value = self.build()
+                    self.generation = generation
+
+        return self.value
+
+    def rebuild(self):
+        """Build the data from database at once and return it, where it
+        replaces the data of current generation (e.g. a lookup of the data
+        has missed a row created before the generation is bumped)"""
+
+        value = self.build()
+
+        with self.lock:
+            if self.generation is not None:
+                self.value = value
+
+        return value
+
+
+def get_response_cache_key(request, labels):
+    """Return the cache key of the response of given request, built from the
+    request path, normalized query string, language and the generations of
+    the given model labels"""
+
+    # Normalize the query string by sorting its parameters and their values,
+    # so '?b=2&a=1' and '?a=1&b=2' share the same cached response.
+    query_string = '&'.join(
+        f'{key}={value}'
+        for key, values in sorted(request.query_params.lists())
+        for value in sorted(values)
+    )
+
+    generations = get_generations(labels)
+
+    versions = '.'.join(
+        str(generations[label]) for label in sorted(generations)
+    )
+
+    digest = hashlib.md5(
+        f'{request.path}?{query_string}|{get_language()}'.encode()
+    ).hexdigest()
+
+    return f'response:{digest}:{versions}'
+
+
+class CachedResponseMixin:
+    """Mixin of read-only APIViews to cache the GET response data of
+    anonymous users in redis, where the response is invalidated by bumping
+    the generation of one of 'cache_models' (see core/signals.py)"""
+
+    # Define attributes.
+    cache_models = ()
+
+    def get_cache_timeout(self):
+        """Return the timeout of cached responses in seconds"""
+
+        return settings.RESPONSE_CACHE_TIMEOUT
+
+    def get(self, request, *args, **kwargs):
+        """HTTP GET method that read the response data from cache if
+        exists"""
+
+        # Don't cache the responses of authenticated users, since they may
+        # depend on the user.
+        if request.user.is_authenticated or not self.cache_models:
+            return super().get(request, *args, **kwargs)
+
+        try:
+            key = get_response_cache_key(
+                request,
+                [get_model_label(model) for model in self.cache_models]
+            )
+            data = cache.get(key)
+        except Exception as e:
+            # In case redis is down, respond without cache.
+            logging.exception(e)
+            return super().get(request, *args, **kwargs)
+
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+
+        # Cache only the successful responses.
+        if response.status_code == 200:
+            try:
+                cache.set(key, response.data, self.get_cache_timeout())
+            except Exception as e:
+                logging.exception(e)
+
+        return response
@@ -0,0 +1,183 @@
+"""Define the process-local snapshot of category tree of your project"""
+
+from core.models import Category
+from core.cache import ProcessSnapshot
+
+
+# Note: the category tree is small and rarely changes, so instead of walking
+#       the MPTT tree with a database query for each lookup (get_children(),
+#       get_ancestors(), get_leafnodes(), get_family()), each process keeps a
+#       snapshot of all the categories read with one query, where the
+#       children, ancestors and leaf nodes of each category are computed once.
+
+# Important: the snapshot is versioned by the generation counter of Category
+#            model in redis (see ProcessSnapshot in core/cache.py), which is
+#            bumped whenever a category is saved or deleted (see
+#            core/signals.py), so each process rebuilds its snapshot on the
+#            first lookup after the change.
+
+# Info: the snapshot has the inactive categories too (with their is_active
+#       flag), since the products of inactive leaf nodes are still listed
+#       under their active ancestors, so filter the nodes by is_active where
+#       the active categories are needed only.
+
+
+class CategoryNode:
+    """Node of category tree snapshot"""
+
+    __slots__ = ('pk', 'slug', 'title', 'parent_id', 'tree_id', 'lft',
+                 'rght', 'level', 'is_active', 'children', 'ancestors',
+                 'leaf_ids')
+
+    def __init__(self, pk, slug, title, parent_id, tree_id, lft, rght, level,
+                 is_active):
+        """Initialize the node with the fields of category"""
+
+        self.pk = pk
+        self.slug = slug
+        self.title = title
+        self.parent_id = parent_id
+        self.tree_id = tree_id
+        self.lft = lft
+        self.rght = rght
+        self.level = level
+        self.is_active = is_active
+
+        # Set by the tree (in the tree order).
+        self.children = []
+        self.ancestors = []
+        self.leaf_ids = []
+
+    def is_leaf_node(self):
+        """Return True if the node doesn't have children"""
+
+        return not self.children
+
+
+class CategoryTree:
+    """Snapshot of category tree with the lookups of MPTT tree"""
+
+    def __init__(self, rows):
+        """Build the nodes of given category rows (ordered by the tree
+        order)"""
+
+        self.nodes = {}
+        self.slugs = {}
+
+        for row in rows:
+            node = CategoryNode(**row)
+
+            self.nodes[node.pk] = node
+            self.slugs[node.slug] = node.pk
+
+        # The parent is always before its children in the tree order.
+        for node in self.nodes.values():
+            parent = self.nodes.get(node.parent_id, None)
+
+            if parent is not None:
+                parent.children.append(node)
+                node.ancestors = parent.ancestors + [parent]
+
+        for node in self.nodes.values():
+            if node.is_leaf_node():
+                for ancestor in [*node.ancestors, node]:
+                    ancestor.leaf_ids.append(node.pk)
+
+    def get_node(self, pk):
+        """Return the node of given category id or None"""
+
+        return self.nodes.get(pk, None)
+
+    def get_node_by_slug(self, slug):
+        """Return the node of given category slug or None"""
+
+        return self.nodes.get(self.slugs.get(slug, None), None)
+
+    def get_children(self, pk):
+        """Return list of child nodes of the category (as get_children())"""
+
+        return list(self.nodes[pk].children)
+
+    def get_ancestors(self, pk, include_self=False):
+        """Return list of ancestor nodes of the category from its root (as
+        get_ancestors())"""
+
+        node = self.nodes[pk]
+
+        return [*node.ancestors, node] if include_self else \
+            list(node.ancestors)
+
+    def get_root(self, pk):
+        """Return the root node of the category (as get_root())"""
+
+        node = self.nodes[pk]
+
+        return node.ancestors[0] if node.ancestors else node
+
+    def get_descendant_ids(self, pk, include_self=False):
+        """Return list of ids of descendants of the category (as
+        get_descendants())"""
+
+        ids = []
+        nodes = [self.nodes[pk]]
+
+        while nodes:
+            node = nodes.pop()
+            ids.append(node.pk)
+            nodes += reversed(node.children)
+
+        return ids if include_self else ids[1:]
+
+    def get_leafnode_ids(self, pk, include_self=False):
+        """Return list of ids of the leaf nodes of the category (as
+        get_leafnodes(), where the category itself is included only if it's
+        a leaf node)"""
+
+        node = self.nodes[pk]
+
+        if node.is_leaf_node() and not include_self:
+            return []
+
+        return list(node.leaf_ids)
+
+    def get_family_ids(self, pk):
+        """Return list of ids of ancestors, the category and its descendants
+        (as get_family())"""
+
+        return [
+            node.pk for node in self.nodes[pk].ancestors
+        ] + self.get_descendant_ids(pk, include_self=True)
+
+
+def build_category_tree():
+    """Return new snapshot of category tree read with one query"""
+
+    return CategoryTree(
+        Category.objects.order_by('tree_id', 'lft').values(
+            'pk', 'slug', 'title', 'parent_id', 'tree_id', 'lft', 'rght',
+            'level', 'is_active'
+        )
+    )
+
+
+# Define the snapshot of current process.
+category_tree_snapshot = ProcessSnapshot(Category, build_category_tree)
+
+
+def get_category_tree():
+    """Return the snapshot of category tree of current generation"""
+
+    return category_tree_snapshot.get()
+
+
+def get_context_category_tree(context):
+    """Return the snapshot of category tree of the given serializer context,
+    so all the instances of a response are serialized with the same
+    snapshot"""
+
+    # Note: the nested and child serializers share the context of root
+    #       serializer.
+    if 'category_tree' not in context:
+        context['category_tree'] = get_category_tree()
+
+    return context['category_tree']
@@ -0,0 +1,980 @@
+"""Define the checkout validation pipeline of your project"""
+
+from rest_framework import status
+
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
+
+from core.models import (calculate_discount_amount, round_money,
+                         match_with_regex, Country, ProductItem, Promotion,
+                         PromotionItem, ShippingMethod, PaymentMethod)
+from core import exceptions, serializers
+from cart import exceptions as cart_exceptions
+from shipping import exceptions as shipping_exceptions
+from payment import exceptions as payment_exceptions
+
+from decimal import Decimal
+
+import logging
+
+
+# Note: the checkout validation is a pipeline of plain functions, each one
+#       validates a part of checkout data and returns a 'CheckResult' with the
+#       data and status code of its response, so the check APIViews and the
+#       purchase order APIViews are thin wrappers that turn the result into
+#       a response instead of calling each other's post() method.
+
+# Important: the instances those the checks need (product items, coupon,
+#            country, shipping and payment methods) are read through a
+#            'CheckoutInstances' object, which reads each of them once, and
+#            for purchase order the product items of the whole cart are read
+#            with one query.
+
+
+# Get the default value for money decimal digits from 'api' settings.
+MONEY_DECIMAL_DIGITS = settings.MONEY_DECIMAL_PLACES
+
+
+class CheckResult:
+    """Class to hold the result of a checkout validation step"""
+
+    def __init__(self, data, status_code=status.HTTP_200_OK):
+        """Initialize the result data and status code"""
+
+        self.data = data
+        self.status_code = status_code
+
+    def __repr__(self):
+        """String representation of result"""
+
+        return f'<CheckResult {self.status_code}: {self.data}>'
+
+    @property
+    def is_valid(self):
+        """Return True if the validation step went ok"""
+
+        return self.status_code == status.HTTP_200_OK
+
+
+def error_result(exception, **kwargs):
+    """Return invalid result of the given APIException class with extra
+    data"""
+
+    data = {
+        'message': exception.default_detail,
+        'default_code': exception.default_code
+    }
+    data.update(kwargs)
+
+    return CheckResult(data, status_code=exception.status_code)
+
+
+def message_result(message, status_code=status.HTTP_400_BAD_REQUEST):
+    """Return invalid result with message"""
+
+    return CheckResult({'message': message}, status_code=status_code)
+
+
+def format_amount(amount):
+    """Return the amount rounded to money decimal digits and formatted to be
+    two decimals"""
+
+    return "{:.2f}".format(round(amount, MONEY_DECIMAL_DIGITS))
+
+
+class CheckoutInstances:
+    """Class to read the instances of checkout validation once"""
+
+    def __init__(self):
+        """Initialize the read instances, where the missing ones are stored
+        as None"""
+
+        self.product_items = {}
+        self.coupons = {}
+        self.countries = {}
+        self.shipping_methods = {}
+        self.payment_methods = {}
+
+    @classmethod
+    def for_purchase_order(cls, data):
+        """Return instances object of purchase order data, where the product
+        items of cart are read with one query"""
+
+        instances = cls()
+
+        cart = data.get('cart', None) or {}
+        items = cart.get('items', None) or []
+
+        instances.load_product_items(
+            [item.get('sku', None) for item in items]
+        )
+
+        return instances
+
+    def load_product_items(self, skus):
+        """Read the available product items of the given sku list"""
+
+        # Ignore the sku values those already read or not valid.
+        skus = set(
+            sku for sku in skus
+            if isinstance(sku, str) and sku not in self.product_items
+        )
+
+        if not skus:
+            return
+
+        # Make sure that product item is available (in stock) and the
+        # 'is_available' field = true of 'product' and 'supplier' foreign
+        # keys.
+        # Note: the price record and the effective price annotations are
+        #       read with the same query, so deal_price property doesn't
+        #       make extra queries.
+        queryset = ProductItem.objects.filter(
+            sku__in=skus,
+            stock__gt=0,
+            supplier__is_available=True,
+            product__is_available=True
+        ).with_effective_price().select_related(
+            'product_item_price_product_item'
+        )
+
+        self.product_items.update(dict.fromkeys(skus))
+        self.product_items.update(
+            {instance.sku: instance for instance in queryset}
+        )
+
+    def get_product_item(self, sku):
+        """Return the available product item of sku or None"""
+
+        if sku not in self.product_items:
+            self.load_product_items([sku])
+
+        return self.product_items.get(sku, None)
+
+    def get_coupon(self, title):
+        """Return the available coupon promotion of title or None"""
+
+        if title not in self.coupons:
+            self.coupons[title] = Promotion.objects.filter(
+                title=title,
+                promotion_type='Coupon',
+                is_available=True
+            ).first()
+
+        return self.coupons[title]
+
+    def get_country(self, title=None, iso_code=None):
+        """Return the available country of title (or iso code in case no
+        title is provided) or None"""
+
+        # Get the country instance using ignore case for string of provided
+        # country title or iso code.
+        if title:
+            key = ('title', str(title).lower())
+            lookup = {'title__iexact': title}
+        else:
+            key = ('iso_code', str(iso_code).lower())
+            lookup = {'iso_code__iexact': iso_code}
+
+        if key not in self.countries:
+            self.countries[key] = Country.objects.filter(
+                is_available=True,
+                **lookup
+            ).first()
+
+        return self.countries[key]
+
+    def get_shipping_method(self, title):
+        """Return the available shipping method of title or None"""
+
+        if title not in self.shipping_methods:
+            self.shipping_methods[title] = ShippingMethod.objects.filter(
+                title=title,
+                is_available=True
+            ).first()
+
+        return self.shipping_methods[title]
+
+    def get_payment_method(self, title):
+        """Return the available payment method of title or None"""
+
+        if title not in self.payment_methods:
+            self.payment_methods[title] = PaymentMethod.objects.filter(
+                title=title,
+                is_available=True
+            ).first()
+
+        return self.payment_methods[title]
+
+
+#########################################################################
+
+# Multi-use
+
+def check_country(data, instances=None):
+    """Check country title or iso code"""
+
+    # Data dictionary value should be:
+    # {
+    #   "title": <value>
+    #   "iso_code": <value>
+    # }
+
+    instances = instances or CheckoutInstances()
+
+    title = data.get('title', None)
+    iso_code = data.get('iso_code', None)
+
+    # Check if country title is not empty/zero/None
+    if title:
+        country = instances.get_country(title=title)
+
+        if country is None:
+            return error_result(exceptions.InvalidCountryTitle, title=title)
+
+        # check that the retrieved instance iso code is the same as provided
+        # iso code.
+        if iso_code and country.iso_code != iso_code:
+            return error_result(
+                exceptions.InvalidCountryIsoCode,
+                iso_code=iso_code
+            )
+
+    # In case no country title is provided, check if country iso code is not
+    # empty/zero/None
+    elif iso_code:
+        country = instances.get_country(iso_code=iso_code)
+
+        if country is None:
+            return error_result(
+                exceptions.InvalidCountryIsoCode,
+                iso_code=iso_code
+            )
+
+    else:
+        return message_result("No country title or iso-code has provided")
+
+    return CheckResult(
+        {
+            "title": country.title,
+            "iso_code": country.iso_code
+        }
+    )
+
+
+def check_address(data, instances=None):
+    """Check country and address details"""
+
+    # Data dictionary value should be:
+    # {
+    #   "country": { # possible, one of them
+    #       "title": <value>,
+    #       "iso_code": <value>
+    #   },
+    #   "address_details": {
+    #       "address1": <value>,
+    #       "address2": <value>, # Not required
+    #       "region": <value>,
+    #       "city": <value>,
+    #       "postal_code": <value> # Not required
+    #   }
+    # }
+
+    country = data.get('country', None)
+    address_details = data.get('address_details', None)
+
+    try:
+        if not country:
+            return message_result("No country title or iso code has provided")
+
+        # Set only the provided country properties.
+        country_check = check_country(
+            {
+                key: country[key] for key in ('title', 'iso_code')
+                if country.get(key, None)
+            },
+            instances
+        )
+
+        if not country_check.is_valid:
+            return country_check
+
+        if not address_details:
+            return message_result("No address details have provided")
+
+        # Validate address details with serializer class.
+        serializer = serializers.AddressCheckSerializer(data=address_details)
+
+        if not serializer.is_valid():
+            return CheckResult(
+                serializer.errors,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        return CheckResult(
+            {
+                "country": country_check.data,
+                "address_details": serializer.data
+            }
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return message_result(
+            "Error is occurred while trying to check address",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def check_personal_info(data):
+    """Check personal info"""
+
+    # Data dictionary value should be:
+    # {
+    #   "first_name": <value>,
+    #   "last_name": <value>,
+    #   "email": <value>,
+    #   "phone_number": <value>
+    # }
+
+    personal_info = {
+        "first_name": data.get("first_name", None),
+        "last_name": data.get("last_name", None),
+        "email": data.get("email", None),
+        "phone_number": data.get("phone_number", None)
+    }
+
+    # Validate personal info with serializer class.
+    serializer = serializers.ProfileCheckSerializer(data=personal_info)
+
+    if not serializer.is_valid():
+        return CheckResult(
+            serializer.errors,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    return CheckResult({'personal_info': personal_info})
+
+
+#########################################################################
+
+# Cart
+
+def check_cart(data, instances=None):
+    """Check cart items and coupon, and return the total price"""
+
+    # Data dictionary value should be:
+    # {
+    #   "coupon": <value>,
+    #   "cart": {
+    #       "items": [
+    #            {
+    #              "sku": <value>,
+    #              "quantity": <value>
+    #             } ...
+    #        ]
+    #   }
+
+    instances = instances or CheckoutInstances()
+
+    coupon = data.get('coupon', None)
+    cart = data.get('cart', None)
+
+    # In case both of 'coupon' and 'cart' are not provided.
+    if not coupon and not cart:
+        return error_result(cart_exceptions.InvalidCartCheckData)
+
+    # Note: since total_price will deal with Money type, don't initialize
+    #       it as string or integer, will cause to raise the following
+    #       error when trying to do math operations on it:
+    #
+    #       'NotImplementedType' object has no attribute 'decimal_places'
+    total_price = round_money(amount=0)
+    total_discount_amount = 0
+
+    promotion = None
+
+    if coupon:
+        promotion = instances.get_coupon(coupon)
+
+        # Check that the retrieved promotion instance is_active property
+        # return True.
+        if promotion is None or not promotion.is_active:
+            return error_result(
+                cart_exceptions.InvalidCouponCode,
+                coupon=coupon
+            )
+
+    # In case given coupon code is valid and cart is empty.
+    if not cart:
+        return CheckResult(
+            {
+                "coupon_title": promotion.title,
+                "coupon_summary": promotion.summary,
+                "coupon_discount": f'{promotion.discount_percentage}%',
+                'cart': None
+            }
+        )
+
+    items = cart.get('items', None)
+
+    product_items = []
+
+    if items:
+        # Read the product items of all cart items at once.
+        instances.load_product_items([item.get('sku', None) for item in items])
+
+        for item in items:
+
+            # Check if quantity of each item is set otherwise it's 1 by
+            # default.
+            # Note: quantity value is string in json object we convert to
+            #       integer in order to use with math operations.
+            if item.get('quantity', None):
+                quantity = int(item['quantity'])
+            else:
+                quantity = 1
+
+            instance = instances.get_product_item(item['sku'])
+
+            if instance is None:
+                return error_result(
+                    cart_exceptions.InvalidProductItemSku,
+                    sku=item['sku']
+                )
+
+            # Check that the given or default quantity value is not exceed
+            # the limit or current ProductItem stock value.
+            if quantity > instance.limit_per_order or \
+                    quantity > instance.stock:
+                return error_result(
+                    cart_exceptions.InvalidProductItemQuantity,
+                    sku=item['sku'],
+                    quantity=item['quantity']
+                )
+
+            product_items.append(
+                {
+                    'instance': instance,
+                    'quantity': quantity
+                }
+            )
+
+    if promotion:
+        # Prefetch the promotion items of the coupon for all cart items with
+        # one query.
+        prefetch_related_objects(
+            [item['instance'] for item in product_items],
+            Prefetch(
+                'promotion_items_product_item',
+                queryset=PromotionItem.objects.filter(promotion=promotion),
+                to_attr='coupon_promotion_items'
+            )
+        )
+
+        for item in product_items:
+            instance = item['instance']
+
+            # Get the deal_price or list price for ProductItem instance.
+            price = instance.deal_price or instance.list_price
+
+            # Check if current instance is connect to the given promotion.
+            if instance.coupon_promotion_items:
+
+                # Get amount after discount for the price.
+                amount_after_discount = calculate_discount_amount(
+                    amount=price.amount,
+                    discount_percentage=promotion.discount_percentage
+                )
+
+                # Find the discount amount: price amount minus amount after
+                # discount.
+                discount_amount = price.amount - amount_after_discount
+
+                total_discount_amount += round_money(
+                    amount=discount_amount * item['quantity']
+                ).amount
+
+                total_price += round_money(
+                    amount=amount_after_discount * item['quantity']
+                )
+
+            else:
+                total_price += round_money(
+                    amount=price.amount * item['quantity']
+                )
+
+        # Check that the promotion is used with at least one of cart items.
+        if not total_discount_amount:
+            return error_result(
+                cart_exceptions.InvalidCouponForCart,
+                coupon=coupon
+            )
+
+        return CheckResult(
+            {
+                "coupon_title": promotion.title,
+                "coupon_summary": promotion.summary,
+                "coupon_discount": f'{promotion.discount_percentage}%',
+                'price_currency': total_price.currency.code,
+                'price_currency_symbol': settings.CURRENCY_SYMBOLS[
+                    total_price.currency.code
+                ],
+                'total_price_amount': format_amount(total_price.amount),
+                'total_discount_amount': format_amount(total_discount_amount),
+                'items': items
+            }
+        )
+
+    # In case cart has items but no coupon has given, we just find total
+    # price for all items with quantity.
+    for item in product_items:
+        instance = item['instance']
+
+        # Get the deal_price or list price for ProductItem instance.
+        price = instance.deal_price or instance.list_price
+
+        total_price += round_money(amount=price.amount * item['quantity'])
+
+    return CheckResult(
+        {
+            'coupon_title': None,
+            'coupon_summary': None,
+            'price_currency': total_price.currency.code,
+            'price_currency_symbol': settings.CURRENCY_SYMBOLS[
+                total_price.currency.code
+            ],
+            'coupon_discount': "{:.2f}".format(0),
+            'total_price_amount': format_amount(total_price.amount),
+            'total_discount_amount': format_amount(total_discount_amount),
+            'items': items
+        }
+    )
+
+
+#########################################################################
+
+# Shipping
+
+def check_shipping_cost(data, instances=None):
+    """Check shipping method and address, and return the shipping cost"""
+
+    # Data dictionary value should be:
+    # {
+    #   "method": <value>,
+    #   "country": { # possible, one of them
+    #         "iso_code": <value>,
+    #         "title": <value>
+    #    },
+    #   "address_details": {
+    #                 "address1": <value>, # Not required for check
+    #                                      # due we set default value
+    #                 "address2": <value>, # Not required
+    #                 "region": <value>,
+    #                 "city": <value>,
+    #                 "postal_code": <value> # not required
+    #   }
+    #  }
+
+    instances = instances or CheckoutInstances()
+
+    method = data.get('method', None)
+    country = data.get('country', None)
+    address_details = data.get('address_details', None)
+
+    # In case no shipping method has provided.
+    if not method:
+        return message_result("No shipping details have provided")
+
+    if not address_details:
+        return message_result("No address details have provided")
+
+    if not country:
+        return message_result("No country title or iso code has provided")
+
+    address_check = check_address(
+        {
+            "country": {
+                "iso_code": country.get('iso_code', None),
+                "title": country.get('title', None)
+            },
+            "address_details": {
+                "address1": address_details.get('address1', 'default'),
+                "address2": address_details.get('address2', 'default'),
+                "city": address_details.get('city', None),
+                "region": address_details.get('region', None),
+                "postal_code": address_details.get('postal_code', 'default')
+            }
+        },
+        instances
+    )
+
+    if not address_check.is_valid:
+        return address_check
+
+    shipping_method = instances.get_shipping_method(method)
+
+    if shipping_method is None:
+        return error_result(
+            shipping_exceptions.InvalidShippingMethod,
+            shipping_method=method
+        )
+
+    ######################################################################
+    # In this part of the code should make REST api call to shipping method
+    # carrier api with required details and get the cost value in the HTTP
+    # response, But since our project is Demo, we will set default value
+    # for shipping cost.
+    ######################################################################
+
+    cost_price = round_money(amount=0)
+
+    return CheckResult(
+        {
+            'method': shipping_method.title,
+            'shipping': {
+                'country': address_check.data['country'],
+                'address_details': {
+                    'address1': address_details.get('address1', ''),
+                    'address2': address_details.get('address2', ''),
+                    'city': address_check.data['address_details'].get(
+                        'city', ''
+                    ),
+                    'region': address_check.data['address_details'].get(
+                        'region', ''
+                    ),
+                    'postal_code': address_details.get('postal_code', '')
+                },
+            },
+            'price_currency': cost_price.currency.code,
+            'price_currency_symbol':
+                settings.CURRENCY_SYMBOLS[cost_price.currency.code],
+            'shipping_cost_amount': format_amount(cost_price.amount)
+        }
+    )
+
+
+def check_shipping(data, instances=None):
+    """Check personal info and shipping cost"""
+
+    # Data dictionary value should be:
+    #
+    # {
+    #  "method": <value>,
+    #  "personal_info": {
+    #               "first_name": <value>,
+    #               "last_name": <value>,
+    #               "email": <value>,
+    #               "phone_number": <value>
+    #   },
+    #  "country": { # possible, one of them
+    #         "iso_code": <value>,
+    #         "title": <value>
+    #   },
+    #  "address_details": {
+    #                "address1": <value>, # Not required for check
+    #                "address2": <value>, # Not required
+    #                "region": <value>,
+    #                "city": <value>,
+    #                "postal_code": <value> # not required
+    #  }
+    # }
+
+    personal_info = data.get('personal_info', None)
+
+    if not personal_info:
+        return message_result("No personal info have provided")
+
+    personal_info_check = check_personal_info(personal_info)
+
+    if not personal_info_check.is_valid:
+        return personal_info_check
+
+    shipping_cost_check = check_shipping_cost(
+        {
+            "method": data.get('method', None),
+            "country": data.get('country', None),
+            "address_details": data.get('address_details', None)
+        },
+        instances
+    )
+
+    if not shipping_cost_check.is_valid:
+        return shipping_cost_check
+
+    data_to_return = {}
+    data_to_return.update(personal_info_check.data)
+    data_to_return.update(shipping_cost_check.data)
+
+    return CheckResult(data_to_return)
+
+
+#########################################################################
+
+# Payment
+
+def check_card_payment(data):
+    """Check card details"""
+
+    # Data dictionary value should be:
+    # {
+    #   "cardholder_name": <value>,
+    #   "card_number": <value>,
+    #   "card_expiry": <value>,
+    #   "card_ccv": <value>
+    # }
+
+    card_details = {}
+
+    # Check each field in order, with its regex pattern name (the same as
+    # the field name) and its title in messages.
+    for field, title in [
+        ('cardholder_name', 'cardholder name'),
+        ('card_number', 'card number'),
+        ('card_expiry', 'card expiry'),
+        ('card_ccv', 'card ccv')
+    ]:
+        value = data.get(field, None)
+
+        if not value:
+            return message_result(f"{title.capitalize()} is required")
+
+        if not match_with_regex(field, value):
+            return CheckResult(
+                {
+                    "message": f"Invalid {title}",
+                    field: value
+                },
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        card_details[field] = value
+
+    return CheckResult(card_details)
+
+
+def check_billing_address(data, instances=None):
+    """Check personal info and address of billing"""
+
+    # Data dictionary value should be:
+    # {
+    #   "personal_info": {
+    #       "first_name": <value>,
+    #       "last_name": <value>,
+    #       "phone_number": <value>
+    #   },
+    #   "country": { # possible, one of them
+    #       "title": <value>,
+    #       "iso_code": <value>
+    #   },
+    #   "address_details": {...}
+    # }
+
+    personal_info = data.get("personal_info", None)
+
+    if not personal_info:
+        return message_result("No personal info have provided")
+
+    personal_info_check = check_personal_info(
+        {
+            "first_name": personal_info["first_name"],
+            "last_name": personal_info["last_name"],
+            "email": "default@default.com",
+            "phone_number": personal_info["phone_number"]
+        }
+    )
+
+    if not personal_info_check.is_valid:
+        return personal_info_check
+
+    address_check = check_address(
+        {
+            "country": data.get('country', None),
+            "address_details": data.get('address_details', None)
+        },
+        instances
+    )
+
+    if not address_check.is_valid:
+        return address_check
+
+    data_to_return = {}
+    data_to_return.update(personal_info_check.data)
+    data_to_return.update(address_check.data)
+
+    return CheckResult(data_to_return)
+
+
+def check_payment(data, instances=None):
+    """Check payment method and its card details"""
+
+    # Data dictionary value should be:
+    # {
+    #   "method": <value>,
+    #   "card_details": {...}, # required if the method is card
+    #   "use_shipping_address": <value>, # True by default
+    #   "billing": {...} # required if not use shipping address
+    # }
+
+    instances = instances or CheckoutInstances()
+
+    method = data.get('method', None)
+
+    if not method:
+        return message_result("Payment method is required")
+
+    payment_method = instances.get_payment_method(method)
+
+    if payment_method is None:
+        return error_result(
+            payment_exceptions.InvalidPaymentMethod,
+            method=method
+        )
+
+    if payment_method.is_card:
+        card_details = data.get('card_details', None)
+
+        if not card_details:
+            return message_result(
+                "Card details (cardholder_name, card_number, card_expiry and "
+                "card_ccv) is required"
+            )
+
+        card_check = check_card_payment(card_details)
+
+        if not card_check.is_valid:
+            return card_check
+
+        if not data.get('use_shipping_address', True):
+            billing = data.get("billing", None)
+
+            if not billing:
+                return message_result(
+                    "Card billing address details are required"
+                )
+
+            billing_check = check_billing_address(billing, instances)
+
+            if not billing_check.is_valid:
+                return billing_check
+
+    return CheckResult(
+        {
+            "message": "Payment method details is valid",
+            "method": payment_method.title,
+            "is_card": payment_method.is_card
+        }
+    )
+
+
+#########################################################################
+
+# Purchase order
+
+def check_purchase_order(data):
+    """Check cart, shipping and payment of purchase order, and return the
+    grand total"""
+
+    try:
+        instances = CheckoutInstances.for_purchase_order(data)
+
+        cart_check = check_cart(data, instances)
+
+        if not cart_check.is_valid:
+            cart_check.data.update({"api": "cart"})
+            return cart_check
+
+        # Check that the cart has items.
+        if not cart_check.data.get('items', None):
+            cart_check.data.update({
+                "message": "You can't create purchase order with empty cart",
+                "api": "order"
+            })
+            cart_check.status_code = status.HTTP_400_BAD_REQUEST
+            return cart_check
+
+        shipping_check = check_shipping(
+            data.get("shipping", None) or {},
+            instances
+        )
+
+        if not shipping_check.is_valid:
+            shipping_check.data.update({"api": "shipping"})
+            return shipping_check
+
+        subtotal_currency = cart_check.data['price_currency']
+        shipping_price_currency = shipping_check.data['price_currency']
+
+        # Check that the cart subtotal and the shipping cost have the same
+        # currency.
+        if subtotal_currency != shipping_price_currency:
+            return CheckResult(
+                {
+                    "message": "Error is occurred while trying to create the "
+                               "order where shipping cost currency is "
+                               "different from subtotal currency",
+                    "shipping_cost_currency": shipping_price_currency,
+                    "cart_subtotal_currency": subtotal_currency
+                },
+                status_code=status.HTTP_409_CONFLICT
+            )
+
+        grand_total = round_money(
+            amount=Decimal(shipping_check.data['shipping_cost_amount']) +
+            Decimal(cart_check.data['total_price_amount'])
+        )
+
+        # Check the grand total sent by the frontend if provided.
+        fr_grand_total = data.get("grand_total", None)
+        fr_price_currency = data.get("price_currency", None)
+
+        if fr_grand_total and fr_price_currency:
+            if fr_grand_total != grand_total or \
+                    fr_price_currency != grand_total.currency.code:
+                return CheckResult(
+                    {
+                        "message": "The sent frontend grand total is not "
+                                   "equal to value that calculated by the "
+                                   "server",
+                        "sent_price_currency": fr_price_currency,
+                        "sent_grand_total_amount": fr_grand_total,
+                        "price_currency": grand_total.currency.code,
+                        "price_currency_symbol": settings.CURRENCY_SYMBOLS[
+                            grand_total.currency.code
+                        ],
+                        "grand_total_amount": format_amount(
+                            grand_total.amount
+                        ),
+                    },
+                    status_code=status.HTTP_409_CONFLICT
+                )
+
+        payment_check = check_payment(
+            data.get("payment", None) or {},
+            instances
+        )
+
+        if not payment_check.is_valid:
+            payment_check.data.update({"api": "payment"})
+            return payment_check
+
+        return CheckResult(
+            {
+                'price_currency': grand_total.currency.code,
+                'price_currency_symbol': settings.CURRENCY_SYMBOLS[
+                    grand_total.currency.code
+                ],
+                'grand_total_amount': format_amount(grand_total.amount),
+                'cart_details': cart_check.data,
+                'shipping_details': shipping_check.data,
+                'payment_details': payment_check.data,
+                'api': 'order'
+            }
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return message_result(
+            "Error is occurred while trying to create the order",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
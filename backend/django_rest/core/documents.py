@@ -3,7 +3,7 @@
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 
-from core.models import ProductItem
+from core.models import Product, ProductItem
 
 # Info: 'django-elasticsearch-dsl' automatically created the appropriate
 #       database signals so that your Elasticsearch storage gets updated every
@@ -71,6 +71,22 @@ class ProductItemDocument(Document):
     #       immediately following a hyphen does not appear in the results.
     product_item_info = fields.TextField(attr='product_item_info')
 
+    # The product fields are used to collapse the matched items into their
+    # products and to exclude the unavailable products within the search.
+    product_id = fields.IntegerField(attr='product_id')
+    is_available = fields.BooleanField(attr='product.is_available')
+
+    # The keyword fields of faceted search (filters and aggregations), where
+    # 'attributes' has the titles of attributes and their ancestors,
+    # 'attribute_facets' has the root and leaf titles of each attribute (see
+    # format_attribute_facet() function in core/indexer.py) and
+    # 'category_slugs' has the slugs of category and its ancestors.
+    attributes = fields.KeywordField(multi=True)
+    attribute_facets = fields.KeywordField(multi=True)
+    category_slugs = fields.KeywordField(multi=True)
+    category_slug = fields.KeywordField()
+    effective_price = fields.FloatField()
+
     class Index:
         # Name of the Elasticsearch index (use hyphen for multi words).
         name = 'product-items'
@@ -88,7 +104,10 @@ class ProductItemDocument(Document):
 
         # Ignore auto updating of Elasticsearch when a model is saved
         # or deleted:
-        # ignore_signals = True
+        # Note: the documents are updated in bulk by the indexer of changed
+        #       product items (see core/indexer.py), since computing
+        #       'product_item_info' for every single save is expensive.
+        ignore_signals = True
 
         # Configure how the index should be refreshed after an update.
         # See Elasticsearch documentation for supported options:
@@ -101,3 +120,139 @@ class ProductItemDocument(Document):
         # specified size (by default it uses the database driver's default
         # setting)
         # queryset_pagination = 5000
+
+    def get_queryset(self):
+        """Return the queryset of product items to be indexed with their
+        effective price"""
+
+        return super().get_queryset().with_effective_price().select_related(
+            'product__product_group'
+        )
+
+    def prepare(self, instance):
+        """Return the document source of the given product item, which is
+        built the same as the bulk indexer does"""
+
+        # Import inside the method, because the indexer module imports this
+        # module.
+        from core.indexer import get_document_source
+
+        if not hasattr(instance, 'effective_price_amount'):
+            instance = self.get_queryset().get(pk=instance.pk)
+
+        return get_document_source([instance])[instance.pk]
+
+
+@registry.register_document
+class ProductDocument(Document):
+    """Document class of the products listing (products of category) of
+    Product model"""
+
+    # Note: unlike ProductItemDocument, this document is denormalized per
+    #       product to serve the products list of category (filter, sort,
+    #       paginate and count) with one query, where the items of product are
+    #       nested objects so their fields are matched together (e.g. the
+    #       price of the item that has the filtered attributes).
+    category_ids = fields.IntegerField(multi=True)
+    attribute_ids = fields.IntegerField(multi=True)
+    is_available = fields.BooleanField()
+    has_items = fields.BooleanField()
+    created_at = fields.DateField()
+    effective_price = fields.FloatField()
+    has_deal = fields.BooleanField()
+    items = fields.NestedField(properties={
+        'id': fields.IntegerField(),
+        'product_id': fields.IntegerField(),
+        'is_default': fields.BooleanField(),
+        'attribute_ids': fields.IntegerField(multi=True),
+        'effective_price': fields.FloatField(),
+        'has_deal': fields.BooleanField()
+    })
+
+    class Index:
+        name = 'products'
+        settings = {
+            'number_of_shards': 1,
+            'number_of_replicas': 0,
+        }
+
+    class Django:
+        model = Product
+        fields = []
+
+        # The documents are updated in bulk by the indexer with the product
+        # items (see core/indexer.py).
+        ignore_signals = True
+
+    def prepare(self, instance):
+        """Return the document source of the given product, which is built
+        the same as the bulk indexer does"""
+
+        # Import inside the method, because the indexer module imports this
+        # module.
+        from core.indexer import get_product_sources
+
+        return get_product_sources([instance])[instance.pk]
+
+
+@registry.register_document
+class SuggestionDocument(Document):
+    """Document class of the search suggestions (search-as-you-type) of
+    Product model"""
+
+    # Note: the completion field is indexed as in-memory data structure
+    #       (FST) that is built for fast prefix lookups, so suggesting the
+    #       titles of products, categories and attributes while the user is
+    #       typing is much cheaper than the full search query.
+    # Info: each input of completion field has weight, the suggestions are
+    #       ordered by their weight, so the product titles are suggested
+    #       before the category and attribute titles.
+    suggest = fields.CompletionField()
+
+    class Index:
+        name = 'suggestions'
+        settings = {
+            'number_of_shards': 1,
+            'number_of_replicas': 0,
+        }
+
+    class Django:
+        model = Product
+        fields = []
+
+        # The documents are updated in bulk by the indexer with the product
+        # items (see core/indexer.py).
+        ignore_signals = True
+
+    def get_queryset(self):
+        """Return the queryset of available products to be indexed"""
+
+        return super().get_queryset().filter(is_available=True)
+
+    def prepare_suggest(self, instance):
+        """Return the inputs of completion field for the given product"""
+
+        return get_suggestion_inputs(
+            product_title=instance.title,
+            category_title=instance.category.title,
+            attribute_titles=[
+                obj.attribute.title
+                for obj in instance.product_attributes_product.select_related(
+                    'attribute'
+                )
+            ]
+        )
+
+
+def get_suggestion_inputs(product_title, category_title, attribute_titles):
+    """Return the weighted inputs of suggestion completion field"""
+
+    inputs = [
+        {'input': [product_title], 'weight': 3},
+        {'input': [category_title], 'weight': 2}
+    ]
+
+    if attribute_titles:
+        inputs.append({'input': sorted(set(attribute_titles)), 'weight': 1})
+
+    return inputs
@@ -0,0 +1,157 @@
+"""Define the refresh of facet records of categories of your project"""
+
+from django.db import transaction
+
+from core.models import (CategoryAttribute, CategoryFacet, ProductAttribute,
+                         Attribute)
+from core.category_tree import get_category_tree
+from core.attribute_index import get_attribute_index
+from core.cache import get_model_label, bump_generations
+
+import logging
+
+
+# Note: the facet groups of category are the root attributes of the
+#       attributes those connected to the category or one of its ancestors,
+#       and the options of each group are the titles of level 1 attributes
+#       of the connected attributes those have products (the filters of
+#       products list of category, see AttributeListAPIView).
+
+# Note: a change of connected attributes of category affects its descendants
+#       too, and a change of attribute (or its products) affects all the
+#       categories those connected to its tree, so the signals (see
+#       core/signals.py) send the changed ids to celery task, which refreshes
+#       the records of the affected categories only.
+
+
+def get_sort_key(node):
+    """Return the sort key of attribute node by its display order (the nodes
+    without display order are the last as postgres orders them)"""
+
+    return node.display_order is None, node.display_order or 0, node.pk
+
+
+def get_affected_category_ids(category_ids=(), attribute_ids=(),
+                              tree_ids=()):
+    """Return set of ids of the categories those their facets depend on the
+    given categories, attributes and attribute trees"""
+
+    tree_ids = set(tree_ids)
+
+    if attribute_ids:
+        tree_ids.update(
+            Attribute.objects.filter(pk__in=attribute_ids).values_list(
+                'tree_id',
+                flat=True
+            )
+        )
+
+    category_ids = set(category_ids)
+
+    if tree_ids:
+        category_ids.update(
+            CategoryAttribute.objects.filter(
+                attribute__tree_id__in=tree_ids
+            ).values_list('category_id', flat=True)
+        )
+
+    tree = get_category_tree()
+
+    affected = set()
+
+    for pk in category_ids:
+        # The deleted categories don't have records anymore.
+        if tree.get_node(pk) is not None:
+            affected.update(tree.get_descendant_ids(pk, include_self=True))
+
+    return affected
+
+
+def refresh_facets(category_ids=None):
+    """Re-calculate the facet records of the given categories ids (or all
+    the categories in case of None), and return the count of records"""
+
+    tree = get_category_tree()
+    index = get_attribute_index()
+
+    if category_ids is None:
+        category_ids = list(tree.nodes)
+    else:
+        category_ids = [pk for pk in category_ids if tree.get_node(pk)]
+
+    ancestors = {
+        pk: [node.pk for node in tree.get_ancestors(pk, include_self=True)]
+        for pk in category_ids
+    }
+
+    # Get the connected attributes of categories and their ancestors.
+    connected = {}
+
+    for category_id, attribute_id in CategoryAttribute.objects.filter(
+        category__in=set(pk for pks in ancestors.values() for pk in pks)
+    ).values_list('category_id', 'attribute_id'):
+        connected.setdefault(category_id, set()).add(attribute_id)
+
+    # Get the connected attributes those have products.
+    used = set(
+        ProductAttribute.objects.filter(
+            attribute__in=set(
+                pk for pks in connected.values() for pk in pks
+            )
+        ).values_list('attribute_id', flat=True).distinct()
+    )
+
+    records = []
+
+    for category_id in category_ids:
+        groups = {}
+
+        for attribute_id in set().union(
+            *[connected.get(pk, ()) for pk in ancestors[category_id]]
+        ):
+            node = index.nodes.get(attribute_id, None)
+
+            if node is None:
+                continue
+
+            options = groups.setdefault(node.root_id, set())
+
+            # Note: the root attribute itself isn't an option.
+            if node.level > 0 and attribute_id in used:
+                options.add(index.get_ancestor(attribute_id, 1).pk)
+
+        for root_id, option_ids in groups.items():
+            root = index.get_node(root_id)
+
+            records.append(
+                CategoryFacet(
+                    category_id=category_id,
+                    attribute_id=root_id,
+                    title=root.title,
+                    input_class=root.input_class,
+                    display_order=root.display_order,
+                    options=[
+                        node.title for node in sorted(
+                            (index.get_node(pk) for pk in option_ids),
+                            key=get_sort_key
+                        )
+                    ]
+                )
+            )
+
+    # Note: remove the old records and create the new ones inside single
+    #       transaction, as the price records of product items.
+    with transaction.atomic():
+        CategoryFacet.objects.filter(category__in=category_ids).delete()
+        CategoryFacet.objects.bulk_create(records, batch_size=500)
+
+    # The records are created using bulk_create() which doesn't emit the
+    # signals, so invalidate the cached responses here.
+    # Note: don't break the refresh (e.g. the management command) in case
+    #       redis is down, the cached responses expire by their timeout.
+    try:
+        bump_generations([get_model_label(CategoryFacet)])
+    except Exception as e:
+        logging.exception(e)
+
+    return len(records)
@@ -0,0 +1,567 @@
+"""Define the bulk search indexer of product items"""
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db.models import Subquery
+
+from django_redis import get_redis_connection
+from elasticsearch.helpers import bulk
+
+from core.models import (format_product_item_info, Category, Attribute,
+                         Product, ProductItem, ProductAttribute,
+                         ProductItemAttribute)
+from core.documents import (ProductItemDocument, ProductDocument,
+                            SuggestionDocument, get_suggestion_inputs)
+from core.search import (is_elasticsearch_enabled,
+                         bump_search_index_generation)
+
+import logging
+
+
+# Note: ProductItemDocument doesn't follow the model signals (ignore_signals),
+#       instead the signals (see core/signals.py) add the ids of changed
+#       product items into a redis set, and celery task pops them in chunks
+#       and index their documents with the bulk helper of elasticsearch.
+#       The documents are built with a fixed count of queries for each chunk,
+#       instead of running the queries of 'product_item_info' property for
+#       every single product item.
+
+# Note: the suggestion and listing documents of products are indexed with
+#       the product items of the same chunk, and the deleted products
+#       are queued in their own set since their items can't be related to
+#       them anymore.
+
+# Note: the stored search columns of product items (see ProductItem model)
+#       are updated by the indexer too, where elasticsearch documents are
+#       sent only if elasticsearch is enabled (see core/search.py).
+
+# Note: the generation of search index is bumped after each indexing, so
+#       the cached results of search queries are not served anymore.
+
+# Define the redis keys of indexer.
+PENDING_PRODUCT_ITEMS_KEY = 'search:pending-product-items'
+PENDING_PRODUCTS_KEY = 'search:pending-products'
+
+# Define the separator of root title and title in the facet keywords of
+# attributes.
+ATTRIBUTE_FACET_SEPARATOR = ' >> '
+INDEXER_SCHEDULED_KEY = 'search:indexer-scheduled'
+
+
+def get_tree_ancestors(model, ids):
+    """Return dictionary of {pk: list of nodes} of the given MPTT model
+    (Category or Attribute) instances, where the list of nodes (dictionary of
+    pk, title and slug) is ordered from the root node to the instance itself,
+    read with one query"""
+
+    if not ids:
+        return {}
+
+    # Read all the nodes of the related trees, so the ancestors of each
+    # instance are available.
+    nodes = {
+        node['pk']: node for node in model.objects.filter(
+            tree_id__in=Subquery(
+                model.objects.filter(pk__in=ids).values('tree_id')
+            )
+        ).values('pk', 'title', 'slug', 'parent_id')
+    }
+
+    ancestors = {}
+
+    def get_ancestors(pk):
+        if pk not in ancestors:
+            node = nodes[pk]
+
+            if node['parent_id'] is None:
+                ancestors[pk] = [node]
+            else:
+                ancestors[pk] = get_ancestors(node['parent_id']) + [node]
+
+        return ancestors[pk]
+
+    return {pk: get_ancestors(pk) for pk in ids}
+
+
+def get_tree_path(ancestors):
+    """Return the path string of the given list of nodes, which is the same
+    as __str__ method of model"""
+
+    return ' >> '.join(node['title'] for node in ancestors)
+
+
+def get_document_source(product_items):
+    """Return dictionary of {pk: document source} of the given product items
+    (annotated by with_effective_price() queryset method), where the related
+    objects are read with a fixed count of queries"""
+
+    product_ids = set(item.product_id for item in product_items)
+
+    # Get the attributes of products (common) and product items (uncommon)
+    # ordered by the tree order of attributes as the Attribute manager does.
+    product_attributes = ProductAttribute.objects.filter(
+        product__in=product_ids,
+        is_common_attribute=True
+    ).order_by('attribute__tree_id', 'attribute__lft').values_list(
+        'product_id',
+        'attribute_id'
+    )
+
+    item_attributes = ProductItemAttribute.objects.filter(
+        product_item__in=[item.pk for item in product_items]
+    ).order_by(
+        'product_attribute__attribute__tree_id',
+        'product_attribute__attribute__lft'
+    ).values_list(
+        'product_item_id',
+        'product_attribute_id',
+        'product_attribute__attribute_id'
+    ).distinct()
+
+    common_attributes = {}
+    for product_id, attribute_id in product_attributes:
+        common_attributes.setdefault(product_id, []).append(attribute_id)
+
+    # Note: each product attribute is counted once for the product item.
+    uncommon_attributes = {}
+    for product_item_id, _, attribute_id in item_attributes:
+        uncommon_attributes.setdefault(product_item_id, []).append(
+            attribute_id
+        )
+
+    attribute_ancestors = get_tree_ancestors(
+        Attribute,
+        set(pk for ids in common_attributes.values() for pk in ids) |
+        set(pk for ids in uncommon_attributes.values() for pk in ids)
+    )
+    category_ancestors = get_tree_ancestors(
+        Category,
+        set(item.product.category_id for item in product_items)
+    )
+
+    sources = {}
+
+    for item in product_items:
+        product = item.product
+
+        common = [
+            attribute_ancestors[pk]
+            for pk in common_attributes.get(product.pk, [])
+        ]
+        uncommon = [
+            attribute_ancestors[pk]
+            for pk in uncommon_attributes.get(item.pk, [])
+        ]
+        categories = category_ancestors[product.category_id]
+
+        source = {
+            field: getattr(item, field)
+            for field in ProductItemDocument.Django.fields
+        }
+        source['product_id'] = product.pk
+        source['is_available'] = product.is_available
+        source['product_item_info'] = format_product_item_info(
+            sku=item.sku,
+            common_attributes=[get_tree_path(nodes) for nodes in common],
+            item_attributes=[get_tree_path(nodes) for nodes in uncommon],
+            category=get_tree_path(categories),
+            product_group=product.product_group_to_string,
+            product_title=product.title
+        )
+
+        # Set the keyword fields of faceted search (see SearchAPIView).
+        source['attributes'] = sorted(set(
+            node['title'] for nodes in common + uncommon for node in nodes
+        ))
+        source['attribute_facets'] = sorted(set(
+            format_attribute_facet(nodes[0]['title'], nodes[-1]['title'])
+            for nodes in common + uncommon
+        ))
+        source['category_slugs'] = [node['slug'] for node in categories]
+        source['category_slug'] = categories[-1]['slug']
+        source['effective_price'] = float(item.effective_price_amount)
+
+        sources[item.pk] = source
+
+    return sources
+
+
+def format_attribute_facet(root_title, title):
+    """Return the facet keyword of attribute, which is its root title and
+    its title"""
+
+    return f'{root_title}{ATTRIBUTE_FACET_SEPARATOR}{title}'
+
+
+def parse_attribute_facet(value):
+    """Return tuple of (root title, title) of the facet keyword of
+    attribute"""
+
+    return tuple(value.split(ATTRIBUTE_FACET_SEPARATOR, 1))
+
+
+def get_index_actions(product_item_ids):
+    """Return list of bulk actions to index the given product items, the ones
+    those don't exist anymore are deleted from the index"""
+
+    index_name = ProductItemDocument._index._name
+
+    product_items = list(
+        ProductItem.objects.filter(
+            pk__in=product_item_ids
+        ).with_effective_price().select_related('product__product_group')
+    )
+
+    sources = get_document_source(product_items)
+
+    actions = [
+        {
+            '_op_type': 'index',
+            '_index': index_name,
+            '_id': pk,
+            '_source': source
+        } for pk, source in sources.items()
+    ]
+
+    actions += [
+        {
+            '_op_type': 'delete',
+            '_index': index_name,
+            '_id': pk
+        } for pk in set(product_item_ids) - set(sources)
+    ]
+
+    return actions
+
+
+def get_product_sources(products):
+    """Return dictionary of {pk: document source} of the given products for
+    the listing document (see ProductDocument), where the related objects are
+    read with a fixed count of queries"""
+
+    product_ids = [product.pk for product in products]
+
+    product_items = {}
+    for item in ProductItem.objects.filter(
+        product__in=product_ids
+    ).with_effective_price().order_by('pk'):
+        product_items.setdefault(item.product_id, []).append(item)
+
+    item_attributes = {}
+    for product_item_id, attribute_id in ProductItemAttribute.objects.filter(
+        product_item__product__in=product_ids
+    ).values_list('product_item_id', 'product_attribute__attribute_id'):
+        item_attributes.setdefault(product_item_id, set()).add(attribute_id)
+
+    product_attributes = {}
+    for product_id, attribute_id in ProductAttribute.objects.filter(
+        product__in=product_ids
+    ).values_list('product_id', 'attribute_id'):
+        product_attributes.setdefault(product_id, set()).add(attribute_id)
+
+    category_ancestors = get_tree_ancestors(
+        Category,
+        set(product.category_id for product in products)
+    )
+
+    sources = {}
+
+    for product in products:
+        # The default item is the same as item_instance() method of Product
+        # model (the item that has 'is_default=True' or the last by 'pk').
+        default_item_id = next(
+            (
+                item.pk for item in product_items.get(product.pk, [])
+                if item.is_default
+            ),
+            product_items[product.pk][-1].pk
+            if product.pk in product_items else None
+        )
+
+        # Note: only the default item is flagged, so the listing view finds
+        #       the default item of product within the nested items (see
+        #       ProductListAPIView.execute_search()).
+        items = [
+            {
+                'id': item.pk,
+                'product_id': product.pk,
+                'is_default': item.pk == default_item_id,
+                'attribute_ids': sorted(item_attributes.get(item.pk, [])),
+                'effective_price': float(item.effective_price_amount),
+                'has_deal': item.deal_price_amount is not None
+            } for item in product_items.get(product.pk, [])
+        ]
+
+        default_item = next(
+            (item for item in items if item['is_default']),
+            None
+        )
+
+        sources[product.pk] = {
+            'category_ids': [
+                node['pk']
+                for node in category_ancestors[product.category_id]
+            ],
+            'attribute_ids': sorted(product_attributes.get(product.pk, [])),
+            'is_available': product.is_available,
+            'has_items': bool(items),
+            'created_at': product.created_at,
+            'effective_price': (
+                default_item['effective_price'] if default_item else None
+            ),
+            'has_deal': default_item['has_deal'] if default_item else False,
+            'items': items
+        }
+
+    return sources
+
+
+def get_product_actions(product_ids):
+    """Return list of bulk actions to index the listing documents of the
+    given products, the ones those don't exist anymore are deleted from the
+    index"""
+
+    index_name = ProductDocument._index._name
+
+    sources = get_product_sources(
+        list(Product.objects.filter(pk__in=product_ids))
+    )
+
+    actions = [
+        {
+            '_op_type': 'index',
+            '_index': index_name,
+            '_id': pk,
+            '_source': source
+        } for pk, source in sources.items()
+    ]
+
+    actions += [
+        {
+            '_op_type': 'delete',
+            '_index': index_name,
+            '_id': pk
+        } for pk in set(product_ids) - set(sources)
+    ]
+
+    return actions
+
+
+def get_suggestion_actions(product_ids):
+    """Return list of bulk actions to index the suggestions of the given
+    products, the ones those don't exist anymore or not available are
+    deleted from the index"""
+
+    index_name = SuggestionDocument._index._name
+
+    products = list(
+        Product.objects.filter(
+            pk__in=product_ids,
+            is_available=True
+        ).select_related('category')
+    )
+
+    attribute_titles = {}
+    for product_id, title in ProductAttribute.objects.filter(
+        product__in=[product.pk for product in products]
+    ).values_list('product_id', 'attribute__title'):
+        attribute_titles.setdefault(product_id, []).append(title)
+
+    actions = [
+        {
+            '_op_type': 'index',
+            '_index': index_name,
+            '_id': product.pk,
+            '_source': {
+                'suggest': get_suggestion_inputs(
+                    product_title=product.title,
+                    category_title=product.category.title,
+                    attribute_titles=attribute_titles.get(product.pk, [])
+                )
+            }
+        } for product in products
+    ]
+
+    actions += [
+        {
+            '_op_type': 'delete',
+            '_index': index_name,
+            '_id': pk
+        } for pk in set(product_ids) - set(
+            product.pk for product in products
+        )
+    ]
+
+    return actions
+
+
+def save_search_documents(actions):
+    """Update the stored search columns of product items of the given
+    index actions (of product items index), and return the count of updated
+    product items"""
+
+    documents = {
+        action['_id']: action['_source']['product_item_info']
+        for action in actions
+        if action['_op_type'] == 'index' and
+        action['_index'] == ProductItemDocument._index._name
+    }
+
+    if not documents:
+        return 0
+
+    product_items = [
+        ProductItem(pk=pk, search_document=document)
+        for pk, document in documents.items()
+    ]
+
+    ProductItem.objects.bulk_update(product_items, ['search_document'])
+
+    # Build the search vectors from the stored documents within database.
+    return ProductItem.objects.filter(pk__in=documents).update(
+        search_vector=SearchVector(
+            'search_document',
+            config=settings.SEARCH_POSTGRES_CONFIG
+        )
+    )
+
+
+def is_ignored_error(error):
+    """Return True if the bulk error is for deleting a document that doesn't
+    exist"""
+
+    return error.get('delete', {}).get('status', None) == 404
+
+
+def send_actions(actions, chunk_size):
+    """Send the given actions using the bulk helper of elasticsearch, and
+    return the count of succeeded actions"""
+
+    success, errors = bulk(
+        ProductItemDocument._get_connection(),
+        actions,
+        chunk_size=chunk_size,
+        raise_on_error=False
+    )
+
+    for error in errors:
+        if not is_ignored_error(error):
+            logging.error(error)
+
+    return success
+
+
+def index_product_items(product_item_ids, chunk_size=None, product_ids=()):
+    """Index the documents of given product items (and the suggestions of
+    their products) in chunks using the bulk helper of elasticsearch, and
+    return the count of indexed documents, the stored search columns of
+    product items are updated with each chunk"""
+
+    chunk_size = chunk_size or settings.SEARCH_INDEXER_CHUNK_SIZE
+    product_item_ids = list(product_item_ids)
+
+    elasticsearch_enabled = is_elasticsearch_enabled()
+
+    count = 0
+
+    for start in range(0, len(product_item_ids), chunk_size):
+        actions = get_index_actions(
+            product_item_ids[start:start + chunk_size]
+        )
+
+        saved = save_search_documents(actions)
+
+        if not elasticsearch_enabled:
+            count += saved
+            continue
+
+        # Get the products of the indexed product items.
+        chunk_product_ids = set(
+            action['_source']['product_id']
+            for action in actions if action['_op_type'] == 'index'
+        )
+
+        actions += get_suggestion_actions(chunk_product_ids)
+        actions += get_product_actions(chunk_product_ids)
+
+        count += send_actions(actions, chunk_size)
+
+    # Index the documents of the given products (e.g. deleted ones).
+    if product_ids and elasticsearch_enabled:
+        count += send_actions(
+            get_suggestion_actions(list(product_ids)) +
+            get_product_actions(list(product_ids)),
+            chunk_size
+        )
+
+    # Invalidate the cached results of search (see store/views.py).
+    if product_item_ids or product_ids:
+        bump_search_index_generation()
+
+    return count
+
+
+def add_pending_product_items(product_item_ids, product_ids=()):
+    """Add the ids of product items (and products) to the pending sets of
+    indexer, and return True if the indexer task should be scheduled"""
+
+    connection = get_redis_connection('default')
+
+    if product_item_ids:
+        connection.sadd(PENDING_PRODUCT_ITEMS_KEY, *product_item_ids)
+
+    if product_ids:
+        connection.sadd(PENDING_PRODUCTS_KEY, *product_ids)
+
+    # Only one task is scheduled until it starts.
+    return bool(connection.set(INDEXER_SCHEDULED_KEY, 1, nx=True, ex=60))
+
+
+def pop_pending_ids(key, count):
+    """Pop ids of product items (or products) from the given pending set of
+    indexer"""
+
+    connection = get_redis_connection('default')
+
+    return [int(pk) for pk in connection.spop(key, count)]
+
+
+def index_pending_product_items():
+    """Index the pending product items in chunks until the pending set is
+    empty"""
+
+    connection = get_redis_connection('default')
+
+    # Allow the changes made while indexing to schedule another task.
+    connection.delete(INDEXER_SCHEDULED_KEY)
+
+    chunk_size = settings.SEARCH_INDEXER_CHUNK_SIZE
+
+    count = 0
+
+    while True:
+        product_item_ids = pop_pending_ids(
+            PENDING_PRODUCT_ITEMS_KEY,
+            chunk_size
+        )
+        product_ids = pop_pending_ids(PENDING_PRODUCTS_KEY, chunk_size)
+
+        if not product_item_ids and not product_ids:
+            break
+
+        try:
+            count += index_product_items(
+                product_item_ids,
+                chunk_size,
+                product_ids=product_ids
+            )
+        except Exception:
+            # Return the ids into the pending sets, so they will be indexed
+            # with the next task.
+            if product_item_ids:
+                connection.sadd(PENDING_PRODUCT_ITEMS_KEY, *product_item_ids)
+            if product_ids:
+                connection.sadd(PENDING_PRODUCTS_KEY, *product_ids)
+            raise
+
+    return count
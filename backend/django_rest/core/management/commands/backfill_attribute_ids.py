@@ -0,0 +1,68 @@
+"""Configuration of attribute signatures backfill django helper command"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Product, ProductItem
+
+
+# Note: the attribute signatures ('attribute_ids' arrays) of products and
+#       product items are kept current by the signals of ProductAttribute and
+#       ProductItemAttribute (see core/signals.py), and the signatures of
+#       existing catalog are set by the migration (0007_attribute_ids), so
+#       run this command only to repair the signatures:
+#
+#       python manage.py backfill_attribute_ids --chunk-size 1000
+#
+#       Each chunk is updated with one update query, so the rows of whole
+#       table are never locked at once.
+
+
+class Command(BaseCommand):
+    """Django command to backfill the attribute signatures."""
+
+    help = 'Re-calculate the attribute signatures of all products and ' \
+           'product items'
+
+    def add_arguments(self, parser):
+        """Define the arguments of command"""
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Count of rows per update query'
+        )
+
+    def backfill(self, model, chunk_size):
+        """Update the signatures of all the rows of given model chunk by
+        chunk, and return the count of updated rows"""
+
+        pk_list = list(
+            model.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+        count = 0
+
+        for start in range(0, len(pk_list), chunk_size):
+            count += model.objects.filter(
+                pk__in=pk_list[start:start + chunk_size]
+            ).refresh_attribute_ids()
+
+        return count
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        chunk_size = options['chunk_size']
+
+        self.stdout.write('Updating the attribute signatures...')
+
+        products_count = self.backfill(Product, chunk_size)
+        product_items_count = self.backfill(ProductItem, chunk_size)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{products_count} products and {product_items_count} '
+                f'product items have been updated'
+            )
+        )
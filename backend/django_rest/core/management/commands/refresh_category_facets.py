@@ -0,0 +1,32 @@
+"""Configuration of full refresh of category facets django helper command"""
+
+from django.core.management.base import BaseCommand
+
+from core.facets import refresh_facets
+
+
+# Note: the facet records of categories are refreshed by celery task whenever
+#       the connected attributes of categories, the attributes or their
+#       products are changed (see core/signals.py), and the records of
+#       existing catalog are created by migration (0009_fill_category_facets),
+#       so run this command only to repair the records:
+#
+#       python manage.py refresh_category_facets
+
+
+class Command(BaseCommand):
+    """Django command to refresh the facet records of all categories."""
+
+    help = 'Re-calculate the facet records (attribute filters) of all ' \
+           'categories'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        self.stdout.write('Refreshing the facets of categories...')
+
+        count = refresh_facets()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} facet records have been created')
+        )
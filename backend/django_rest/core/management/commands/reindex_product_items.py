@@ -0,0 +1,152 @@
+"""Configuration of full reindex of product items django helper command"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from elasticsearch.helpers import parallel_bulk
+
+from core.documents import (ProductItemDocument, ProductDocument,
+                            SuggestionDocument)
+from core.indexer import (get_index_actions, get_suggestion_actions,
+                          get_product_actions, is_ignored_error,
+                          save_search_documents)
+from core.models import Product, ProductItem
+from core.search import (is_elasticsearch_enabled,
+                         bump_search_index_generation)
+
+import logging
+
+
+# Note: unlike 'search_index --rebuild' command, the documents are built in
+#       chunks with a fixed count of queries for each chunk (see
+#       core/indexer.py) and sent to elasticsearch by parallel threads:
+#
+#       python manage.py reindex_product_items --threads 4 --recreate
+#
+#       The stored search columns of product items are updated with each
+#       chunk, and in case elasticsearch is not enabled (see core/search.py)
+#       only the stored search columns are updated.
+
+
+def generate_actions(chunk_size):
+    """Generate the bulk actions of all product items (and suggestion and
+    listing documents of products) chunk by chunk, so the whole catalog is
+    never loaded into memory at once"""
+
+    product_item_ids = list(
+        ProductItem.objects.order_by('pk').values_list('pk', flat=True)
+    )
+
+    for start in range(0, len(product_item_ids), chunk_size):
+        actions = get_index_actions(
+            product_item_ids[start:start + chunk_size]
+        )
+
+        save_search_documents(actions)
+
+        yield from actions
+
+    product_ids = list(
+        Product.objects.order_by('pk').values_list('pk', flat=True)
+    )
+
+    for start in range(0, len(product_ids), chunk_size):
+        yield from get_suggestion_actions(
+            product_ids[start:start + chunk_size]
+        )
+        yield from get_product_actions(
+            product_ids[start:start + chunk_size]
+        )
+
+
+class Command(BaseCommand):
+    """Django command to reindex all the product items."""
+
+    help = 'Reindex the documents of all product items and suggestions ' \
+           'in bulk'
+
+    def add_arguments(self, parser):
+        """Define the arguments of command"""
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.SEARCH_INDEXER_CHUNK_SIZE,
+            help='Count of documents per bulk request'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Count of parallel threads sending the bulk requests'
+        )
+        parser.add_argument(
+            '--recreate',
+            action='store_true',
+            help='Delete and create the indices (with their mapping) first'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        chunk_size = options['chunk_size']
+
+        if not is_elasticsearch_enabled():
+            self.stdout.write('Updating the search columns of items...')
+
+            count = 0
+
+            product_item_ids = list(
+                ProductItem.objects.order_by('pk').values_list(
+                    'pk',
+                    flat=True
+                )
+            )
+
+            for start in range(0, len(product_item_ids), chunk_size):
+                count += save_search_documents(
+                    get_index_actions(
+                        product_item_ids[start:start + chunk_size]
+                    )
+                )
+
+            bump_search_index_generation()
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{count} product items have been indexed'
+                )
+            )
+            return
+
+        if options['recreate']:
+            self.stdout.write('Recreating the indices of product items...')
+
+            for document in (ProductItemDocument, ProductDocument,
+                             SuggestionDocument):
+                document._index.delete(ignore_unavailable=True)
+                document._index.create()
+
+        count = 0
+        failed = 0
+
+        for success, info in parallel_bulk(
+            ProductItemDocument._get_connection(),
+            generate_actions(chunk_size),
+            thread_count=options['threads'],
+            chunk_size=chunk_size,
+            raise_on_error=False
+        ):
+            if success:
+                count += 1
+            elif not is_ignored_error(info):
+                failed += 1
+                logging.error(info)
+
+        bump_search_index_generation()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{count} documents have been indexed, {failed} failed'
+            )
+        )
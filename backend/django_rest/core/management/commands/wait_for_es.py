@@ -2,6 +2,9 @@
 
 
 from django.core.management.base import BaseCommand
+
+from core.search import is_elasticsearch_enabled
+
 import subprocess
 import time
 import os
@@ -158,6 +161,14 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         """Entrypoint for command."""
 
+        # Don't block the startup in case elasticsearch is not used (e.g.
+        # the postgres search backend).
+        if not is_elasticsearch_enabled():
+            self.stdout.write(
+                'Elasticsearch is not enabled, skip waiting for it...'
+            )
+            return
+
         self.stdout.write(
             'Waiting for elasticsearch cluster to be up and ready...'
         )
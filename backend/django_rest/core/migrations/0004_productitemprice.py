@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import djmoney.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_productitem_use_sku_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductItemPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_price_currency', djmoney.models.fields.CurrencyField(choices=[('USD', 'USD $')], default='USD', editable=False, max_length=3)),
+                ('effective_price', djmoney.models.fields.MoneyField(decimal_places=2, default_currency='USD', max_digits=8)),
+                ('deal_price_currency', djmoney.models.fields.CurrencyField(choices=[('USD', 'USD $')], default='USD', editable=False, max_length=3)),
+                ('deal_price', djmoney.models.fields.MoneyField(blank=True, decimal_places=2, default_currency='USD', max_digits=8, null=True)),
+                ('promotion_title', models.CharField(blank=True, max_length=12)),
+                ('promotion_summary', models.TextField(blank=True, max_length=21)),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('product_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='product_item_price_product_item', to='core.productitem')),
+                ('promotion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_item_prices_promotion', to='core.promotion')),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_productitemprice'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='productitem',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productitem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='productitem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='productitem_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='productitem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='productitem_search_trgm_gin', opclasses=['gin_trgm_ops']),
+        ),
+    ]
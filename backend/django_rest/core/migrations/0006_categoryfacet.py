@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_productitem_search_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=25)),
+                ('input_class', models.CharField(max_length=20)),
+                ('display_order', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('options', models.JSONField(blank=True, default=list)),
+                ('attribute', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_facets_attribute', to='core.attribute')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_facets_category', to='core.category')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='categoryfacet',
+            constraint=models.UniqueConstraint(fields=('category', 'attribute'), name='category_facet_unique_appversion'),
+        ),
+    ]
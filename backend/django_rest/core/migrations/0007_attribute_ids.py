@@ -0,0 +1,70 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:19
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+
+
+def backfill_attribute_ids(apps, schema_editor):
+    """Set the attribute signatures of the existing products and product
+    items, the same as refresh_attribute_ids() of their querysets"""
+
+    # Note: the historical models don't have the custom querysets, so the
+    #       update queries are repeated here (one query per table), and the
+    #       backfill_attribute_ids command is kept to repair the signatures
+    #       chunk by chunk.
+    Product = apps.get_model('core', 'Product')
+    ProductItem = apps.get_model('core', 'ProductItem')
+    ProductAttribute = apps.get_model('core', 'ProductAttribute')
+    ProductItemAttribute = apps.get_model('core', 'ProductItemAttribute')
+
+    Product.objects.update(
+        attribute_ids=ArraySubquery(
+            ProductAttribute.objects.filter(
+                product=models.OuterRef('pk')
+            ).order_by('attribute').values('attribute').distinct()
+        )
+    )
+
+    ProductItem.objects.update(
+        attribute_ids=ArraySubquery(
+            ProductItemAttribute.objects.filter(
+                product_item=models.OuterRef('pk')
+            ).order_by(
+                'product_attribute__attribute'
+            ).values('product_attribute__attribute').distinct()
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_categoryfacet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='attribute_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='productitem',
+            name='attribute_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attribute_ids'], name='product_attribute_ids_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='productitem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attribute_ids'], name='productitem_attribute_ids_gin'),
+        ),
+        migrations.RunPython(
+            backfill_attribute_ids,
+            migrations.RunPython.noop
+        ),
+    ]
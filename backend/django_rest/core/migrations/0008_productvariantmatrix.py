@@ -0,0 +1,22 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_attribute_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductVariantMatrix',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='variant_matrix_product', serialize=False, to='core.product')),
+                ('matrix', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,110 @@
+from django.db import migrations
+
+
+def fill_category_facets(apps, schema_editor):
+    """Create the facet records of the existing categories, so the attribute
+    filters of categories (see AttributeListAPIView) are served right after
+    the deployment"""
+
+    # Note: the records are built as refresh_facets() of core/facets.py does,
+    #       but from the historical models of this migration (without the
+    #       process snapshots of trees and the generations of redis), so the
+    #       migration doesn't depend on the current code of models.
+    Category = apps.get_model('core', 'Category')
+    Attribute = apps.get_model('core', 'Attribute')
+    CategoryAttribute = apps.get_model('core', 'CategoryAttribute')
+    ProductAttribute = apps.get_model('core', 'ProductAttribute')
+    CategoryFacet = apps.get_model('core', 'CategoryFacet')
+
+    category_parents = dict(Category.objects.values_list('pk', 'parent_id'))
+
+    attributes = {
+        row['pk']: row for row in Attribute.objects.values(
+            'pk', 'parent_id', 'level', 'title', 'input_class',
+            'display_order'
+        )
+    }
+
+    def get_ancestor(pk, level):
+        # The attribute of the given level within the family of attribute.
+        row = attributes[pk]
+
+        while row['level'] > level:
+            row = attributes[row['parent_id']]
+
+        return row
+
+    connected = {}
+
+    for category_id, attribute_id in CategoryAttribute.objects.values_list(
+        'category_id', 'attribute_id'
+    ):
+        connected.setdefault(category_id, set()).add(attribute_id)
+
+    used = set(
+        ProductAttribute.objects.values_list(
+            'attribute_id',
+            flat=True
+        ).distinct()
+    )
+
+    records = []
+
+    for category_id in category_parents:
+        # Get the connected attributes of category and its ancestors.
+        attribute_ids = set()
+        pk = category_id
+
+        while pk is not None:
+            attribute_ids.update(connected.get(pk, ()))
+            pk = category_parents[pk]
+
+        groups = {}
+
+        for attribute_id in attribute_ids:
+            options = groups.setdefault(
+                get_ancestor(attribute_id, 0)['pk'],
+                set()
+            )
+
+            # Note: the root attribute itself isn't an option.
+            if attributes[attribute_id]['level'] > 0 and \
+                    attribute_id in used:
+                options.add(get_ancestor(attribute_id, 1)['pk'])
+
+        for root_id, option_ids in groups.items():
+            root = attributes[root_id]
+
+            records.append(
+                CategoryFacet(
+                    category_id=category_id,
+                    attribute_id=root_id,
+                    title=root['title'],
+                    input_class=root['input_class'],
+                    display_order=root['display_order'],
+                    options=[
+                        row['title'] for row in sorted(
+                            (attributes[pk] for pk in option_ids),
+                            key=lambda row: (
+                                row['display_order'] is None,
+                                row['display_order'] or 0,
+                                row['pk']
+                            )
+                        )
+                    ]
+                )
+            )
+
+    CategoryFacet.objects.all().delete()
+    CategoryFacet.objects.bulk_create(records, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_productvariantmatrix'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_category_facets, migrations.RunPython.noop),
+    ]
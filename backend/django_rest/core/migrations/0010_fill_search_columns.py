@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+import re
+
+
+# Set the count of product items those their documents are built at once.
+CHUNK_SIZE = 1000
+
+
+def get_paths(model):
+    """Return dictionary of {pk: path string} of all the nodes of the given
+    MPTT model, which is the same as __str__ method of model"""
+
+    nodes = {
+        node['pk']: node
+        for node in model.objects.values('pk', 'title', 'parent_id')
+    }
+    paths = {}
+
+    def get_path(pk):
+        if pk not in paths:
+            node = nodes[pk]
+
+            if node['parent_id'] is None:
+                paths[pk] = node['title']
+            else:
+                paths[pk] = f"{get_path(node['parent_id'])} >> " \
+                            f"{node['title']}"
+
+        return paths[pk]
+
+    for pk in nodes:
+        get_path(pk)
+
+    return paths
+
+
+def fill_search_columns(apps, schema_editor):
+    """Set the stored search columns of the existing product items, so the
+    postgres search backend (see core/search.py) matches the catalog right
+    after the deployment"""
+
+    # Note: the documents are built as format_product_item_info() and
+    #       get_document_source() of core/indexer.py do, but from the
+    #       historical models of this migration, so the migration doesn't
+    #       depend on the current code of models.
+    ProductItem = apps.get_model('core', 'ProductItem')
+    ProductAttribute = apps.get_model('core', 'ProductAttribute')
+    ProductItemAttribute = apps.get_model('core', 'ProductItemAttribute')
+    Category = apps.get_model('core', 'Category')
+    Attribute = apps.get_model('core', 'Attribute')
+
+    attribute_paths = get_paths(Attribute)
+    category_paths = get_paths(Category)
+
+    product_item_ids = list(
+        ProductItem.objects.order_by('pk').values_list('pk', flat=True)
+    )
+
+    for start in range(0, len(product_item_ids), CHUNK_SIZE):
+        product_items = list(
+            ProductItem.objects.filter(
+                pk__in=product_item_ids[start:start + CHUNK_SIZE]
+            ).select_related('product__product_group')
+        )
+
+        # Get the attributes of products (common) and product items
+        # (uncommon) ordered by the tree order of attributes.
+        common_attributes = {}
+        for product_id, attribute_id in ProductAttribute.objects.filter(
+            product__in=set(item.product_id for item in product_items),
+            is_common_attribute=True
+        ).order_by('attribute__tree_id', 'attribute__lft').values_list(
+            'product_id',
+            'attribute_id'
+        ):
+            common_attributes.setdefault(product_id, []).append(
+                attribute_paths[attribute_id]
+            )
+
+        # Note: each product attribute is counted once for the product item.
+        uncommon_attributes = {}
+        for product_item_id, _, attribute_id in \
+                ProductItemAttribute.objects.filter(
+                    product_item__in=[item.pk for item in product_items]
+                ).order_by(
+                    'product_attribute__attribute__tree_id',
+                    'product_attribute__attribute__lft'
+                ).values_list(
+                    'product_item_id',
+                    'product_attribute_id',
+                    'product_attribute__attribute_id'
+                ).distinct():
+            uncommon_attributes.setdefault(product_item_id, []).append(
+                attribute_paths[attribute_id]
+            )
+
+        for item in product_items:
+            product = item.product
+            product_group = product.product_group.title \
+                if product.product_group else None
+
+            document = f"{item.sku} | " \
+                       f"{', '.join(common_attributes.get(product.pk, []))}, " \
+                       f"{', '.join(uncommon_attributes.get(item.pk, []))} | " \
+                       f"{category_paths[product.category_id]} | " \
+                       f"{product_group} | " \
+                       f"{product.title}"
+
+            item.search_document = re.sub(r"\W+", " ", document.lower())
+
+        ProductItem.objects.bulk_update(
+            product_items,
+            ['search_document'],
+            batch_size=500
+        )
+
+    # Build the search vectors from the stored documents within database.
+    ProductItem.objects.update(
+        search_vector=SearchVector(
+            'search_document',
+            config=settings.SEARCH_POSTGRES_CONFIG
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_fill_category_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_columns, migrations.RunPython.noop),
+    ]
@@ -114,7 +114,9 @@
 # separately to left-hand-side.
 
 from django import forms
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Floor, Mod, Round
+from django.db.models.lookups import Exact
 from django.contrib.auth.models import (AbstractBaseUser, PermissionsMixin,
                                         BaseUserManager)
 from django.utils import timezone
@@ -138,6 +140,9 @@ from imagekit.processors import ResizeToFit, Resize, Thumbnail
 from imagekit.models import ProcessedImageField
 
 from django.contrib.postgres import fields as pg_fields
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchVectorField
 
 # from colorfield.fields import ColorField
 
@@ -630,6 +635,35 @@ def calculate_discount_amount(amount, discount_percentage):
     return amount - amount_after_discount
 
 
+def discount_amount_expression(amount, discount_percentage):
+    """Return database expression of calculate_discount_amount() method"""
+
+    # Info: python round() of Decimal value is using 'round half to even'
+    #       (banker's rounding), e.g. round(2.5) = 2 and round(3.5) = 4, but
+    #       ROUND() of Postgres is using 'round half away from zero', so we
+    #       build the same behavior of python round() in order for database
+    #       prices to be identical to the ones of deal_price property.
+    value = models.ExpressionWrapper(
+        amount * discount_percentage / 100,
+        output_field=models.DecimalField()
+    )
+
+    rounded_value = models.Case(
+        models.When(
+            Exact(value - Floor(value), Decimal('0.5')),
+            then=models.Case(
+                models.When(Exact(Mod(Floor(value), 2), 0), then=Floor(value)),
+                default=Round(value)
+            )
+        ),
+        default=Round(value),
+        output_field=models.DecimalField()
+    )
+
+    # Return the expression of amount.
+    return amount - rounded_value
+
+
 def round_money(amount, currency=settings.MONEY_DEFAULT_CURRENCY,
                 round_decimal=settings.MONEY_DECIMAL_PLACES):
     """Method to return Money amount"""
@@ -638,6 +672,32 @@ def round_money(amount, currency=settings.MONEY_DEFAULT_CURRENCY,
         return Money(round(amount, round_decimal), currency)
 
 
+def format_product_item_info(sku, common_attributes, item_attributes,
+                             category, product_group, product_title):
+    """Return lower case and normalized string of product item info, where
+    the attributes are lists of their string representation"""
+
+    # Convert attributes into string.
+    common_attr_str = ", ".join(common_attributes)
+    item_attr_str = ", ".join(item_attributes)
+
+    # String required:
+    # SKU | Common att, Item att | Category | Product group | Product title
+
+    val = f"{sku} | " \
+          f"{common_attr_str}, {item_attr_str} | " \
+          f"{category} | " \
+          f"{product_group} | " \
+          f"{product_title}"
+
+    # Normalize the val string by removing every special character with
+    # space.
+    # Note: you can use r"\W+" regex for every special character.
+    normalized_query = re.sub(r"\W+", " ", str(val).lower())
+
+    return normalized_query
+
+
 def create_file_path(instance, filename):
     """Generate file path for a given instance"""
 
@@ -2431,6 +2491,182 @@ class ProductGroup(TimeStampedModel):
         return self.title
 
 
+class ProductItemQuerySet(models.QuerySet):
+    """Custom queryset for ProductItem model"""
+
+    def with_effective_price(self):
+        """Annotate the queryset with deal price and effective price amounts
+        (the deal price if the item has active deal promotion, otherwise the
+        list price) as the same of deal_price property"""
+
+        # Note: this method does the same as deal_price property but inside
+        #       the database, so we can filter and order the queryset by price
+        #       without loop over its instances.
+
+        now = timezone.now()
+
+        # Get the latest promotion item (by 'pk') of type 'Deal' for each
+        # product item.
+        # Important: in case the latest deal promotion is not active, the
+        #            product item don't have deal price even if it has older
+        #            active deal promotion.
+        latest_deal_promotion = PromotionItem.objects.filter(
+            product_item=models.OuterRef('pk'),
+            promotion__promotion_type='Deal',
+            promotion__is_available=True
+        ).order_by('-pk').values('promotion')[:1]
+
+        # Count of purchase orders that used certain promotion.
+        purchase_orders_count = PurchaseOrder.objects.filter(
+            promotion=models.OuterRef('pk')
+        ).order_by().values('promotion').annotate(
+            count=models.Count('pk')
+        ).values('count')
+
+        # Get the latest deal promotion only if it is active (same as
+        # is_active property of Promotion model).
+        active_deal_promotion = Promotion.objects.annotate(
+            purchase_orders_count=Coalesce(
+                models.Subquery(purchase_orders_count),
+                0
+            )
+        ).filter(
+            models.Q(unlimited_use=True) |
+            models.Q(purchase_orders_count__lt=models.F('max_use_times')),
+            pk=models.OuterRef('latest_deal_promotion_id'),
+            start_date__lte=now,
+            end_date__gte=now
+        )
+
+        return self.annotate(
+            latest_deal_promotion_id=models.Subquery(latest_deal_promotion),
+            deal_promotion_id=models.Subquery(
+                active_deal_promotion.values('pk')[:1]
+            ),
+            deal_discount_percentage=models.Subquery(
+                active_deal_promotion.values('discount_percentage')[:1]
+            ),
+            deal_price_amount=models.Case(
+                models.When(
+                    deal_discount_percentage__isnull=False,
+                    then=discount_amount_expression(
+                        amount=models.F('list_price'),
+                        discount_percentage=models.F(
+                            'deal_discount_percentage'
+                        )
+                    )
+                ),
+                default=None,
+                output_field=models.DecimalField(
+                    max_digits=8,
+                    decimal_places=settings.MONEY_DECIMAL_PLACES
+                )
+            ),
+            effective_price_amount=Coalesce(
+                models.F('deal_price_amount'),
+                models.F('list_price'),
+                output_field=models.DecimalField(
+                    max_digits=8,
+                    decimal_places=settings.MONEY_DECIMAL_PLACES
+                )
+            )
+        )
+
+    def refresh_attribute_ids(self):
+        """Re-calculate the attribute signature (sorted array of 'pk' of the
+        attributes of product item) of the queryset items with one update
+        query, and return the count of updated items"""
+
+        return self.update(
+            attribute_ids=ArraySubquery(
+                ProductItemAttribute.objects.filter(
+                    product_item=models.OuterRef('pk')
+                ).order_by(
+                    'product_attribute__attribute'
+                ).values('product_attribute__attribute').distinct()
+            )
+        )
+
+    def with_matched_attributes_count(self, attribute_ids):
+        """Annotate the queryset with the count of the given attribute ids
+        those are in the attribute signature of item (the cardinality of
+        intersection of both arrays)"""
+
+        # Note: the intersection operator (&) of arrays needs the 'intarray'
+        #       extension, so the elements of signature are counted by a
+        #       subquery of its rows instead.
+        return self.annotate(
+            matched_attributes_count=models.expressions.RawSQL(
+                f'SELECT count(*) FROM unnest('
+                f'"{self.model._meta.db_table}"."attribute_ids") AS '
+                f'attribute_id WHERE attribute_id = ANY(%s)',
+                (sorted(attribute_ids),),
+                output_field=models.IntegerField()
+            )
+        )
+
+
+class ProductQuerySet(models.QuerySet):
+    """Custom queryset for Product model"""
+
+    def refresh_attribute_ids(self):
+        """Re-calculate the attribute signature (sorted array of 'pk' of the
+        attributes of product, common and product items ones) of the
+        queryset products with one update query, and return the count of
+        updated products"""
+
+        return self.update(
+            attribute_ids=ArraySubquery(
+                ProductAttribute.objects.filter(
+                    product=models.OuterRef('pk')
+                ).order_by('attribute').values('attribute').distinct()
+            )
+        )
+
+    def with_item_effective_price(self, items=None):
+        """Annotate the queryset with deal price and effective price amounts
+        of the product's item that returned by item_instance() method"""
+
+        # Note: 'items' is list of product item instances that selected for
+        #       the products of queryset (e.g. values of selected items
+        #       dictionary), in case the product has one of them, it will be
+        #       used otherwise the default item of product.
+
+        product_items = ProductItem.objects.with_effective_price().filter(
+            product=models.OuterRef('pk')
+        )
+
+        # Order the items as same as item_instance() method, the item that
+        # has (is_default=True) or the last ordered item by 'pk'.
+        ordering = ['-is_default', '-pk']
+
+        if items:
+            product_items = product_items.annotate(
+                is_selected=models.Case(
+                    models.When(
+                        pk__in=[item.pk for item in items],
+                        then=models.Value(True)
+                    ),
+                    default=models.Value(False),
+                    output_field=models.BooleanField()
+                )
+            )
+
+            # The selected item take precedence over the default one.
+            ordering.insert(0, '-is_selected')
+
+        product_items = product_items.order_by(*ordering)
+
+        return self.annotate(
+            item_deal_price_amount=models.Subquery(
+                product_items.values('deal_price_amount')[:1]
+            ),
+            item_effective_price_amount=models.Subquery(
+                product_items.values('effective_price_amount')[:1]
+            )
+        )
+
+
 class Product(TimeStampedModel):
     """Model class to create product instances"""
 
@@ -2442,6 +2678,16 @@ class Product(TimeStampedModel):
         # indexes field accept list of values.
         # indexes = [CaseInsensitiveUniqueIndex(fields=['title'])]
 
+        # Note: the GIN index of 'attribute_ids' array is used by the array
+        #       lookups 'contains' (@>), 'contained_by' (<@) and 'overlap'
+        #       (&&).
+        indexes = [
+            GinIndex(
+                fields=['attribute_ids'],
+                name='product_attribute_ids_gin'
+            )
+        ]
+
     # Define model fields.
     slug = models.SlugField(max_length=100)
     thumbnail = ProcessedImageField(
@@ -2471,6 +2717,18 @@ class Product(TimeStampedModel):
     use_item_attribute_img = models.BooleanField(default=False)
     use_item_attribute_color_shape = models.BooleanField(default=False)
     is_available = models.BooleanField(default=False)
+    # The attribute signature of product is set by the signals of
+    # ProductAttribute (see core/signals.py), it's the sorted 'pk' of
+    # attributes of product (common and product items ones), so the products
+    # are matched by attributes without joins.
+    attribute_ids = pg_fields.ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        editable=False
+    )
+
+    objects = ProductQuerySet.as_manager()
 
     def item_instance(self, item=None):
         """Return specific item product if:
@@ -2480,6 +2738,23 @@ class Product(TimeStampedModel):
          3- the last ordered item by 'pk' (default behavior of last() method).
          """
 
+        # In case the items of product have been prefetched (e.g. listing
+        # views), select the item from the prefetched items without query.
+        if 'product_items_product' in getattr(
+                self, '_prefetched_objects_cache', {}):
+
+            items = self.product_items_product.all()
+
+            if item:
+                return next((obj for obj in items if obj.pk == item.pk), None)
+
+            # The item that has 'is_default=True' or the last ordered item by
+            # 'pk'.
+            return next(
+                (obj for obj in items if obj.is_default),
+                max(items, key=lambda obj: obj.pk, default=None)
+            )
+
         # You can use first() method to return first model instance of filter
         # from database and not a list of model instance/instances.
         if item:
@@ -2664,6 +2939,26 @@ class ProductItem(TimeStampedModel):
             # )
         ]
 
+        # Note: the search columns are read by the database search backend
+        #       (see core/search.py), the full text search uses GIN index of
+        #       'search_vector' and the typo fallback uses trigram GIN index
+        #       of 'search_document' (requires pg_trgm extension).
+        indexes = [
+            GinIndex(
+                fields=['search_vector'],
+                name='productitem_search_vector_gin'
+            ),
+            GinIndex(
+                fields=['search_document'],
+                name='productitem_search_trgm_gin',
+                opclasses=['gin_trgm_ops']
+            ),
+            GinIndex(
+                fields=['attribute_ids'],
+                name='productitem_attribute_ids_gin'
+            )
+        ]
+
     # Define model fields.
     # 'slug' set by signal.
     slug = models.SlugField(max_length=100)
@@ -2715,12 +3010,43 @@ class ProductItem(TimeStampedModel):
         default=False,
         help_text="You should set at least one True value and no more than one"
     )
+    # The stored search columns are set by the search indexer (see
+    # core/indexer.py), 'search_document' is the same as product_item_info
+    # property, and they are filled for the existing product items by the
+    # migration 0010_fill_search_columns.
+    search_document = models.TextField(blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # The attribute signature of product item is set by the signals of
+    # ProductItemAttribute (see core/signals.py), it's the sorted 'pk' of
+    # attributes of product item (uncommon attributes).
+    attribute_ids = pg_fields.ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        editable=False
+    )
+
+    objects = ProductItemQuerySet.as_manager()
 
     @property
     def latest_deal_promotion_item_instance(self):
         """Return the latest product item's promotion item instance that its
         type is 'Deal' and still valid"""
 
+        # Read the active deal promotion from the annotation of
+        # with_effective_price() queryset method and the prefetched promotion
+        # items if exist.
+        if hasattr(self, 'deal_promotion_id') and \
+                'promotion_items_product_item' in getattr(
+                    self, '_prefetched_objects_cache', {}):
+
+            return max(
+                (obj for obj in self.promotion_items_product_item.all()
+                 if obj.promotion_id == self.deal_promotion_id),
+                key=lambda obj: obj.pk,
+                default=None
+            )
+
         # Queryset to get the latest conditional promotion object related to
         # this instance.
         try:
@@ -2741,10 +3067,34 @@ class ProductItem(TimeStampedModel):
         else:
             return promotion_item
 
+    @property
+    def price_record(self):
+        """Return the valid (not expired) price record of this instance"""
+
+        try:
+            record = self.product_item_price_product_item
+
+        except ObjectDoesNotExist:
+            # In case the record has not been created yet.
+            return None
+
+        if record.is_expired:
+            return None
+
+        return record
+
     @property
     def latest_deal_promotion_item_title(self):
         """Return the title of promotion for latest deal promotion item"""
 
+        # Read the title from the price record if exists.
+        record = self.price_record
+
+        if record:
+            if record.promotion_id:
+                return record.promotion_title
+            return None
+
         # Get the latest deal promotion item instance.
         instance = self.latest_deal_promotion_item_instance
 
@@ -2756,6 +3106,14 @@ class ProductItem(TimeStampedModel):
     def latest_deal_promotion_item_summary(self):
         """Return the summary of promotion for latest deal promotion item"""
 
+        # Read the summary from the price record if exists.
+        record = self.price_record
+
+        if record:
+            if record.promotion_id:
+                return record.promotion_summary
+            return None
+
         # Get the latest deal promotion item instance.
         instance = self.latest_deal_promotion_item_instance
 
@@ -2770,6 +3128,23 @@ class ProductItem(TimeStampedModel):
         # You can round number to closet integer without decimal value using
         # round() method.
 
+        # Read the deal price from the price record if exists.
+        record = self.price_record
+
+        if record:
+            return record.deal_price
+
+        # Read the deal price from the annotation of with_effective_price()
+        # queryset method if exists.
+        if hasattr(self, 'deal_price_amount'):
+            if self.deal_price_amount is None:
+                return None
+
+            return round_money(
+                self.deal_price_amount,
+                self.list_price.currency
+            )
+
         # Get the latest deal promotion item instance.
         instance = self.latest_deal_promotion_item_instance
 
@@ -2874,30 +3249,21 @@ class ProductItem(TimeStampedModel):
         """Method to create lower case and normalized string of all the
         required product item info"""
 
-        # Get related product common attributes.
-        common_attributes = self.product.common_attributes
-
-        # Convert attributes instance into string.
-        common_attr_str = ", ".join([str(ele) for ele in common_attributes])
-
-        # Get current product item attributes that connect with (uncommon).
-        item_attr_str = ", ".join([str(ele) for ele in self.attributes])
-
-        # String required:
-        # SKU | Common att, Item att | Category | Product group | Product title
-
-        val = f"{self.sku} | " \
-              f"{common_attr_str}, {item_attr_str} | " \
-              f"{self.product.category_to_string} | " \
-              f"{self.product.product_group_to_string} | " \
-              f"{self.product.title}"
-
-        # Normalize the val string by removing every special character with
-        # space.
-        # Note: you can use r"\W+" regex for every special character.
-        normalized_query = re.sub(r"\W+", " ", str(val).lower())
-
-        return normalized_query
+        # Note: the search indexer (core/indexer.py) builds the same string
+        #       for many product items with prefetched data.
+        return format_product_item_info(
+            sku=self.sku,
+            # Get related product common attributes.
+            common_attributes=[
+                str(ele) for ele in self.product.common_attributes
+            ],
+            # Get current product item attributes that connect with
+            # (uncommon).
+            item_attributes=[str(ele) for ele in self.attributes],
+            category=self.product.category_to_string,
+            product_group=self.product.product_group_to_string,
+            product_title=self.product.title
+        )
 
     def clean(self):
         """Restrict the add/change to model fields"""
@@ -3006,6 +3372,176 @@ class PromotionItem(models.Model):
         return f'{self.promotion}, {self.product_item}'
 
 
+class ProductItemPriceManager(models.Manager):
+    """Custom manager for ProductItemPrice model"""
+
+    def refresh(self, product_item_ids=None):
+        """Re-calculate the price records of the given product items ids (or
+        all product items in case of None)"""
+
+        # Note: bulk create with update on conflict is not supported by this
+        #       version of django, so remove the old records and create the
+        #       new ones inside single transaction, where the rows of product
+        #       items are locked (select_for_update) before their prices are
+        #       read, so the concurrent refreshes of the same product items
+        #       run one after another and the last one writes the records of
+        #       the latest committed data.
+        with transaction.atomic():
+            locked_items = ProductItem.objects.select_for_update()
+
+            if product_item_ids is not None:
+                locked_items = locked_items.filter(pk__in=product_item_ids)
+
+            # Lock the rows in the same order, so the refreshes don't
+            # deadlock.
+            locked_ids = list(
+                locked_items.order_by('pk').values_list('pk', flat=True)
+            )
+
+            records = self.get_records(locked_ids)
+
+            old_records = self.all()
+
+            if product_item_ids is not None:
+                old_records = old_records.filter(
+                    product_item__in=product_item_ids
+                )
+
+            old_records.delete()
+
+            return self.bulk_create(records, batch_size=500)
+
+    def get_records(self, product_item_ids):
+        """Return list of the price records (not saved) of the given product
+        items ids"""
+
+        # Get the product items with their effective price and active deal
+        # promotion, in addition to the fields of promotions those needed.
+        queryset = ProductItem.objects.with_effective_price().annotate(
+            deal_promotion_title=models.Subquery(
+                Promotion.objects.filter(
+                    pk=models.OuterRef('deal_promotion_id')
+                ).values('title')[:1]
+            ),
+            deal_promotion_summary=models.Subquery(
+                Promotion.objects.filter(
+                    pk=models.OuterRef('deal_promotion_id')
+                ).values('summary')[:1]
+            ),
+            deal_promotion_end_date=models.Subquery(
+                Promotion.objects.filter(
+                    pk=models.OuterRef('deal_promotion_id')
+                ).values('end_date')[:1]
+            ),
+            latest_deal_promotion_start_date=models.Subquery(
+                Promotion.objects.filter(
+                    pk=models.OuterRef('latest_deal_promotion_id')
+                ).values('start_date')[:1]
+            )
+        ).filter(pk__in=product_item_ids)
+
+        now = timezone.now()
+        records = []
+
+        for item in queryset.values(
+            'pk',
+            'list_price_currency',
+            'deal_price_amount',
+            'effective_price_amount',
+            'deal_promotion_id',
+            'deal_promotion_title',
+            'deal_promotion_summary',
+            'deal_promotion_end_date',
+            'latest_deal_promotion_start_date'
+        ):
+            currency = item['list_price_currency']
+
+            # The record is no longer valid when the active deal promotion
+            # ends, or when the latest deal promotion (not started yet)
+            # starts.
+            expires_at = item['deal_promotion_end_date']
+
+            if not expires_at and item['latest_deal_promotion_start_date'] \
+                    and item['latest_deal_promotion_start_date'] > now:
+                expires_at = item['latest_deal_promotion_start_date']
+
+            records.append(
+                self.model(
+                    product_item_id=item['pk'],
+                    effective_price=round_money(
+                        item['effective_price_amount'],
+                        currency
+                    ),
+                    deal_price=round_money(
+                        item['deal_price_amount'],
+                        currency
+                    ),
+                    promotion_id=item['deal_promotion_id'],
+                    promotion_title=item['deal_promotion_title'] or '',
+                    promotion_summary=item['deal_promotion_summary'] or '',
+                    expires_at=expires_at
+                )
+            )
+
+        return records
+
+
+class ProductItemPrice(models.Model):
+    """Model class to store the current price and active deal promotion of
+    product item"""
+
+    # Note: this is a de-normalized record of deal_price property and latest
+    #       deal promotion item properties of ProductItem model in order to
+    #       read them with one query, it's refreshed by signals of Promotion,
+    #       PromotionItem, PromotionCategory and POItem models and by periodic
+    #       celery task for records those expired (start/end date of
+    #       promotion).
+
+    # Define model fields.
+    product_item = models.OneToOneField(
+        'ProductItem',
+        on_delete=models.CASCADE,
+        related_name='product_item_price_product_item'
+    )
+    effective_price = MoneyField(
+        max_digits=8,
+        decimal_places=settings.MONEY_DECIMAL_PLACES,
+        default_currency=settings.MONEY_DEFAULT_CURRENCY
+    )
+    deal_price = MoneyField(
+        max_digits=8,
+        decimal_places=settings.MONEY_DECIMAL_PLACES,
+        default_currency=settings.MONEY_DEFAULT_CURRENCY,
+        null=True,
+        blank=True
+    )
+    promotion = models.ForeignKey(
+        'Promotion',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='product_item_prices_promotion'
+    )
+    promotion_title = models.CharField(max_length=12, blank=True)
+    promotion_summary = models.TextField(max_length=21, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = ProductItemPriceManager()
+
+    @property
+    def is_expired(self):
+        """Return True if the record is no longer valid"""
+
+        if self.expires_at and self.expires_at <= timezone.now():
+            return True
+        else:
+            return False
+
+    def __str__(self):
+        """String representation of model objects"""
+        return f'{self.product_item}, {self.effective_price}'
+
+
 class Attribute(mptt_models.MPTTModel, TimeStampedModel):
     """Model class to create product's attribute instances"""
 
@@ -3147,6 +3683,56 @@ class CategoryAttribute(models.Model):
         return f'{self.category}, {self.attribute}'
 
 
+class CategoryFacet(models.Model):
+    """Model class to store the facet groups (root attributes) of category
+    with the titles of their options"""
+
+    # Note: this is a de-normalized record of the attributes those connected
+    #       to the category and its ancestors (and to products) in order to
+    #       list the filters of category with one query, it's refreshed by
+    #       celery task when the signals of Category, Attribute,
+    #       CategoryAttribute and ProductAttribute models are emitted (see
+    #       core/facets.py).
+
+    # Important: after creating the table (or in case the records are lost)
+    #            refresh the records of all the categories:
+    #
+    #            python manage.py refresh_category_facets
+
+    class Meta:
+        """Set metadata for your Model class"""
+
+        # Note: the unique constraint is indexed by (category, attribute), so
+        #       the facets of category are read by its index.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'attribute'],
+                name='category_facet_unique_appversion'
+            )
+        ]
+
+    # Define model fields.
+    category = models.ForeignKey(
+        'Category',
+        on_delete=models.CASCADE,
+        related_name='category_facets_category'
+    )
+    attribute = models.ForeignKey(
+        'Attribute',
+        on_delete=models.CASCADE,
+        related_name='category_facets_attribute'
+    )
+    title = models.CharField(max_length=25)
+    input_class = models.CharField(max_length=20)
+    display_order = models.PositiveSmallIntegerField(null=True, blank=True)
+    # The titles of options (level 1 attributes) ordered by display order.
+    options = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        """String representation of model objects"""
+        return f'{self.category}, {self.title}'
+
+
 class ProductAttribute(models.Model):
     """Model class to set product attributes"""
 
@@ -3246,6 +3832,38 @@ class ProductItemAttribute(models.Model):
         return f'{self.product_attribute}'
 
 
+class ProductVariantMatrix(models.Model):
+    """Model class to store the variant matrix of product (its items with
+    their attributes, the available combinations of attributes and the
+    default item)"""
+
+    # Note: this is a de-normalized record of the items of product and their
+    #       attributes in order to serve the product details page without a
+    #       query for the attributes of each item, it's refreshed by celery
+    #       task when the signals of ProductItem, ProductAttribute,
+    #       ProductItemAttribute and Attribute models are emitted, and in
+    #       case it doesn't exist the first request of product queues its
+    #       creation (see core/variants.py).
+
+    # Define model fields.
+    product = models.OneToOneField(
+        'Product',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='variant_matrix_product'
+    )
+    # The matrix has the following keys:
+    # 1- 'items': list of items of product with their attributes.
+    # 2- 'combinations': the available combinations of attributes.
+    # 3- 'default_item_id': the 'pk' of default item of product.
+    matrix = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """String representation of model objects"""
+        return f'{self.product}'
+
+
 class POItem(models.Model):
     """Model class to set product items to a purchase order"""
 
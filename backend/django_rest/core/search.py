@@ -0,0 +1,636 @@
+"""Define the search backends of search list APIViews"""
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Max, Value, Q as Q_
+from django.utils.module_loading import import_string
+
+from elasticsearch import ApiError, TransportError
+from elasticsearch_dsl import Q, connections
+from elasticsearch_dsl.utils import AttrDict
+
+from core.breaker import CircuitBreaker
+from core.cache import get_generations, bump_generations
+
+import hashlib
+import logging
+import re
+import time
+
+
+# Note: the search backend executes the search of search list APIView (see
+#       PaginatedElasticSearchListAPIView in core/views.py) for the window of
+#       hits of the current page, and it's selected by SEARCH_BACKEND
+#       setting:
+#       1- ElasticsearchBackend: the documents of 'document_class' of view
+#          are searched by elasticsearch (the default backend).
+#       2- PostgresSearchBackend: the model instances of 'document_class' of
+#          view are searched by the stored full text search columns of
+#          database, so the small deployments don't need elasticsearch.
+
+# Important: the backend reads the query and the hooks of view:
+#            1- ElasticsearchBackend: generate_q_expression(), filter_search(),
+#               get_post_filters() and add_search_aggregations().
+#            2- PostgresSearchBackend: filter_search_queryset().
+
+# Note: the search requests of elasticsearch are executed by
+#       execute_elasticsearch() method, with a request timeout and through
+#       a circuit breaker (see core/breaker.py), so the workers don't block
+#       on a slow cluster. In case elasticsearch is not available, the
+#       search backend answers in degraded mode from the last response of
+#       the same search (stale cache) or a title match within database.
+
+# Define the prefix of cache keys of search metrics (counters).
+SEARCH_METRICS_KEY = 'search:metrics'
+
+# Define the label of generation counter of search index (see core/cache.py),
+# which is bumped whenever the documents of product items are indexed, so
+# the cached results of search are invalidated.
+SEARCH_INDEX_GENERATION = 'search-index'
+
+
+class SearchUnavailable(Exception):
+    """Raised when the requests of elasticsearch are not allowed by the
+    circuit breaker"""
+
+
+def get_elasticsearch_breaker():
+    """Return the circuit breaker of elasticsearch"""
+
+    return CircuitBreaker(
+        'elasticsearch',
+        failure_threshold=settings.SEARCH_BREAKER_FAILURE_THRESHOLD,
+        failure_window=settings.SEARCH_BREAKER_FAILURE_WINDOW,
+        reset_timeout=settings.SEARCH_BREAKER_RESET_TIMEOUT
+    )
+
+
+def is_unavailable_error(error):
+    """Return True if the given exception means that elasticsearch is not
+    available (connection errors, timeouts and server errors), not an error
+    of the request itself"""
+
+    if isinstance(error, ApiError):
+        return error.meta.status >= 500
+
+    return isinstance(error, TransportError)
+
+
+def get_search_metric_names():
+    """Return list of names of search metrics (counters)"""
+
+    return [
+        'requests',
+        'failures',
+        'breaker_trips',
+        'breaker_rejections',
+        'degraded_responses',
+        'degraded_stale_responses',
+        'latency_sum_us',
+        *[
+            f'latency_le_{bucket}'
+            for bucket in [*settings.SEARCH_LATENCY_BUCKETS, 'inf']
+        ]
+    ]
+
+
+def record_search_metrics(latency=None, **counters):
+    """Increment the given counters of search metrics, and the latency
+    histogram (in milliseconds) if set"""
+
+    if latency is not None:
+        latency_ms = latency * 1000
+
+        counters['latency_sum_us'] = int(latency_ms * 1000)
+
+        # Count the latency in its bucket only, the histogram is cumulated
+        # when the metrics are read.
+        bucket = next(
+            (bucket for bucket in settings.SEARCH_LATENCY_BUCKETS
+             if latency_ms <= bucket),
+            'inf'
+        )
+        counters[f'latency_le_{bucket}'] = 1
+
+    for name, value in counters.items():
+        if not value:
+            continue
+
+        key = f'{SEARCH_METRICS_KEY}:{name}'
+
+        try:
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                # The counter doesn't exist yet.
+                cache.add(key, value, timeout=None)
+        except Exception as e:
+            logging.exception(e)
+
+
+def get_search_metrics():
+    """Return dictionary of the search metrics (the latency histogram is
+    cumulative as the histograms of prometheus) and the state of circuit
+    breaker of elasticsearch"""
+
+    names = get_search_metric_names()
+
+    values = cache.get_many([f'{SEARCH_METRICS_KEY}:{name}' for name in names])
+
+    metrics = {
+        name: int(values.get(f'{SEARCH_METRICS_KEY}:{name}') or 0)
+        for name in names
+    }
+
+    count = 0
+    for bucket in [*settings.SEARCH_LATENCY_BUCKETS, 'inf']:
+        count += metrics[f'latency_le_{bucket}']
+        metrics[f'latency_le_{bucket}'] = count
+
+    metrics['latency_count'] = count
+    metrics['latency_sum_ms'] = round(metrics.pop('latency_sum_us') / 1000, 3)
+
+    state, failures = get_elasticsearch_breaker().get_state()
+
+    metrics['breaker_state'] = state
+    metrics['breaker_failures'] = failures
+
+    return metrics
+
+
+def execute_elasticsearch(search):
+    """Execute the given search object of elasticsearch with the request
+    timeout and through the circuit breaker, and return its response"""
+
+    breaker = get_elasticsearch_breaker()
+
+    if not breaker.allow_request():
+        record_search_metrics(breaker_rejections=1)
+        raise SearchUnavailable('The circuit breaker of elasticsearch is open')
+
+    # Note: the client options are applied to this request only, without
+    #       retries since the breaker handles the unavailable cluster.
+    client = connections.get_connection(search._using).options(
+        request_timeout=settings.SEARCH_REQUEST_TIMEOUT,
+        max_retries=0,
+        retry_on_timeout=False
+    )
+
+    start = time.perf_counter()
+
+    try:
+        response = search.using(client).execute()
+
+    except Exception as e:
+        if is_unavailable_error(e):
+            tripped = breaker.record_failure()
+            record_search_metrics(
+                latency=time.perf_counter() - start,
+                failures=1,
+                breaker_trips=int(tripped)
+            )
+        raise
+
+    breaker.record_success()
+    record_search_metrics(latency=time.perf_counter() - start, requests=1)
+
+    return response
+
+
+def get_search_index_generation():
+    """Return the current generation of search index"""
+
+    return get_generations([SEARCH_INDEX_GENERATION])[SEARCH_INDEX_GENERATION]
+
+
+def bump_search_index_generation():
+    """Bump the generation of search index after its documents have been
+    updated"""
+
+    # Don't break the indexer in case redis is down.
+    try:
+        bump_generations([SEARCH_INDEX_GENERATION])
+    except Exception as e:
+        logging.exception(e)
+
+
+def get_search_backend_class():
+    """Return the search backend class of SEARCH_BACKEND setting"""
+
+    return import_string(settings.SEARCH_BACKEND)
+
+
+def is_elasticsearch_enabled():
+    """Return True if elasticsearch is used by the search backend or the
+    products list of category, so its documents should be indexed"""
+
+    return get_search_backend_class().requires_elasticsearch or \
+        settings.PRODUCT_LISTING_ENGINE == 'elasticsearch'
+
+
+class QuerySetSearchResponse:
+    """Search response of database search backend, which is a sequence of
+    hits (AttrDict) with the total count of matched instances"""
+
+    # Note: the hits are read as the hits of elasticsearch response, by key
+    #       (hit['field']) or attribute (hit.field and hit.meta.id).
+
+    def __init__(self, hits, total):
+        """Initialize the response with the hits of current window"""
+
+        self.hits = [AttrDict(hit) for hit in hits]
+        self.total = total
+
+    def __iter__(self):
+        """Iterate over the hits"""
+
+        return iter(self.hits)
+
+    def __len__(self):
+        """Return the count of hits of current window"""
+
+        return len(self.hits)
+
+
+class CachedSearchResponse(QuerySetSearchResponse):
+    """Search response served from the cached results of search, which has
+    the facets of the cached search in addition to its hits"""
+
+    def __init__(self, hits, total, facets=None):
+        """Initialize the response with the cached hits and facets"""
+
+        super().__init__(hits, total)
+        self.facets = facets
+
+
+class BaseSearchBackend:
+    """Base class of search backends"""
+
+    # Set True if the backend searches the documents of elasticsearch.
+    requires_elasticsearch = False
+
+    # Set True by the backend if the response is served in degraded mode.
+    degraded = False
+
+    def __init__(self, view):
+        """Initialize the backend with the search view"""
+
+        self.view = view
+
+    def get_query(self):
+        """Return the query string of search view from its url kwargs"""
+
+        return self.view.kwargs.get(self.view.kwargs_query, None)
+
+    def execute_search(self, start, size):
+        """Return the search response of the given window of hits, where
+        each hit has the fields of 'filter_keyword' and 'source_fields' of
+        view in addition to 'meta.id'"""
+
+        raise NotImplementedError
+
+    def get_search_total(self, search_response):
+        """Return the total count of matched instances of search response"""
+
+        if not isinstance(search_response, QuerySetSearchResponse):
+            return 0
+
+        return search_response.total
+
+    def get_queryset(self):
+        """Return the queryset of model of view document class filtered by
+        the view"""
+
+        model = self.view.document_class.django.model
+
+        return self.view.filter_search_queryset(model.objects.all())
+
+    def get_response(self, queryset, start, size):
+        """Return QuerySetSearchResponse of the window of the given queryset
+        (annotated by 'score')"""
+
+        view = self.view
+        fields = [view.filter_keyword, *view.source_fields]
+
+        def get_hit(values):
+            hit = {field: values[field] for field in fields}
+            hit['meta'] = {'id': values['pk'], 'score': values['score']}
+            return hit
+
+        if not view.collapse_field:
+            return QuerySetSearchResponse(
+                [
+                    get_hit(values) for values in queryset.order_by(
+                        '-score', 'pk'
+                    ).values('pk', 'score', *fields)[start:start + size]
+                ],
+                queryset.count()
+            )
+
+        # Get the collapse values of current window ordered by their best
+        # score, then the best hit (the highest score) of each value.
+        collapse_field = view.collapse_field
+
+        collapsed = queryset.order_by().values(collapse_field).annotate(
+            best_score=Max('score')
+        )
+
+        window = [
+            values[collapse_field] for values in collapsed.order_by(
+                '-best_score', collapse_field
+            )[start:start + size]
+        ]
+
+        if not window:
+            return QuerySetSearchResponse([], collapsed.count())
+
+        # Note: distinct() with field names is the 'DISTINCT ON' of postgres,
+        #       which keeps the first row of each collapse value.
+        best_hits = {
+            values[collapse_field]: values for values in queryset.filter(
+                **{f'{collapse_field}__in': window}
+            ).order_by(
+                collapse_field, '-score', 'pk'
+            ).distinct(collapse_field).values(
+                'pk', 'score', collapse_field, *fields
+            )
+        }
+
+        return QuerySetSearchResponse(
+            [get_hit(best_hits[value]) for value in window],
+            collapsed.count()
+        )
+
+
+class ElasticsearchBackend(BaseSearchBackend):
+    """Search backend to search the documents of elasticsearch"""
+
+    requires_elasticsearch = True
+
+    def execute_search(self, start, size):
+        """Return response from search engine for a given query string and
+        the window of hits"""
+
+        view = self.view
+
+        # Get query string as lower case from url parameter (argument).
+        kwarg_query = self.get_query()
+
+        # Note: get the filters outside try block, so their validation
+        #       exceptions are returned to the client.
+        post_filters = view.get_post_filters()
+
+        try:
+            # pass query to generate_q_expression() (the overriden version).
+            q = view.generate_q_expression(kwarg_query)
+
+            # Set Q() expression query to be searched within provided document.
+            search = view.filter_search(view.document_class.search().query(q))
+
+            # Exclude items from your query
+            # search = search.exclude('<field_name>', draft=True)
+
+            # Filter documents that contain terms within a provided range.
+            # eg: the posts created for the past day (1d)
+            # search = search.filter('range', <field_name>={"gte": "now-1d"})
+
+            # Ordering
+            # Note: prefixed by the - sign with specific field name to specify
+            #       a descending order.
+            # search = search.sort('<field_name>')
+
+            # Selectively control how the _source field is returned.
+            search = search.source(
+                fields=[view.filter_keyword, *view.source_fields]
+            )
+
+            # Filter the hits after the aggregations have been computed, so
+            # the aggregations (e.g. facets) can ignore some of them.
+            if post_filters:
+                search = search.post_filter('bool', filter=post_filters)
+
+            if view.collapse_field:
+                # Return the best hit (the highest score) of each collapse
+                # value, and count the collapse values for pagination since
+                # the total of hits is the count of documents.
+                search = search.extra(
+                    collapse={'field': view.collapse_field}
+                )
+                search.aggs.bucket(
+                    'total_collapsed',
+                    'filter',
+                    filter=Q('bool', filter=post_filters)
+                ).metric(
+                    'count',
+                    'cardinality',
+                    field=view.collapse_field
+                )
+
+            view.add_search_aggregations(search, post_filters)
+
+            # Set the window of hits of the current page.
+            search = search.extra(from_=start, size=size)
+
+            # Trigger the query search of elasticsearch.
+            # Note: Retrieved data will be list of document type (table)
+            #       instance that set as document_class property of view.
+            response = execute_elasticsearch(search)
+
+        except Exception as e:
+            logging.exception(e)
+            return self.get_degraded_response(start, size)
+
+        self.save_stale_response(start, size, response)
+
+        return response
+
+    def get_stale_cache_key(self, start, size):
+        """Return the cache key of the last response of current search and
+        window of hits"""
+
+        params = '&'.join(
+            f'{key}={value}'
+            for key, values in sorted(self.view.request.query_params.lists())
+            if key != 'page'
+            for value in sorted(values)
+        )
+
+        value = f'{self.view.request.path}|{params}|{start}|{size}'
+
+        return f'search:stale:{hashlib.md5(value.encode()).hexdigest()}'
+
+    def save_stale_response(self, start, size, response):
+        """Cache the hits and total of the given response, so they are
+        served in degraded mode"""
+
+        fields = [self.view.filter_keyword, *self.view.source_fields]
+
+        try:
+            cache.set(
+                self.get_stale_cache_key(start, size),
+                {
+                    'hits': [
+                        dict(
+                            {field: hit[field] for field in fields},
+                            meta={
+                                'id': hit.meta.id,
+                                'score': hit.meta.score
+                            }
+                        ) for hit in response
+                    ],
+                    'total': self.get_search_total(response)
+                },
+                timeout=settings.SEARCH_STALE_RESULTS_TIMEOUT
+            )
+        except Exception as e:
+            logging.exception(e)
+
+    def get_degraded_response(self, start, size):
+        """Return the last response of current search (stale cache) if
+        exists, otherwise the database title match of query words"""
+
+        self.degraded = True
+
+        try:
+            stale = cache.get(self.get_stale_cache_key(start, size))
+        except Exception as e:
+            logging.exception(e)
+            stale = None
+
+        record_search_metrics(
+            degraded_responses=1,
+            degraded_stale_responses=int(stale is not None)
+        )
+
+        if stale is not None:
+            return QuerySetSearchResponse(stale['hits'], stale['total'])
+
+        words = re.sub(r"\W+", " ", (self.get_query() or '').lower()).split()
+        fields = self.view.degraded_search_fields
+
+        if not words or not fields:
+            return []
+
+        try:
+            condition = Q_()
+
+            # Each word should be found within one of the fields.
+            for word in words:
+                word_condition = Q_()
+
+                for field in fields:
+                    word_condition |= Q_(**{f'{field}__icontains': word})
+
+                condition &= word_condition
+
+            return self.get_response(
+                self.get_queryset().filter(condition).annotate(
+                    score=Value(1.0)
+                ),
+                start,
+                size
+            )
+
+        except Exception as e:
+            logging.exception(e)
+            return []
+
+    def get_search_total(self, search_response):
+        """Return the total count of matched instances of search response"""
+
+        # The responses of degraded mode (or empty response).
+        if isinstance(search_response, QuerySetSearchResponse) or \
+                not hasattr(search_response, 'hits'):
+            return super().get_search_total(search_response)
+
+        if self.view.collapse_field:
+            return int(
+                search_response.aggregations.total_collapsed.count.value
+            )
+
+        return search_response.hits.total.value
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Search backend to search the stored full text search columns of the
+    model of view document class within postgres"""
+
+    # Note: the model of document class should have the stored search
+    #       columns (see ProductItem model):
+    #       1- 'search_vector': tsvector of the searched text (GIN index),
+    #          the query words should be all matched (AND) and the hits are
+    #          ordered by the rank of full text search.
+    #       2- 'search_document': the searched text (trigram GIN index), used
+    #          when the full text search has no hits (e.g. typos), where the
+    #          hits are ordered by the similarity of query words.
+    #       The document fields of 'filter_keyword', 'collapse_field' and
+    #       'source_fields' of view should be fields of the model too.
+
+    def execute_search(self, start, size):
+        """Return QuerySetSearchResponse for a given query string and the
+        window of hits"""
+
+        query = self.get_query() or ''
+
+        # Note: get the filtered queryset outside try block, so the
+        #       validation exceptions of filters are returned to the client.
+        queryset = self.get_queryset()
+
+        try:
+            # Match all the words of query ('websearch' type accepts any text
+            # of user without syntax errors).
+            search_query = SearchQuery(
+                query,
+                config=settings.SEARCH_POSTGRES_CONFIG,
+                search_type='websearch'
+            )
+
+            response = self.get_response(
+                queryset.filter(search_vector=search_query).annotate(
+                    score=SearchRank(F('search_vector'), search_query)
+                ),
+                start,
+                size
+            )
+
+            if response.total:
+                return response
+
+            # Fall back to the trigram similarity of each query word in case
+            # of typos (all the words should be similar to words of
+            # document), where '%>' operator (trigram_word_similar lookup)
+            # uses the trigram index with 'pg_trgm.word_similarity_threshold'.
+            words = re.sub(r"\W+", " ", query.lower()).split()
+
+            if not words:
+                return response
+
+            condition = Q_()
+            score = Value(0.0)
+
+            for word in words:
+                condition &= Q_(search_document__trigram_word_similar=word)
+                score += TrigramWordSimilarity(word, 'search_document')
+
+            # Note: 'SET LOCAL' changes the threshold until the end of
+            #       transaction only, so the queries of fallback are executed
+            #       inside atomic block.
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SET LOCAL pg_trgm.word_similarity_threshold = %s',
+                        [settings.SEARCH_TRIGRAM_THRESHOLD]
+                    )
+
+                return self.get_response(
+                    queryset.filter(condition).annotate(score=score),
+                    start,
+                    size
+                )
+
+        except Exception as e:
+            logging.exception(e)
+            return []
@@ -10,19 +10,37 @@
 #            instance signal, will not see the statement of print e.g. when
 #            using django nested admin of models.
 
-from django.db.models.signals import pre_save, post_save, m2m_changed
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Subquery
+from django.db.models.signals import (pre_save, post_save, pre_delete,
+                                      post_delete, m2m_changed)
 from django.dispatch import receiver
 from django.utils.crypto import get_random_string
 from django.utils.text import slugify
 
 
-from core.models import (User, Category, Attribute, PromotionCategory, Banner,
-                         Card, PurchaseOrder, Product, ProductItem,
-                         ProductItemAttribute, ProductItemImage, MetaItem)
-from core.tasks import (set_product_item_promotion)
+from core.models import (User, Category, Attribute, Promotion,
+                         PromotionCategory, PromotionItem, Banner, Card,
+                         PurchaseOrder, POItem, Product, ProductItem,
+                         ProductItemAttribute, ProductItemImage, MetaItem,
+                         TopBanner, Section, SectionCard, ProductGroup,
+                         ProductAttribute, CategoryAttribute, Country,
+                         Supplier)
+from core.tasks import (set_product_item_promotion,
+                        refresh_product_item_prices, index_product_items,
+                        refresh_category_facets,
+                        refresh_product_variant_matrices)
+from core.indexer import add_pending_product_items
+from core.variants import get_affected_product_ids
+from core.cache import (get_model_label, get_instance_label,
+                        bump_generations)
+from home.tasks import schedule_home_payload_rebuild
+from home.views import HomeListAPIView
 
 import string
 import random
+import logging
 
 # Import inspect module that provides several useful functions to help get
 # information about live objects such as modules, classes, methods, functions,
@@ -147,6 +165,528 @@ def set_promotion_to_product_item(sender, instance, created, **kwargs):
         )
 
 
+# Define the models those their generation counters are used by the cached
+# responses (see core/cache.py).
+RESPONSE_CACHE_MODELS = [
+    Banner, TopBanner, Section, SectionCard, Card, Category, Attribute,
+    CategoryAttribute, ProductGroup, Product, ProductAttribute, ProductItem,
+    ProductItemAttribute, ProductItemImage, Promotion, PromotionItem, Country
+]
+
+
+def bump_generation(sender, instance, **kwargs):
+    """Bump the generation counter of sender model after the current
+    transaction is committed, so the cached responses those depend on it
+    will be invalidated"""
+
+    label = get_model_label(sender)
+
+    def bump():
+        # Don't break the admin save in case redis is down.
+        try:
+            bump_generations([label])
+        except Exception as e:
+            logging.exception(e)
+
+    transaction.on_commit(bump)
+
+
+# Note: connect the receiver with each model using dispatch_uid, so it's
+#       connected once even if this module is imported more than once.
+for model in RESPONSE_CACHE_MODELS:
+    for signal in (post_save, post_delete):
+        signal.connect(
+            bump_generation,
+            sender=model,
+            dispatch_uid=f'bump_generation_{get_model_label(model)}'
+        )
+
+
+# Define the models those the home payload depends on (see home/tasks.py),
+# which are the same models of the cached response of home view.
+# Note: the price records (ProductItemPrice) are created using bulk_create()
+#       which doesn't emit the signals, so their task schedules the rebuild.
+HOME_PAYLOAD_MODELS = HomeListAPIView.cache_models
+
+
+def rebuild_home_payload_on_change(sender, instance, **kwargs):
+    """Rebuild the home payload when the home content has been changed"""
+
+    schedule_home_payload_rebuild()
+
+
+for model in HOME_PAYLOAD_MODELS:
+    for signal in (post_save, post_delete):
+        signal.connect(
+            rebuild_home_payload_on_change,
+            sender=model,
+            dispatch_uid=f'rebuild_home_payload_{get_model_label(model)}'
+        )
+
+
+def refresh_prices_on_commit(product_item_ids):
+    """Add task to job queue to refresh the price records of the given
+    product items after the current transaction is committed"""
+
+    # Note: the task should run after the changes have been committed into
+    #       the database, otherwise the celery worker may read old values.
+    product_item_ids = list(set(product_item_ids))
+
+    if product_item_ids:
+        transaction.on_commit(
+            lambda: refresh_product_item_prices.delay(product_item_ids)
+        )
+
+
+@receiver(post_save, sender=Promotion)
+def refresh_prices_of_promotion(sender, instance, **kwargs):
+    """Refresh the price records of product items those related to this
+    promotion instance"""
+
+    refresh_prices_on_commit(
+        instance.promotion_items_promotion.values_list(
+            'product_item',
+            flat=True
+        )
+    )
+
+
+@receiver(pre_delete, sender=Promotion)
+def refresh_prices_of_deleted_promotion(sender, instance, **kwargs):
+    """Refresh the price records of product items those related to this
+    promotion instance before its promotion items have been deleted"""
+
+    refresh_prices_on_commit(
+        instance.promotion_items_promotion.values_list(
+            'product_item',
+            flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=PromotionItem)
+@receiver(post_delete, sender=PromotionItem)
+def refresh_prices_of_promotion_item(sender, instance, **kwargs):
+    """Refresh the price record of product item of this instance"""
+
+    refresh_prices_on_commit([instance.product_item_id])
+
+
+@receiver(post_save, sender=ProductItem)
+def refresh_prices_of_product_item(sender, instance, **kwargs):
+    """Refresh the price record of this instance, since the list price may
+    has been changed"""
+
+    refresh_prices_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=POItem)
+@receiver(post_delete, sender=POItem)
+def refresh_prices_of_po_item(sender, instance, **kwargs):
+    """Refresh the price records of product items those related to the
+    promotion of purchase order, since the use times of promotion has been
+    changed"""
+
+    # Note: in case of cascade delete of purchase order, it's not possible
+    #       to get it from this instance.
+    try:
+        promotion_id = instance.purchase_order.promotion_id
+    except PurchaseOrder.DoesNotExist:
+        return
+
+    if promotion_id:
+        refresh_prices_on_commit(
+            PromotionItem.objects.filter(
+                promotion=promotion_id
+            ).values_list('product_item', flat=True)
+        )
+
+
+def refresh_facets_on_commit(category_ids=(), attribute_ids=(), tree_ids=()):
+    """Add task to job queue to refresh the facet records of categories those
+    depend on the given categories, attributes and attribute trees after the
+    current transaction is committed"""
+
+    category_ids = list(set(category_ids))
+    attribute_ids = list(set(attribute_ids))
+    tree_ids = list(set(tree_ids))
+
+    if category_ids or attribute_ids or tree_ids:
+        transaction.on_commit(
+            lambda: refresh_category_facets.delay(
+                category_ids,
+                attribute_ids,
+                tree_ids
+            )
+        )
+
+
+@receiver(post_save, sender=Category)
+def refresh_facets_of_category(sender, instance, **kwargs):
+    """Refresh the facet records of this instance and its descendants, since
+    it may has been moved to another parent"""
+
+    refresh_facets_on_commit(category_ids=[instance.pk])
+
+
+@receiver(post_save, sender=CategoryAttribute)
+@receiver(post_delete, sender=CategoryAttribute)
+def refresh_facets_of_category_attribute(sender, instance, **kwargs):
+    """Refresh the facet records of category of this instance and its
+    descendants"""
+
+    refresh_facets_on_commit(category_ids=[instance.category_id])
+
+
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def refresh_facets_of_product_attribute(sender, instance, **kwargs):
+    """Refresh the facet records of categories those connected to the
+    attribute tree of this instance, since the options with products may
+    have been changed"""
+
+    refresh_facets_on_commit(attribute_ids=[instance.attribute_id])
+
+
+@receiver(post_save, sender=Attribute)
+@receiver(post_delete, sender=Attribute)
+def refresh_facets_of_attribute(sender, instance, **kwargs):
+    """Refresh the facet records of categories those connected to the tree
+    of this instance"""
+
+    refresh_facets_on_commit(tree_ids=[instance.tree_id])
+
+
+def refresh_variant_matrices_on_commit(product_ids=(), product_item_ids=(),
+                                       tree_ids=()):
+    """Add task to job queue to refresh the variant matrices of products
+    those depend on the given products, product items and attribute trees
+    after the current transaction is committed"""
+
+    product_ids = list(set(product_ids))
+    product_item_ids = list(set(product_item_ids))
+    tree_ids = list(set(tree_ids))
+
+    if product_ids or product_item_ids or tree_ids:
+        transaction.on_commit(
+            lambda: refresh_product_variant_matrices.delay(
+                product_ids,
+                product_item_ids,
+                tree_ids
+            )
+        )
+
+
+@receiver(post_save, sender=ProductItem)
+@receiver(post_delete, sender=ProductItem)
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def refresh_variant_matrix_of_product(sender, instance, **kwargs):
+    """Refresh the variant matrix of product of this instance"""
+
+    refresh_variant_matrices_on_commit(product_ids=[instance.product_id])
+
+
+@receiver(post_save, sender=ProductItemAttribute)
+@receiver(post_delete, sender=ProductItemAttribute)
+def refresh_variant_matrix_of_item_attribute(sender, instance, **kwargs):
+    """Refresh the variant matrix of product of the product item of this
+    instance"""
+
+    refresh_variant_matrices_on_commit(
+        product_item_ids=[instance.product_item_id]
+    )
+
+
+@receiver(post_save, sender=Attribute)
+@receiver(post_delete, sender=Attribute)
+def refresh_variant_matrices_of_attribute(sender, instance, **kwargs):
+    """Refresh the variant matrices of products those connected to the tree
+    of this instance, since the titles of attributes may have been
+    changed"""
+
+    refresh_variant_matrices_on_commit(tree_ids=[instance.tree_id])
+
+
+def bump_product_generations_on_commit(product_ids):
+    """Bump the generation counters of the given products after the current
+    transaction is committed, so the cached fragments of their details (see
+    product/views.py) will be invalidated"""
+
+    labels = [get_instance_label(Product, pk) for pk in set(product_ids)]
+
+    if not labels:
+        return
+
+    def bump():
+        # Don't break the admin save in case redis is down.
+        try:
+            bump_generations(labels)
+        except Exception as e:
+            logging.exception(e)
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_generation_of_product(sender, instance, **kwargs):
+    """Invalidate the cached details of this instance"""
+
+    bump_product_generations_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=ProductItem)
+@receiver(post_delete, sender=ProductItem)
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def bump_generation_of_product_of_instance(sender, instance, **kwargs):
+    """Invalidate the cached details of product of this instance"""
+
+    bump_product_generations_on_commit([instance.product_id])
+
+
+@receiver(post_save, sender=ProductItemAttribute)
+@receiver(post_delete, sender=ProductItemAttribute)
+@receiver(post_save, sender=ProductItemImage)
+@receiver(post_delete, sender=ProductItemImage)
+@receiver(post_save, sender=PromotionItem)
+@receiver(post_delete, sender=PromotionItem)
+def bump_generation_of_product_of_item(sender, instance, **kwargs):
+    """Invalidate the cached details of product of the product item of this
+    instance"""
+
+    bump_product_generations_on_commit(
+        get_affected_product_ids(product_item_ids=[instance.product_item_id])
+    )
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(pre_delete, sender=Promotion)
+def bump_generations_of_promotion(sender, instance, **kwargs):
+    """Invalidate the cached details of products those their items are
+    related to this promotion instance (before its promotion items have been
+    deleted)"""
+
+    bump_product_generations_on_commit(
+        ProductItem.objects.filter(
+            promotion_items_product_item__promotion=instance
+        ).values_list('product_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Supplier)
+def bump_generations_of_supplier(sender, instance, **kwargs):
+    """Invalidate the cached details of products those their items are
+    supplied by this instance, since its availability may has been
+    changed"""
+
+    bump_product_generations_on_commit(
+        ProductItem.objects.filter(supplier=instance).values_list(
+            'product_id',
+            flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=Attribute)
+@receiver(post_delete, sender=Attribute)
+def bump_generations_of_attribute(sender, instance, **kwargs):
+    """Invalidate the cached details of products those connected to the tree
+    of this instance, since the titles of attributes may have been
+    changed"""
+
+    bump_product_generations_on_commit(
+        get_affected_product_ids(tree_ids=[instance.tree_id])
+    )
+
+
+# Note: the attribute signatures (the 'attribute_ids' arrays) of products and
+#       product items are updated inside the current transaction with one
+#       update query, since the array lookups of views must never see the
+#       attributes before their signatures.
+
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def refresh_attribute_ids_of_product(sender, instance, created=False,
+                                     **kwargs):
+    """Refresh the attribute signature of product of this instance, and of
+    its product items in case the attribute of this instance has been
+    changed"""
+
+    Product.objects.filter(pk=instance.product_id).refresh_attribute_ids()
+
+    # Note: on delete, the product item attributes of this instance are
+    #       deleted by cascade and refresh their product items by themselves.
+    if kwargs['signal'] is post_save and not created:
+        ProductItem.objects.filter(
+            product_item_attributes_product_item__product_attribute=instance
+        ).refresh_attribute_ids()
+
+
+@receiver(post_save, sender=ProductItemAttribute)
+@receiver(post_delete, sender=ProductItemAttribute)
+def refresh_attribute_ids_of_product_item(sender, instance, **kwargs):
+    """Refresh the attribute signature of product item of this instance"""
+
+    ProductItem.objects.filter(
+        pk=instance.product_item_id
+    ).refresh_attribute_ids()
+
+
+@receiver(pre_save, sender=Product)
+def set_attribute_ids_to_product(sender, instance, *args, **kwargs):
+    """Set the attribute signature of saved product from its attributes, so
+    the stale signature of loaded instance isn't written back"""
+
+    if instance.pk:
+        instance.attribute_ids = list(
+            ProductAttribute.objects.filter(
+                product=instance.pk
+            ).order_by('attribute').values_list(
+                'attribute',
+                flat=True
+            ).distinct()
+        )
+
+
+@receiver(pre_save, sender=ProductItem)
+def set_attribute_ids_to_product_item(sender, instance, *args, **kwargs):
+    """Set the attribute signature of saved product item from its
+    attributes, so the stale signature of loaded instance isn't written
+    back"""
+
+    if instance.pk:
+        instance.attribute_ids = list(
+            ProductItemAttribute.objects.filter(
+                product_item=instance.pk
+            ).order_by('product_attribute__attribute').values_list(
+                'product_attribute__attribute',
+                flat=True
+            ).distinct()
+        )
+
+
+def index_product_items_on_commit(product_item_ids, product_ids=()):
+    """Queue the given product items (and products) to be indexed by the
+    search indexer after the current transaction is committed"""
+
+    product_item_ids = list(set(product_item_ids))
+    product_ids = list(set(product_ids))
+
+    if not product_item_ids and not product_ids:
+        return
+
+    def schedule():
+        # Don't break the admin save in case redis is down.
+        try:
+            if add_pending_product_items(product_item_ids, product_ids):
+                index_product_items.apply_async(
+                    countdown=settings.SEARCH_INDEXER_DELAY
+                )
+        except Exception as e:
+            logging.exception(e)
+
+    transaction.on_commit(schedule)
+
+
+@receiver(post_save, sender=ProductItem)
+@receiver(post_delete, sender=ProductItem)
+def index_product_item(sender, instance, **kwargs):
+    """Index the document of this instance (the deleted one is removed from
+    the index)"""
+
+    index_product_items_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def index_product_items_of_product(sender, instance, **kwargs):
+    """Index the documents of product items of this instance, since the
+    title, category or group may have been changed"""
+
+    index_product_items_on_commit(
+        instance.product_items_product.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def index_deleted_product(sender, instance, **kwargs):
+    """Remove the suggestions of this instance from the index"""
+
+    index_product_items_on_commit([], product_ids=[instance.pk])
+
+
+@receiver(post_save, sender=ProductGroup)
+def index_product_items_of_product_group(sender, instance, **kwargs):
+    """Index the documents of product items those related to this
+    instance"""
+
+    index_product_items_on_commit(
+        ProductItem.objects.filter(
+            product__product_group=instance
+        ).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def index_product_items_of_product_attribute(sender, instance, **kwargs):
+    """Index the documents of product items of the product of this instance,
+    since the common attributes may have been changed"""
+
+    index_product_items_on_commit(
+        ProductItem.objects.filter(
+            product=instance.product_id
+        ).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=ProductItemAttribute)
+@receiver(post_delete, sender=ProductItemAttribute)
+def index_product_items_of_item_attribute(sender, instance, **kwargs):
+    """Index the document of product item of this instance"""
+
+    index_product_items_on_commit([instance.product_item_id])
+
+
+@receiver(post_save, sender=Category)
+def index_product_items_of_category(sender, instance, **kwargs):
+    """Index the documents of product items those related to this instance or
+    its descendants, since the title is part of their category path"""
+
+    index_product_items_on_commit(
+        ProductItem.objects.filter(
+            product__category__in=Subquery(
+                instance.get_descendants(include_self=True).values('pk')
+            )
+        ).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Attribute)
+def index_product_items_of_attribute(sender, instance, **kwargs):
+    """Index the documents of product items those related to this instance or
+    its descendants, since the title is part of their attribute path"""
+
+    # Note: the product items of common attributes are related to the
+    #       attribute through their product, and the others through their
+    #       item attributes.
+    attributes = Subquery(
+        instance.get_descendants(include_self=True).values('pk')
+    )
+
+    common_items = ProductItem.objects.filter(
+        product__product_attributes_product__attribute__in=attributes,
+        product__product_attributes_product__is_common_attribute=True
+    ).values_list('pk', flat=True)
+
+    uncommon_items = ProductItemAttribute.objects.filter(
+        product_attribute__attribute__in=attributes
+    ).values_list('product_item', flat=True)
+
+    index_product_items_on_commit(list(common_items) + list(uncommon_items))
+
+
 @receiver(pre_save, sender=Banner)
 def set_slug_to_banner(sender, instance, *args, **kwargs):
     """Create a slug for Banner instance when pre_save signal is emit"""
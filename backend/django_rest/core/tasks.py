@@ -2,12 +2,23 @@
 
 from celery import shared_task
 
-from django.db.models import Subquery
+from django.conf import settings
+from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
 
 # from djmoney.money import Money
 
-from core.models import (Category, ProductItem, Promotion, PromotionItem)
+from core.models import (Category, Product, ProductItem, Promotion,
+                         PromotionItem, ProductItemPrice)
+from core.cache import (get_model_label, get_instance_label,
+                        bump_generations)
+from core.category_tree import get_category_tree
+from core.facets import get_affected_category_ids, refresh_facets
+from core.variants import get_affected_product_ids, refresh_variant_matrices
+from core.indexer import (index_pending_product_items,
+                          add_pending_product_items)
+from home.tasks import schedule_home_payload_rebuild
 
 import logging
 
@@ -30,13 +41,13 @@ def set_product_item_promotion(category_id, promotion_id):
         # field value) those related to specific categories AND exclude the
         # ones those already connected to the provided promotion_id.
 
-        # Note: Limiting a subquery to a single column (primary key, e.g. id)
-        #       and search using (in) lookup expression, the subquery returns
-        #       the leaf nodes of categories (including the current one in case
-        #       itself is a leaf node).
+        # Note: search using (in) lookup expression with the ids of leaf nodes
+        #       of category from the category tree snapshot (including the
+        #       current one in case itself is a leaf node).
         queryset = ProductItem.objects.filter(
-            product__category__in=Subquery(
-                category.get_leafnodes(include_self=True).values('pk')
+            product__category__in=get_category_tree().get_leafnode_ids(
+                category.pk,
+                include_self=True
             )
         ).exclude(
             promotion_items_product_item__promotion=promotion_id
@@ -50,22 +61,146 @@ def set_product_item_promotion(category_id, promotion_id):
     except Exception as e:
         return logging.exception(e)
     else:
-        # Loop over every single product item of queryset.
-        for instance in queryset:
-
-            # Create a single record in PromotionItem model class using save()
-            # or create() method:
-            # 1- save() method, first needs to create model instance and then
-            #    save it.
-            # 2- create() method will create a model instance and save it
-            #    automatically through model manager.
-            try:
-                PromotionItem.objects.create(
+        product_item_ids = [instance.pk for instance in queryset]
+
+        # Create the records of PromotionItem model class at once using
+        # bulk_create() method, which doesn't emit the post_save signal of
+        # every single record, so the price records of items are refreshed
+        # by one call below instead of a celery task for each record.
+        # Note: the items those have been connected to the promotion
+        #       concurrently (unique constraint) are ignored.
+        PromotionItem.objects.bulk_create(
+            [
+                PromotionItem(
                     promotion=promotion,
-                    product_item=instance
-                )
-            except Exception as e:
-                logging.exception(e)
+                    product_item_id=product_item_id
+                ) for product_item_id in product_item_ids
+            ],
+            batch_size=500,
+            ignore_conflicts=True
+        )
+
+        # Invalidate the cached responses those depend on PromotionItem
+        # model, as its signal does.
+        try:
+            bump_generations([get_model_label(PromotionItem)])
+        except Exception as e:
+            logging.exception(e)
+
+        # Refresh the price records of the product items those have been
+        # connected to the promotion (this bumps the generations of their
+        # products too).
+        refresh_product_item_prices(product_item_ids)
+
+
+@shared_task
+def refresh_product_item_prices(product_item_ids):
+    """Refresh the price records of specific product items when the signal
+    of related models is emit"""
+
+    try:
+        ProductItemPrice.objects.refresh(product_item_ids=product_item_ids)
+
+        # The price records are created using bulk_create() which doesn't
+        # emit the signals, so invalidate the cached responses here.
+        bump_generations([get_model_label(ProductItemPrice)])
+
+        # The cached details of products of these items (see
+        # product/views.py) have the old deal prices too, this includes the
+        # expired deals those are refreshed periodically.
+        bump_generations([
+            get_instance_label(Product, pk)
+            for pk in get_affected_product_ids(
+                product_item_ids=product_item_ids
+            )
+        ])
+
+        # The deal prices of home products may have been changed.
+        schedule_home_payload_rebuild()
+
+        # The effective prices of search documents may have been changed.
+        if add_pending_product_items(product_item_ids):
+            index_product_items.apply_async(
+                countdown=settings.SEARCH_INDEXER_DELAY
+            )
+    except Exception as e:
+        logging.exception(e)
+
+
+@shared_task
+def refresh_expired_product_item_prices():
+    """Refresh the price records those expired (start/end date of promotion
+    has been reached) or not created yet, this task run periodically by
+    celery beat"""
+
+    # Get the 'pk' of product items those have expired price record or don't
+    # have one.
+    product_item_ids = list(
+        ProductItem.objects.filter(
+            Q(product_item_price_product_item__isnull=True) |
+            Q(product_item_price_product_item__expires_at__lte=timezone.now())
+        ).values_list('pk', flat=True)
+    )
+
+    if product_item_ids:
+        refresh_product_item_prices(product_item_ids)
+
+
+@shared_task
+def refresh_category_facets(category_ids=(), attribute_ids=(), tree_ids=()):
+    """Refresh the facet records of categories those depend on the given
+    categories, attributes and attribute trees when the signal of related
+    models is emit"""
+
+    try:
+        category_ids = get_affected_category_ids(
+            category_ids,
+            attribute_ids,
+            tree_ids
+        )
+
+        if category_ids:
+            refresh_facets(category_ids)
+    except Exception as e:
+        logging.exception(e)
+
+
+@shared_task
+def refresh_product_variant_matrices(product_ids=(), product_item_ids=(),
+                                     tree_ids=()):
+    """Refresh the variant matrices of products those depend on the given
+    products, product items and attribute trees when the signal of related
+    models is emit"""
+
+    try:
+        product_ids = get_affected_product_ids(
+            product_ids,
+            product_item_ids,
+            tree_ids
+        )
+
+        if product_ids:
+            matrices = refresh_variant_matrices(product_ids)
+
+            # Invalidate the cached details of products (see
+            # product/views.py), since they may have been cached with the old
+            # matrices while this task was waiting.
+            bump_generations(
+                [get_instance_label(Product, pk) for pk in matrices]
+            )
+    except Exception as e:
+        logging.exception(e)
+
+
+@shared_task
+def index_product_items():
+    """Index the documents of product items those have been changed (queued
+    by the signals of related models) in bulk"""
+
+    try:
+        index_pending_product_items()
+    except Exception as e:
+        logging.exception(e)
 
 
 # @shared_task
@@ -0,0 +1,307 @@
+""" Synthetic catalog generator for your tests and benchmarks"""
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from datetime import timedelta
+
+from core import models
+from core.facets import refresh_facets
+
+
+# Note: the generator create the instances using create() method (not
+#       bulk_create()), so the pre_save signals of models will set the slug
+#       fields as the admin does, except the sku of product items which is
+#       set by the generator to avoid collisions of its random part.
+
+# Important: to grow the catalog use add_products() method, or call the
+#            generator again with different 'label' since titles of many
+#            models are unique.
+
+
+class Catalog:
+    """Class to store the instances of generated catalog"""
+
+    def __init__(self, label):
+        """Initialize empty lists of catalog instances"""
+
+        self.label = label
+        self.supplier = None
+        self.product_group = None
+        self.root_categories = []
+        self.leaf_categories = []
+        self.attributes = []
+        self.options = []
+        self.products = []
+        self.product_items = []
+        self.promotions = []
+
+    def __str__(self):
+        """String representation of catalog"""
+
+        return f'{self.label}: {len(self.products)} products, ' \
+               f'{len(self.product_items)} items'
+
+
+def create_category_tree(catalog, parent, depth, index):
+    """Create category node with its children nodes until reach the given
+    depth, where each node (not leaf) has 2 children"""
+
+    category = models.Category.objects.create(
+        title=f'{catalog.label} Category {index}',
+        parent=parent,
+        display_order=index if parent is None else None,
+        is_active=True
+    )
+
+    if parent is None:
+        catalog.root_categories.append(category)
+
+    if depth <= 1:
+        catalog.leaf_categories.append(category)
+    else:
+        for child in range(2):
+            create_category_tree(
+                catalog,
+                parent=category,
+                depth=depth - 1,
+                index=f'{index}.{child}'
+            )
+
+    return category
+
+
+def generate_catalog(label='A', categories=2, depth=2, products=12, items=3,
+                     attributes=2, options=3, promotions=1):
+    """Generate catalog of N root categories (tree of depth d), M products
+    distributed over leaf categories with K items each, attribute trees with
+    their options and deal promotions, in addition to home page content"""
+
+    catalog = Catalog(label)
+
+    supplier = models.Supplier.objects.create(title=f'{label} Supplier')
+
+    # Create the category trees.
+    for index in range(categories):
+        create_category_tree(catalog, parent=None, depth=depth, index=index)
+
+    # Create the attribute trees (root attribute and its options).
+    for index in range(attributes):
+        root = models.Attribute.objects.create(
+            title=f'{label} Attribute {index}'
+        )
+        catalog.attributes.append(root)
+
+        catalog.options.append([
+            models.Attribute.objects.create(
+                title=f'{label} Option {index}.{option}',
+                parent=root,
+                display_order=option
+            )
+            for option in range(options)
+        ])
+
+    # Connect the options of attributes with the root categories.
+    for category in catalog.root_categories:
+        for attribute_options in catalog.options:
+            for option in attribute_options:
+                models.CategoryAttribute.objects.create(
+                    category=category,
+                    attribute=option
+                )
+
+    # Create the deal promotions.
+    for index in range(promotions):
+        catalog.promotions.append(
+            models.Promotion.objects.create(
+                title=f'{label}Deal{index}'[:12],
+                discount_percentage=10 + index,
+                start_date=timezone.now() - timedelta(days=1),
+                end_date=timezone.now() + timedelta(days=30)
+            )
+        )
+
+    catalog.supplier = supplier
+    catalog.product_group = models.ProductGroup.objects.create(
+        title=f'{label} Group',
+        is_active=True
+    )
+
+    # Create the products with their items.
+    add_products(catalog, products=products, items=items)
+
+    # Create the home page content.
+    models.Banner.objects.create(
+        title=f'{label} Banner',
+        thumbnail=f'uploads/{label}-banner.jpg',
+        frontend_path=f'/{label}',
+        is_active=True
+    )
+    models.TopBanner.objects.create(
+        title=f'{label} Top Banner',
+        summary='Synthetic top banner',
+        is_active=True
+    )
+    section = models.Section.objects.create(
+        title=f'{label} Section',
+        is_active=True
+    )
+
+    for category in catalog.root_categories:
+        card = models.Card.objects.create(
+            title=f'{label} Card {category.pk}',
+            thumbnail=f'uploads/{label}-card.jpg',
+            summary='Synthetic card',
+            category=category
+        )
+        models.SectionCard.objects.create(section=section, card=card)
+
+    return catalog
+
+
+def add_products(catalog, products=12, items=3):
+    """Add M products with K items each to the given catalog, the products
+    are distributed over the leaf categories of catalog"""
+
+    start = len(catalog.products)
+
+    for index in range(start, start + products):
+        category = catalog.leaf_categories[
+            index % len(catalog.leaf_categories)
+        ]
+
+        product = models.Product.objects.create(
+            title=f'{catalog.label} Product {index}',
+            thumbnail=f'uploads/{catalog.label}-product-{index}.jpg',
+            summary='Synthetic product',
+            category=category,
+            product_group=catalog.product_group,
+            is_available=True
+        )
+        catalog.products.append(product)
+
+        # Connect the product with all options of attributes.
+        product_attributes = [
+            [
+                models.ProductAttribute.objects.create(
+                    product=product,
+                    attribute=option,
+                    is_common_attribute=False
+                )
+                for option in attribute_options
+            ]
+            for attribute_options in catalog.options
+        ]
+
+        for item_index in range(items):
+            # Set unique sku instead of the random part of generated one.
+            product_item = models.ProductItem.objects.create(
+                product=product,
+                sku=f'{catalog.label}-{index}-{item_index}'.upper(),
+                supplier=catalog.supplier,
+                list_price=10 + index + item_index,
+                stock=100,
+                is_default=item_index == 0
+            )
+            catalog.product_items.append(product_item)
+
+            # Each item has one option of each attribute.
+            for attribute_product_attributes in product_attributes:
+                models.ProductItemAttribute.objects.create(
+                    product_item=product_item,
+                    product_attribute=attribute_product_attributes[
+                        item_index % len(attribute_product_attributes)
+                    ]
+                )
+
+            # Set deal promotion for every other item.
+            if catalog.promotions and item_index % 2 == 0:
+                models.PromotionItem.objects.create(
+                    promotion=catalog.promotions[
+                        index % len(catalog.promotions)
+                    ],
+                    product_item=product_item
+                )
+
+    # Create the price records of product items.
+    models.ProductItemPrice.objects.refresh(
+        product_item_ids=[item.pk for item in catalog.product_items]
+    )
+
+    # Create the facet records of categories (see core/facets.py), the
+    # signals only queue their refresh to celery worker.
+    refresh_facets()
+
+    return catalog
+
+
+# Use local memory cache instead of redis, so the generations of models
+# aren't shared with another run.
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class CatalogTestCase(TestCase):
+    """Base test class with empty cache and generated catalog for each
+    test"""
+
+    # Set the keyword arguments of generate_catalog(), or None to create
+    # the test data by the test class itself.
+    catalog_kwargs = None
+
+    def setUp(self):
+        """Clear the cache and generate the catalog of test class"""
+
+        cache.clear()
+
+        self.client = APIClient()
+        self.catalog = None
+
+        if self.catalog_kwargs is not None:
+            self.catalog = generate_catalog(**self.catalog_kwargs)
+
+
+def generate_checkout_data():
+    """Create the instances required by checkout (country, shipping and
+    payment method and coupon) and return the request data of purchase order
+    check without cart"""
+
+    country = models.Country.objects.create(title='Iraq', iso_code='iq')
+    shipping_method = models.ShippingMethod.objects.create(title='Standard')
+    payment_method = models.PaymentMethod.objects.create(
+        title='Cash',
+        is_card=False
+    )
+
+    return {
+        'shipping': {
+            'personal_info': {
+                'first_name': 'first',
+                'last_name': 'last',
+                'email': 'test@test.com',
+                'phone_number': '+9647722243876'
+            },
+            'method': shipping_method.title,
+            'country': {
+                'title': country.title,
+                'iso_code': country.iso_code
+            },
+            'address_details': {
+                'address1': 'Street 1',
+                'address2': '',
+                'city': 'Baghdad',
+                'region': 'Baghdad',
+                'postal_code': '10001'
+            }
+        },
+        'payment': {
+            'method': payment_method.title
+        }
+    }
@@ -0,0 +1,329 @@
+""" Query count regression benchmarks for the public api endpoints"""
+
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core.tests.catalog import (generate_catalog, add_products,
+                                generate_checkout_data)
+
+import json
+import os
+import time
+
+
+# Note: the benchmark measure every endpoint of api across growing catalog
+#       sizes (the catalog generator is called again with new label to add
+#       more instances), the count of queries of each endpoint should not
+#       grow with catalog size, and the count of queries of products list
+#       should not grow with the page number.
+
+# Info: set the environment variable 'API_BENCHMARK_REPORT' to a file path
+#       to write the JSON report of benchmark, e.g.
+#
+#       API_BENCHMARK_REPORT=/tmp/report.json python manage.py test \
+#       core.tests.test_benchmarks
+
+# Important: the following endpoints are not measured:
+#            1- attribute-autocomplete: used only by admin site.
+#            2- order create: it's throttled and sends the order details to
+#               celery worker.
+#            3- order template details: it requires created purchase order.
+
+# Set the catalog sizes to measure, each one adds products to the measured
+# catalog and generates new catalog (categories, attributes, home content).
+CATALOG_SIZES = [
+    {'products': 4, 'items': 2},
+    {'products': 26, 'items': 4},
+]
+
+# Set the count of items in the cart of cart/order requests.
+CART_SIZE = 3
+
+
+def get_endpoints(catalog, checkout_data):
+    """Return list of endpoints to measure as tuples of
+    (name, method, url, data)"""
+
+    category = catalog.root_categories[0]
+    product = catalog.products[0]
+    items = catalog.product_items[:CART_SIZE]
+    option = catalog.options[0][0]
+
+    cart = {
+        'items': [{'sku': item.sku, 'quantity': 1} for item in items]
+    }
+
+    return [
+        ('home', 'get', reverse('home:home-list'), None),
+        (
+            'store-category-list',
+            'get',
+            reverse('store:store-category-list'),
+            None
+        ),
+        (
+            'store-category-details',
+            'get',
+            reverse(
+                'store:store-specific-category-details',
+                kwargs={'slug': category.slug}
+            ),
+            None
+        ),
+        (
+            'store-product-list',
+            'get',
+            reverse(
+                'store:store-specific-product-list',
+                kwargs={'category_slug': category.slug}
+            ),
+            None
+        ),
+        (
+            'store-product-list-attr',
+            'get',
+            reverse(
+                'store:store-specific-product-list',
+                kwargs={'category_slug': category.slug}
+            ),
+            {'attr': option.title}
+        ),
+        (
+            'store-product-list-price',
+            'get',
+            reverse(
+                'store:store-specific-product-list',
+                kwargs={'category_slug': category.slug}
+            ),
+            {
+                'min_price': '1',
+                'max_price': '1000',
+                'select_by': 'price-low-to-high'
+            }
+        ),
+        (
+            'store-attribute-list',
+            'get',
+            reverse(
+                'store:store-specific-attribute-list',
+                kwargs={'category_slug': category.slug}
+            ),
+            None
+        ),
+        (
+            'store-search',
+            'get',
+            reverse('store:store-search', kwargs={'query': 'product'}),
+            None
+        ),
+        (
+            'product-details',
+            'get',
+            reverse(
+                'product:specific-product-details',
+                kwargs={'slug': product.slug}
+            ),
+            None
+        ),
+        (
+            'product-details-only-item',
+            'get',
+            reverse(
+                'product:specific-product-details',
+                kwargs={'slug': product.slug}
+            ),
+            {'only_item': 'true', 'item_s': items[0].slug}
+        ),
+        (
+            'cart-check-get',
+            'get',
+            reverse('cart:cart-check'),
+            {'items_sku': ','.join(item.sku for item in items)}
+        ),
+        (
+            'cart-check-post',
+            'post',
+            reverse('cart:cart-check'),
+            {'cart': cart}
+        ),
+        (
+            'shipping-country-list',
+            'get',
+            reverse('shipping:shipping-country-list'),
+            None
+        ),
+        (
+            'shipping-method-list',
+            'get',
+            reverse('shipping:shipping-method-list'),
+            None
+        ),
+        (
+            'shipping-cost',
+            'post',
+            reverse('shipping:shipping-cost'),
+            {
+                'method': checkout_data['shipping']['method'],
+                'country': checkout_data['shipping']['country'],
+                'address_details': checkout_data['shipping'][
+                    'address_details'
+                ]
+            }
+        ),
+        (
+            'payment-method-list',
+            'get',
+            reverse('payment:payment-method-list'),
+            None
+        ),
+        (
+            'country-check',
+            'post',
+            reverse('core:country_check'),
+            checkout_data['shipping']['country']
+        ),
+        (
+            'address-check',
+            'post',
+            reverse('core:address_check'),
+            {
+                'country': checkout_data['shipping']['country'],
+                'address_details': checkout_data['shipping'][
+                    'address_details'
+                ]
+            }
+        ),
+        (
+            'personal-info-check',
+            'post',
+            reverse('core:personal_info_check'),
+            checkout_data['shipping']['personal_info']
+        ),
+        (
+            'order-check',
+            'post',
+            reverse('order:purchase-order-check'),
+            dict(checkout_data, cart=cart)
+        ),
+    ]
+
+
+# Disable the auto sync of elasticsearch documents, since the benchmarks
+# don't connect to elasticsearch server, and disable the response cache to
+# measure the queries of views themselves.
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }
+    }
+)
+class EndpointsBenchmarkTest(TestCase):
+    """Benchmark class for the count of queries of api endpoints"""
+
+    def setUp(self):
+        """Create api client and the checkout instances"""
+
+        self.client = APIClient()
+        self.checkout_data = generate_checkout_data()
+
+    def measure(self, method, url, data):
+        """Request the given url and return the measurements"""
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+
+            if method == 'post':
+                res = self.client.post(url, data, format='json')
+            else:
+                res = self.client.get(url, data)
+
+            wall_time = time.perf_counter() - start
+
+        return {
+            'status': res.status_code,
+            'empty': not (res.content and json.loads(res.content)),
+            'queries': len(queries),
+            'time_ms': round(wall_time * 1000, 2),
+            'size_bytes': len(res.content)
+        }
+
+    def write_report(self, report):
+        """Write the JSON report in case the path has been set"""
+
+        path = os.environ.get('API_BENCHMARK_REPORT', None)
+
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    def test_queries_do_not_grow_with_catalog_size(self):
+        """Test that the count of queries of each endpoint is not growing
+        with catalog size and the page number"""
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'catalog_sizes': CATALOG_SIZES,
+            'endpoints': {}
+        }
+
+        catalog = None
+
+        for index, size in enumerate(CATALOG_SIZES):
+
+            # Measure the endpoints of the first generated catalog instances
+            # while the catalog is growing.
+            if catalog is None:
+                catalog = generate_catalog(label='C', **size)
+            else:
+                add_products(catalog, **size)
+                generate_catalog(label=f'C{index}', **size)
+
+            endpoints = get_endpoints(catalog, self.checkout_data)
+
+            for name, method, url, data in endpoints:
+                report['endpoints'].setdefault(name, []).append(
+                    dict(
+                        self.measure(method, url, data),
+                        catalog=index
+                    )
+                )
+
+        # Measure the second page of products list for the biggest catalog.
+        url = reverse(
+            'store:store-specific-product-list',
+            kwargs={'category_slug': catalog.root_categories[0].slug}
+        )
+        report['pages'] = [
+            self.measure('get', url, {'page': page}) for page in (1, 2)
+        ]
+
+        self.write_report(report)
+
+        for name, measurements in report['endpoints'].items():
+            with self.subTest(endpoint=name):
+                for measurement in measurements:
+                    self.assertEqual(measurement['status'], 200)
+                    self.assertFalse(
+                        measurement['empty'],
+                        f'The response of {name} is empty'
+                    )
+
+                self.assertLessEqual(
+                    measurements[-1]['queries'],
+                    measurements[0]['queries'],
+                    f'Count of queries of {name} grows with catalog size'
+                )
+
+        self.assertEqual(report['pages'][1]['status'], 200)
+        self.assertLessEqual(
+            report['pages'][1]['queries'],
+            report['pages'][0]['queries'],
+            'Count of queries of products list grows with page number'
+        )
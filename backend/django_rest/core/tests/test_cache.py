@@ -0,0 +1,70 @@
+""" Tests for the versioned response cache"""
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+
+
+# Use local memory cache instead of redis, so the tests don't read the cached
+# responses of another run.
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class CachedResponseTest(TestCase):
+    """Test class for the cached responses of read-only views"""
+
+    def setUp(self):
+        """Create api client and sample categories"""
+
+        cache.clear()
+
+        self.client = APIClient()
+        self.url = reverse('store:store-category-list')
+
+        self.category = models.Category.objects.create(
+            title='Shirts',
+            is_active=True
+        )
+
+    def test_response_is_cached(self):
+        """Test that the second request of same url doesn't hit the
+        database even if the query string order is different"""
+
+        res = self.client.get(self.url, {'a': '1', 'b': '2'})
+
+        with self.assertNumQueries(0):
+            cached_res = self.client.get(f'{self.url}?b=2&a=1')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(cached_res.data, res.data)
+
+    def test_cached_response_invalidated_on_save(self):
+        """Test that saving an instance of model bump its generation so the
+        next request returns the changed data"""
+
+        self.client.get(self.url)
+
+        # Note: the generation is bumped after the transaction is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.title = 'Jeans'
+            self.category.save()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data[0]['title'], 'Jeans')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data, [])
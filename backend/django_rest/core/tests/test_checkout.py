@@ -0,0 +1,66 @@
+""" Tests for the checkout validation pipeline"""
+
+from django.test import TestCase, override_settings
+
+from core.tests.catalog import generate_catalog, generate_checkout_data
+from core import checkout
+
+
+# Disable the auto sync of elasticsearch documents, since the tests don't
+# connect to elasticsearch server.
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+class CheckoutPipelineTest(TestCase):
+    """Test class for the checkout validation functions"""
+
+    def setUp(self):
+        """Create sample catalog and checkout instances"""
+
+        self.catalog = generate_catalog(products=4, items=2)
+        self.data = generate_checkout_data()
+        self.data['cart'] = {
+            'items': [
+                {'sku': item.sku, 'quantity': 1}
+                for item in self.catalog.product_items[:3]
+            ]
+        }
+
+    def test_check_purchase_order(self):
+        """Test that valid purchase order data returns the details of each
+        step"""
+
+        result = checkout.check_purchase_order(self.data)
+
+        self.assertTrue(result.is_valid)
+        self.assertEqual(result.data['api'], 'order')
+        self.assertEqual(
+            result.data['shipping_details']['method'],
+            self.data['shipping']['method']
+        )
+        self.assertEqual(
+            result.data['payment_details']['method'],
+            self.data['payment']['method']
+        )
+
+    def test_check_purchase_order_reports_first_invalid_step(self):
+        """Test that the result of first invalid step is returned with the
+        name of its api"""
+
+        self.data['cart']['items'].append({'sku': 'INVALID', 'quantity': 1})
+        self.data['payment']['method'] = 'Invalid'
+
+        result = checkout.check_purchase_order(self.data)
+
+        self.assertFalse(result.is_valid)
+        self.assertEqual(result.data['api'], 'cart')
+        self.assertEqual(result.data['sku'], 'INVALID')
+
+    def test_cart_items_read_with_one_query(self):
+        """Test that the product items of cart are read once"""
+
+        instances = checkout.CheckoutInstances.for_purchase_order(self.data)
+
+        with self.assertNumQueries(0):
+            for item in self.data['cart']['items']:
+                self.assertIsNotNone(
+                    instances.get_product_item(item['sku'])
+                )
@@ -0,0 +1,241 @@
+""" Tests for the facet records of categories"""
+
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.urls import reverse
+
+from unittest import mock
+from importlib import import_module
+
+from core import models
+from core.facets import get_affected_category_ids, refresh_facets
+from core.category_tree import get_category_tree
+from core.attribute_index import get_attribute_index
+from core.tests.catalog import CatalogTestCase
+
+
+class CategoryFacetTest(CatalogTestCase):
+    """Test class for the facet records of categories"""
+
+    catalog_kwargs = {
+        'label': 'F',
+        'categories': 1,
+        'depth': 2,
+        'products': 4,
+        'items': 1,
+        'attributes': 2,
+        'options': 3
+    }
+
+    def setUp(self):
+        """Generate sample catalog with the facet records"""
+
+        super().setUp()
+
+        self.root = self.catalog.root_categories[0]
+        self.leaf = self.catalog.leaf_categories[0]
+
+        refresh_facets()
+
+    def get_url(self, category):
+        """Return the url of attributes list of the given category"""
+
+        return reverse(
+            'store:store-specific-attribute-list',
+            kwargs={'category_slug': category.slug}
+        )
+
+    def test_records_of_categories(self):
+        """Test that each category has a record for each attribute tree
+        connected to it or one of its ancestors"""
+
+        for category in (self.root, *self.catalog.leaf_categories):
+            with self.subTest(category=category.title):
+                self.assertEqual(
+                    list(
+                        models.CategoryFacet.objects.filter(
+                            category=category
+                        ).order_by('attribute_id').values_list(
+                            'title',
+                            'options'
+                        )
+                    ),
+                    [
+                        (root.title, [
+                            option.title for option in options
+                        ])
+                        for root, options in zip(
+                            self.catalog.attributes,
+                            self.catalog.options
+                        )
+                    ]
+                )
+
+    def test_options_without_products_are_excluded(self):
+        """Test that the connected options without products aren't listed
+        and the options without display order are the last"""
+
+        root = self.catalog.attributes[0]
+
+        # Note: the attribute index is refreshed after the transaction is
+        #       committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            unused = models.Attribute.objects.create(
+                title='F Unused Option',
+                parent=root,
+                display_order=0
+            )
+            unordered = models.Attribute.objects.create(
+                title='F Unordered Option',
+                parent=root
+            )
+
+        for option in (unused, unordered):
+            models.CategoryAttribute.objects.create(
+                category=self.root,
+                attribute=option
+            )
+
+        models.ProductAttribute.objects.create(
+            product=self.catalog.products[0],
+            attribute=unordered
+        )
+
+        refresh_facets([self.leaf.pk])
+
+        self.assertEqual(
+            models.CategoryFacet.objects.get(
+                category=self.leaf,
+                attribute=root
+            ).options,
+            [option.title for option in self.catalog.options[0]] +
+            [unordered.title]
+        )
+
+    def test_affected_categories(self):
+        """Test that a change of attribute affects all the categories
+        connected to its tree and their descendants, and a change of
+        category affects its descendants only"""
+
+        all_ids = {self.root.pk, *[
+            category.pk for category in self.catalog.leaf_categories
+        ]}
+
+        self.assertEqual(
+            get_affected_category_ids(
+                attribute_ids=[self.catalog.options[1][0].pk]
+            ),
+            all_ids
+        )
+        self.assertEqual(
+            get_affected_category_ids(category_ids=[self.root.pk]),
+            all_ids
+        )
+        self.assertEqual(
+            get_affected_category_ids(category_ids=[self.leaf.pk]),
+            {self.leaf.pk}
+        )
+
+    @mock.patch('core.signals.refresh_category_facets.delay')
+    def test_product_attribute_save_queues_refresh(self, delay):
+        """Test that connecting product to attribute queues the refresh of
+        facets of its attribute"""
+
+        option = models.Attribute.objects.create(
+            title='F New Option',
+            parent=self.catalog.attributes[0]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.ProductAttribute.objects.create(
+                product=self.catalog.products[1],
+                attribute=option
+            )
+
+        delay.assert_called_once_with([], [option.pk], [])
+
+    def test_attribute_list_single_query(self):
+        """Test that the attributes list of category is read from the facet
+        records with single query"""
+
+        # Warm the snapshots of current process.
+        get_category_tree()
+        get_attribute_index()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.get_url(self.leaf))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['title'], item['options']) for item in response.data],
+            [
+                (root.title, [option.title for option in options])
+                for root, options in zip(
+                    self.catalog.attributes,
+                    self.catalog.options
+                )
+            ]
+        )
+
+    def test_attribute_list_of_unknown_category(self):
+        """Test that the attributes list of unknown category returns 404"""
+
+        response = self.client.get(
+            reverse(
+                'store:store-specific-attribute-list',
+                kwargs={'category_slug': 'unknown'}
+            )
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_migration_fills_existing_catalog(self):
+        """Test that the data migration creates the same records as the
+        refresh of facets, using the historical models of the migration"""
+
+        migration = import_module('core.migrations.0009_fill_category_facets')
+
+        # Add an option without display order, so the order of options is
+        # compared too.
+        # Note: the attribute index is refreshed after the transaction is
+        #       committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            unordered = models.Attribute.objects.create(
+                title='F Unordered Option',
+                parent=self.catalog.attributes[0]
+            )
+            models.CategoryAttribute.objects.create(
+                category=self.root,
+                attribute=unordered
+            )
+            models.ProductAttribute.objects.create(
+                product=self.catalog.products[0],
+                attribute=unordered
+            )
+
+        def get_records():
+            return list(
+                models.CategoryFacet.objects.order_by(
+                    'category_id', 'attribute_id'
+                ).values_list(
+                    'category_id', 'attribute_id', 'title', 'input_class',
+                    'display_order', 'options'
+                )
+            )
+
+        refresh_facets()
+        records = get_records()
+
+        models.CategoryFacet.objects.all().delete()
+
+        state = MigrationLoader(connection).project_state(
+            ('core', '0009_fill_category_facets')
+        )
+        migration.fill_category_facets(state.apps, None)
+
+        self.assertEqual(get_records(), records)
+        self.assertEqual(
+            len([record for record in records
+                 if record[0] == self.leaf.pk]),
+            len(self.catalog.attributes)
+        )
@@ -0,0 +1,216 @@
+""" Cost benchmark of the attribute filter of products list"""
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core import models
+from core.tests.catalog import generate_catalog
+
+import json
+import os
+import statistics
+import time
+
+
+# Note: the benchmark request the products list of category with growing
+#       count of selected attributes (the options of attributes are selected
+#       one family after another), and measure the count of queries, the
+#       count of joins and the length of SQL of all the queries, and the
+#       request time, where the queries and joins should not grow with the
+#       count of selected attributes and the SQL length grows only by the ids
+#       of selected attributes (the old cartesian product of families was
+#       growing exponentially).
+
+# Info: set the environment variable 'FILTER_BENCHMARK_REPORT' to a file path
+#       to write the JSON report of benchmark, e.g.
+#
+#       FILTER_BENCHMARK_REPORT=/tmp/report.json python manage.py test \
+#       core.tests.test_filter_benchmarks
+
+# Set the size of generated catalog (the products fit in the first page).
+CATALOG_SIZE = {'products': 12, 'items': 1, 'attributes': 3, 'options': 4}
+
+# Set the count of measured requests of each selection.
+REPEATS = 3
+
+
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    PRODUCT_LISTING_ENGINE='sql',
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class AttributeFilterBenchmarkTest(TestCase):
+    """Benchmark class for the cost of attribute filter of products list"""
+
+    def setUp(self):
+        """Create api client and the catalog where each product has part of
+        the options of attributes"""
+
+        cache.clear()
+
+        self.client = APIClient()
+        self.catalog = generate_catalog(
+            label='AF',
+            categories=1,
+            depth=2,
+            **CATALOG_SIZE
+        )
+
+        # The generator connects each product with all the options, so
+        # disconnect every third option to have different matches.
+        for index, product in enumerate(self.catalog.products):
+            for family, options in enumerate(self.catalog.options):
+                for position, option in enumerate(options):
+                    if (index + position * (family + 1)) % 3 == 0:
+                        models.ProductAttribute.objects.filter(
+                            product=product,
+                            attribute=option
+                        ).delete()
+
+        self.url = reverse(
+            'store:store-specific-product-list',
+            kwargs={'category_slug': self.catalog.root_categories[0].slug}
+        )
+
+    def get_selections(self):
+        """Return list of growing selections of options, where the options
+        are selected one family after another"""
+
+        options = [
+            options[position]
+            for position in range(CATALOG_SIZE['options'])
+            for options in self.catalog.options
+        ]
+
+        return [options[:count] for count in range(1, len(options) + 1)]
+
+    def get_expected(self, selection):
+        """Return set of slugs of products those have any of the selected
+        options of each family"""
+
+        families = {}
+        for option in selection:
+            families.setdefault(option.tree_id, set()).add(option.pk)
+
+        product_attributes = {}
+        for product_id, attribute_id in \
+                models.ProductAttribute.objects.values_list(
+                    'product_id',
+                    'attribute_id'
+                ):
+            product_attributes.setdefault(product_id, set()).add(
+                attribute_id
+            )
+
+        return set(
+            product.slug for product in self.catalog.products
+            if all(
+                product_attributes.get(product.pk, set()) & option_ids
+                for option_ids in families.values()
+            )
+        )
+
+    def measure(self, selection):
+        """Request the products list filtered by the given selection and
+        return the measurements"""
+
+        data = {'attr': ','.join(option.title for option in selection)}
+
+        times = []
+
+        for _ in range(REPEATS):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                res = self.client.get(self.url, data)
+                times.append(time.perf_counter() - start)
+
+        sql = [query['sql'].upper() for query in queries]
+
+        return {
+            'selected': len(selection),
+            'families': len(set(option.tree_id for option in selection)),
+            'status': res.status_code,
+            'count': res.data['count'],
+            'slugs': set(product['slug'] for product in res.data['results']),
+            'queries': len(sql),
+            'joins': sum(query.count(' JOIN ') for query in sql),
+            'sql_length': sum(len(query) for query in sql),
+            'time_ms': round(statistics.median(times) * 1000, 2)
+        }
+
+    def write_report(self, report):
+        """Write the JSON report in case the path has been set"""
+
+        path = os.environ.get('FILTER_BENCHMARK_REPORT', None)
+
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    def test_filter_cost_does_not_grow_with_selection(self):
+        """Test that the filtered products match the selected options, and
+        the count of queries and joins don't grow with the count of selected
+        options"""
+
+        measurements = []
+
+        for selection in self.get_selections():
+            measurement = self.measure(selection)
+            measurement['expected'] = self.get_expected(selection)
+            measurements.append(measurement)
+
+        self.write_report({
+            'created_at': timezone.now().isoformat(),
+            'catalog_size': CATALOG_SIZE,
+            'measurements': [
+                {
+                    key: value for key, value in measurement.items()
+                    if key not in ('slugs', 'expected')
+                }
+                for measurement in measurements
+            ]
+        })
+
+        for measurement in measurements:
+            with self.subTest(selected=measurement['selected']):
+                self.assertEqual(measurement['status'], 200)
+                self.assertEqual(
+                    measurement['slugs'],
+                    measurement['expected']
+                )
+                self.assertEqual(
+                    measurement['count'],
+                    len(measurement['expected'])
+                )
+
+        # Compare the selections of all the families, since the first
+        # families don't have the join of selected items of products.
+        full = [
+            measurement for measurement in measurements
+            if measurement['families'] == len(self.catalog.options)
+        ]
+
+        self.assertTrue(full[0]['expected'])
+
+        for measurement in full[1:]:
+            with self.subTest(selected=measurement['selected']):
+                self.assertLessEqual(
+                    measurement['queries'],
+                    full[0]['queries'],
+                    'Count of queries grows with the selected options'
+                )
+                self.assertLessEqual(
+                    measurement['joins'],
+                    full[0]['joins'],
+                    'Count of joins grows with the selected options'
+                )
@@ -0,0 +1,240 @@
+""" Tests for the bulk search indexer of product items"""
+
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, override_settings
+
+from unittest import mock
+from importlib import import_module
+
+from core import models
+from core.indexer import (get_index_actions, get_suggestion_actions,
+                          get_product_actions, save_search_documents)
+from core.tests.catalog import generate_catalog, add_products
+
+
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+class IndexerTest(TestCase):
+    """Test class for building the documents of product items"""
+
+    def setUp(self):
+        """Create sample catalog with a common attribute"""
+
+        self.catalog = generate_catalog(label='I', products=2, items=2)
+
+        color = models.Attribute.objects.create(title='I Color')
+        red = models.Attribute.objects.create(title='I Red', parent=color)
+
+        for product in self.catalog.products:
+            models.ProductAttribute.objects.create(
+                product=product,
+                attribute=red,
+                is_common_attribute=True
+            )
+
+    def test_document_matches_model_property(self):
+        """Test that the indexed product_item_info is the same as the one
+        computed by the model property"""
+
+        actions = get_index_actions(
+            [item.pk for item in self.catalog.product_items]
+        )
+
+        self.assertEqual(len(actions), len(self.catalog.product_items))
+
+        for action in actions:
+            item = models.ProductItem.objects.get(pk=action['_id'])
+
+            self.assertEqual(action['_op_type'], 'index')
+            self.assertEqual(action['_source']['sku'], item.sku)
+            self.assertEqual(
+                action['_source']['product_item_info'],
+                item.product_item_info
+            )
+
+            # The keyword fields of faceted search.
+            self.assertIn('I Color', action['_source']['attributes'])
+            self.assertIn('I Red', action['_source']['attributes'])
+            self.assertIn(
+                'I Color >> I Red',
+                action['_source']['attribute_facets']
+            )
+            self.assertEqual(
+                action['_source']['category_slugs'][-1],
+                item.product.category.slug
+            )
+            self.assertEqual(
+                action['_source']['category_slugs'][0],
+                item.product.category.get_root().slug
+            )
+            self.assertEqual(
+                action['_source']['effective_price'],
+                float(
+                    item.deal_price.amount if item.deal_price
+                    else item.list_price.amount
+                )
+            )
+
+    def test_migration_fills_search_columns(self):
+        """Test that the data migration sets the same search columns as the
+        indexer, using the historical models of the migration"""
+
+        migration = import_module('core.migrations.0010_fill_search_columns')
+
+        product_item_ids = [item.pk for item in self.catalog.product_items]
+
+        def get_columns():
+            return list(
+                models.ProductItem.objects.filter(
+                    pk__in=product_item_ids
+                ).order_by('pk').values_list(
+                    'search_document',
+                    'search_vector'
+                )
+            )
+
+        save_search_documents(get_index_actions(product_item_ids))
+        columns = get_columns()
+
+        models.ProductItem.objects.update(
+            search_document='',
+            search_vector=None
+        )
+
+        state = MigrationLoader(connection).project_state(
+            ('core', '0010_fill_search_columns')
+        )
+        migration.fill_search_columns(state.apps, None)
+
+        self.assertEqual(get_columns(), columns)
+        self.assertTrue(all(vector for _, vector in columns))
+
+    def test_deleted_product_item_is_removed(self):
+        """Test that the product item that doesn't exist is deleted from the
+        index"""
+
+        item = self.catalog.product_items[0]
+        pk = item.pk
+        item.delete()
+
+        actions = get_index_actions([pk])
+
+        self.assertEqual(actions[0]['_op_type'], 'delete')
+        self.assertEqual(actions[0]['_id'], pk)
+
+    def test_constant_query_count(self):
+        """Test that building the documents needs the same count of queries
+        whatever the count of product items is"""
+
+        with self.assertNumQueries(5):
+            get_index_actions(
+                [item.pk for item in self.catalog.product_items]
+            )
+
+        add_products(self.catalog, products=6, items=3)
+
+        with self.assertNumQueries(5):
+            get_index_actions(
+                [item.pk for item in self.catalog.product_items]
+            )
+
+    def test_suggestion_actions(self):
+        """Test that the suggestions of available products are indexed and
+        the unavailable ones are removed"""
+
+        available, unavailable = self.catalog.products[:2]
+
+        unavailable.is_available = False
+        unavailable.save()
+
+        actions = {
+            action['_id']: action
+            for action in get_suggestion_actions(
+                [available.pk, unavailable.pk]
+            )
+        }
+
+        inputs = [
+            title
+            for suggest in actions[available.pk]['_source']['suggest']
+            for title in suggest['input']
+        ]
+
+        self.assertIn(available.title, inputs)
+        self.assertIn(available.category.title, inputs)
+        self.assertIn('I Red', inputs)
+        self.assertEqual(actions[unavailable.pk]['_op_type'], 'delete')
+
+    def test_product_listing_actions(self):
+        """Test that the listing document of product has the ancestors of
+        its category and the attributes of its items"""
+
+        product = self.catalog.products[0]
+
+        source = get_product_actions([product.pk])[0]['_source']
+
+        self.assertEqual(
+            source['category_ids'],
+            [
+                category.pk for category in
+                product.category.get_ancestors(include_self=True)
+            ]
+        )
+        self.assertTrue(source['has_items'])
+        self.assertEqual(
+            len(source['items']),
+            product.product_items_product.count()
+        )
+        self.assertEqual(
+            [item['is_default'] for item in source['items']].count(True),
+            1
+        )
+        # The flagged item is the default item of product.
+        self.assertEqual(
+            next(item for item in source['items'] if item['is_default']),
+            next(
+                item for item in source['items']
+                if item['id'] == product.item_instance().pk
+            )
+        )
+        self.assertEqual(
+            set(item['product_id'] for item in source['items']),
+            {product.pk}
+        )
+
+        for item in product.product_items_product.all():
+            item_source = next(
+                obj for obj in source['items'] if obj['id'] == item.pk
+            )
+
+            self.assertEqual(
+                set(item_source['attribute_ids']),
+                set(
+                    item.product_item_attributes_product_item.values_list(
+                        'product_attribute__attribute', flat=True
+                    )
+                )
+            )
+            self.assertTrue(
+                set(item_source['attribute_ids']) <=
+                set(source['attribute_ids'])
+            )
+
+    @mock.patch('core.signals.add_pending_product_items', return_value=False)
+    def test_category_save_queues_its_product_items(self, add_pending):
+        """Test that renaming a root category queues the product items of
+        its descendant categories"""
+
+        category = self.catalog.root_categories[0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            category.title = 'I Renamed'
+            category.save()
+
+        expected = set(
+            item.pk for item in self.catalog.product_items
+            if item.product.category.get_root() == category
+        )
+
+        self.assertTrue(expected)
+        self.assertEqual(set(add_pending.call_args[0][0]), expected)
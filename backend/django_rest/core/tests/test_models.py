@@ -1,12 +1,22 @@
 """ Tests for your project models code"""
 
 from unittest.mock import patch
-from django.test import TestCase
+from django.test import TestCase, override_settings
 # from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.utils import timezone
+
+from django.core.management import call_command
+from django.apps import apps
+
+from datetime import timedelta
+from io import StringIO
+from importlib import import_module
 
 from core import models
+from core.tasks import set_product_item_promotion
+from core.tests.catalog import generate_catalog
 
 
 # Notice:
@@ -140,3 +150,347 @@ class ModelTest(TestCase):
         )
 
         self.assertEqual(str(product), f'{category.title} >> {product.title}')
+
+
+# Disable the auto sync of elasticsearch documents, since the tests don't
+# connect to elasticsearch server.
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+class ProductPriceQuerySetTest(TestCase):
+    """Test class for effective price annotations of product querysets"""
+
+    def setUp(self):
+        """Create sample product with items and deal promotion"""
+
+        category = models.Category.objects.create(
+            title='Shirts',
+            slug='shirts'
+        )
+        supplier = models.Supplier.objects.create(title='Supplier')
+
+        self.product = models.Product.objects.create(
+            title='AXC Jeans',
+            slug='axc-jeans',
+            summary='Text',
+            category=category
+        )
+
+        # The list price of 10% discount is 2.5, so the discount amount will
+        # be rounded half to even as python round() method.
+        self.deal_item = models.ProductItem.objects.create(
+            product=self.product,
+            supplier=supplier,
+            list_price=25
+        )
+        self.default_item = models.ProductItem.objects.create(
+            product=self.product,
+            supplier=supplier,
+            list_price=30,
+            is_default=True
+        )
+
+        self.promotion = models.Promotion.objects.create(
+            title='Deal',
+            discount_percentage=10,
+            start_date=timezone.now() - timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1)
+        )
+        models.PromotionItem.objects.create(
+            promotion=self.promotion,
+            product_item=self.deal_item
+        )
+
+    def test_item_effective_price_match_deal_price(self):
+        """Test that effective price annotation match deal_price property"""
+
+        item = models.ProductItem.objects.with_effective_price().get(
+            pk=self.deal_item.pk
+        )
+
+        self.assertEqual(item.deal_price_amount, item.deal_price.amount)
+        self.assertEqual(item.effective_price_amount, item.deal_price.amount)
+
+    def test_item_effective_price_of_inactive_deal(self):
+        """Test that effective price is the list price if the latest deal
+        promotion is not active"""
+
+        self.promotion.end_date = timezone.now() - timedelta(minutes=1)
+        self.promotion.save()
+
+        item = models.ProductItem.objects.with_effective_price().get(
+            pk=self.deal_item.pk
+        )
+
+        self.assertIsNone(item.deal_price)
+        self.assertIsNone(item.deal_price_amount)
+        self.assertEqual(item.effective_price_amount, item.list_price.amount)
+
+    def test_product_effective_price_of_selected_or_default_item(self):
+        """Test that product effective price is for the selected item if
+        provided otherwise the default item"""
+
+        product = models.Product.objects.with_item_effective_price().get(
+            pk=self.product.pk
+        )
+
+        self.assertIsNone(product.item_deal_price_amount)
+        self.assertEqual(
+            product.item_effective_price_amount,
+            self.default_item.list_price.amount
+        )
+
+        product = models.Product.objects.with_item_effective_price(
+            items=[self.deal_item]
+        ).get(pk=self.product.pk)
+
+        self.assertEqual(
+            product.item_effective_price_amount,
+            self.product.item_deal_price(item=self.deal_item).amount
+        )
+
+    def test_product_item_price_record(self):
+        """Test that the price record store the deal price and promotion of
+        product item and the properties read from it"""
+
+        models.ProductItemPrice.objects.refresh(
+            product_item_ids=[self.deal_item.pk, self.default_item.pk]
+        )
+
+        record = models.ProductItemPrice.objects.get(
+            product_item=self.deal_item
+        )
+
+        self.assertEqual(record.deal_price.amount, 23)
+        self.assertEqual(record.effective_price, record.deal_price)
+        self.assertEqual(record.promotion, self.promotion)
+        self.assertEqual(record.expires_at, self.promotion.end_date)
+
+        # Change the promotion without refresh the record, so the properties
+        # will read the value of record.
+        models.Promotion.objects.filter(pk=self.promotion.pk).update(
+            discount_percentage=50
+        )
+        item = models.ProductItem.objects.get(pk=self.deal_item.pk)
+
+        self.assertEqual(item.deal_price, record.deal_price)
+        self.assertEqual(
+            item.latest_deal_promotion_item_title,
+            self.promotion.title
+        )
+
+        record = models.ProductItemPrice.objects.get(
+            product_item=self.default_item
+        )
+
+        self.assertIsNone(record.deal_price)
+        self.assertIsNone(record.promotion)
+        self.assertIsNone(record.expires_at)
+
+    @patch('core.tasks.index_product_items.apply_async')
+    @patch('home.tasks.rebuild_home_payload.apply_async')
+    @patch('core.signals.refresh_product_item_prices.delay')
+    def test_category_promotion_refreshes_prices_once(self, delay, *mocks):
+        """Test that the promotion of category is connected to its product
+        items and their price records are refreshed by the task itself, not
+        by a task for each promotion item"""
+
+        # Note: the category tree snapshot is refreshed after the
+        #       transaction is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            category = models.Category.objects.create(title='Jeans')
+            models.Product.objects.filter(pk=self.product.pk).update(
+                category=category
+            )
+
+        promotion = models.Promotion.objects.create(
+            title='Jeans Deal',
+            discount_percentage=5,
+            start_date=timezone.now() - timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_product_item_promotion(category.pk, promotion.pk)
+
+        delay.assert_not_called()
+        self.assertEqual(
+            set(
+                models.PromotionItem.objects.filter(
+                    promotion=promotion
+                ).values_list('product_item', flat=True)
+            ),
+            {self.deal_item.pk, self.default_item.pk}
+        )
+        self.assertEqual(
+            set(
+                models.ProductItemPrice.objects.values_list(
+                    'product_item',
+                    flat=True
+                )
+            ),
+            {self.deal_item.pk, self.default_item.pk}
+        )
+
+
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+class AttributeSignatureTest(TestCase):
+    """Test class for the attribute signatures of products and items"""
+
+    def setUp(self):
+        """Generate sample catalog with attributes of products and items"""
+
+        self.catalog = generate_catalog(
+            'S',
+            categories=1,
+            depth=1,
+            products=2,
+            items=2,
+            attributes=2,
+            options=2
+        )
+        self.product = self.catalog.products[0]
+        self.item = self.catalog.product_items[0]
+
+    def get_item_attribute_ids(self, item):
+        """Return sorted 'pk' of attributes of the given item"""
+
+        return sorted(attribute.pk for attribute in item.attributes)
+
+    def test_signatures_match_attributes(self):
+        """Test that the signatures are set by the signals of attributes"""
+
+        self.product.refresh_from_db()
+        self.item.refresh_from_db()
+
+        self.assertEqual(
+            self.product.attribute_ids,
+            sorted(attribute.pk for attribute in self.product.attributes)
+        )
+        self.assertEqual(
+            self.item.attribute_ids,
+            self.get_item_attribute_ids(self.item)
+        )
+
+    def test_signatures_follow_deleted_attributes(self):
+        """Test that deleting attribute of product removes it from the
+        signatures of product and its items"""
+
+        option = self.catalog.options[0][0]
+
+        models.ProductAttribute.objects.get(
+            product=self.product,
+            attribute=option
+        ).delete()
+
+        self.product.refresh_from_db()
+        self.item.refresh_from_db()
+
+        self.assertNotIn(option.pk, self.product.attribute_ids)
+        self.assertNotIn(option.pk, self.item.attribute_ids)
+        self.assertEqual(
+            self.item.attribute_ids,
+            self.get_item_attribute_ids(self.item)
+        )
+
+    def test_stale_instance_save_keeps_signature(self):
+        """Test that saving an instance loaded before the change of its
+        attributes doesn't write back its stale signature"""
+
+        stale = models.Product.objects.get(pk=self.product.pk)
+
+        models.ProductAttribute.objects.filter(product=self.product).delete()
+
+        stale.summary = 'Changed'
+        stale.save()
+
+        stale.refresh_from_db()
+
+        self.assertEqual(stale.attribute_ids, [])
+
+    def test_array_lookups(self):
+        """Test that the products and items are matched by the array lookups
+        of their signatures"""
+
+        options = self.catalog.options
+
+        self.assertEqual(
+            set(
+                models.Product.objects.filter(
+                    attribute_ids__contains=[options[0][0].pk,
+                                             options[1][1].pk]
+                )
+            ),
+            set(self.catalog.products)
+        )
+        self.assertEqual(
+            list(
+                models.ProductItem.objects.filter(
+                    product=self.product,
+                    attribute_ids__overlap=[options[0][1].pk]
+                )
+            ),
+            [self.catalog.product_items[1]]
+        )
+
+    def test_matched_attributes_count(self):
+        """Test that the items are annotated with the count of the given
+        attributes those are in their signatures"""
+
+        options = self.catalog.options
+
+        # Note: the item of index 0 has the first option of each attribute
+        #       and the item of index 1 has the second ones.
+        self.assertEqual(
+            list(
+                models.ProductItem.objects.filter(
+                    product=self.product
+                ).with_matched_attributes_count(
+                    [options[0][0].pk, options[1][0].pk, options[1][1].pk]
+                ).order_by('pk').values_list(
+                    'matched_attributes_count',
+                    flat=True
+                )
+            ),
+            [2, 1]
+        )
+
+    def test_backfill_command(self):
+        """Test that the backfill command sets the signatures of existing
+        rows"""
+
+        models.Product.objects.update(attribute_ids=[])
+        models.ProductItem.objects.update(attribute_ids=[])
+
+        call_command('backfill_attribute_ids', chunk_size=1, stdout=StringIO())
+
+        self.item.refresh_from_db()
+
+        self.assertEqual(
+            self.item.attribute_ids,
+            self.get_item_attribute_ids(self.item)
+        )
+        self.assertFalse(
+            models.Product.objects.filter(attribute_ids=[]).exists()
+        )
+
+    def test_migration_backfills_signatures(self):
+        """Test that the migration of signatures sets the signatures of the
+        rows those existed before it"""
+
+        migration = import_module('core.migrations.0007_attribute_ids')
+
+        models.Product.objects.update(attribute_ids=[])
+        models.ProductItem.objects.update(attribute_ids=[])
+
+        migration.backfill_attribute_ids(apps, None)
+
+        self.product.refresh_from_db()
+        self.item.refresh_from_db()
+
+        self.assertEqual(
+            self.product.attribute_ids,
+            sorted(attribute.pk for attribute in self.product.attributes)
+        )
+        self.assertEqual(
+            self.item.attribute_ids,
+            self.get_item_attribute_ids(self.item)
+        )
@@ -0,0 +1,143 @@
+""" Tests for the circuit breaker and client of search engine"""
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from elasticsearch import ConnectionError as ElasticsearchConnectionError
+from elasticsearch_dsl import Search
+
+from unittest import mock
+
+from core.breaker import CircuitBreaker
+from core.search import (execute_elasticsearch, get_search_metrics,
+                         SearchUnavailable)
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class CircuitBreakerTest(TestCase):
+    """Test class for the circuit breaker with shared state"""
+
+    def setUp(self):
+        """Clear the shared state of breakers"""
+
+        cache.clear()
+
+    def get_breaker(self):
+        """Return new instance of breaker, as each worker has its own"""
+
+        return CircuitBreaker(
+            'test',
+            failure_threshold=2,
+            failure_window=30,
+            reset_timeout=30
+        )
+
+    def test_breaker_opens_after_threshold(self):
+        """Test that the breaker is opened for all the workers after the
+        count of failures reached the threshold"""
+
+        breaker = self.get_breaker()
+
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.record_failure())
+        self.assertTrue(breaker.allow_request())
+        self.assertTrue(breaker.record_failure())
+
+        self.assertFalse(self.get_breaker().allow_request())
+        self.assertEqual(self.get_breaker().get_state()[0], 'open')
+
+    def test_half_open_breaker_allows_one_trial(self):
+        """Test that after the reset timeout only one trial request is
+        allowed, and its success closes the breaker"""
+
+        breaker = self.get_breaker()
+        breaker.trip()
+
+        # Simulate the expiry of open state.
+        cache.delete(breaker.open_key)
+
+        trial = self.get_breaker()
+
+        self.assertTrue(trial.allow_request())
+        self.assertFalse(self.get_breaker().allow_request())
+
+        trial.record_success()
+
+        self.assertEqual(self.get_breaker().get_state(), ('closed', 0))
+        self.assertTrue(self.get_breaker().allow_request())
+
+    def test_failed_trial_opens_breaker_again(self):
+        """Test that the failure of trial request opens the breaker"""
+
+        breaker = self.get_breaker()
+        breaker.trip()
+        cache.delete(breaker.open_key)
+
+        trial = self.get_breaker()
+
+        self.assertTrue(trial.allow_request())
+        self.assertTrue(trial.record_failure())
+        self.assertEqual(self.get_breaker().get_state()[0], 'open')
+
+
+@override_settings(
+    SEARCH_BREAKER_FAILURE_THRESHOLD=2,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class ExecuteElasticsearchTest(TestCase):
+    """Test class for the search requests of elasticsearch"""
+
+    def setUp(self):
+        """Clear the shared state of breaker and metrics"""
+
+        cache.clear()
+
+    @mock.patch(
+        'elasticsearch_dsl.Search.execute',
+        autospec=True,
+        side_effect=ElasticsearchConnectionError('Elasticsearch is down')
+    )
+    def test_unavailable_cluster_is_not_requested(self, execute):
+        """Test that the requests are not sent after the breaker trips, and
+        the metrics count the failures and trips"""
+
+        for _ in range(2):
+            with self.assertRaises(ElasticsearchConnectionError):
+                execute_elasticsearch(Search())
+
+        with self.assertRaises(SearchUnavailable):
+            execute_elasticsearch(Search())
+
+        self.assertEqual(execute.call_count, 2)
+
+        metrics = get_search_metrics()
+
+        self.assertEqual(metrics['failures'], 2)
+        self.assertEqual(metrics['breaker_trips'], 1)
+        self.assertEqual(metrics['breaker_rejections'], 1)
+        self.assertEqual(metrics['breaker_state'], 'open')
+        self.assertEqual(metrics['latency_count'], 2)
+
+    @mock.patch('elasticsearch_dsl.Search.execute', autospec=True)
+    def test_request_timeout(self, execute):
+        """Test that the search is sent with the request timeout and without
+        retries"""
+
+        with override_settings(SEARCH_REQUEST_TIMEOUT=0.5):
+            execute_elasticsearch(Search())
+
+        client = execute.call_args[0][0]._using
+
+        self.assertEqual(client._request_timeout, 0.5)
+        self.assertEqual(client._max_retries, 0)
+        self.assertEqual(get_search_metrics()['requests'], 1)
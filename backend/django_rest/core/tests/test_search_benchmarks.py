@@ -0,0 +1,265 @@
+""" Latency and relevance benchmarks of the search backends"""
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core.documents import ProductItemDocument
+from core.indexer import (index_product_items, get_index_actions,
+                          send_actions)
+from core.models import ProductItem
+from core.tests.catalog import generate_catalog
+
+import json
+import os
+import re
+import statistics
+import time
+
+
+# Note: the benchmark search the generated catalog with the same queries by
+#       each search backend (see core/search.py) through the search endpoint,
+#       and measure:
+#       1- latency: the median and 95th percentile of request time.
+#       2- relevance: recall of the first page, where the expected products
+#          of query are the ones those have all the query words within their
+#          product_item_info, and the typo queries (deleted or swapped
+#          letters) expect the products of their correct queries.
+
+# Info: set the environment variable 'SEARCH_BENCHMARK_REPORT' to a file path
+#       to write the JSON report of benchmark, e.g.
+#
+#       SEARCH_BENCHMARK_REPORT=/tmp/report.json python manage.py test \
+#       core.tests.test_search_benchmarks
+
+# Important: elasticsearch backend is measured only if the environment
+#            variable 'SEARCH_BENCHMARK_ELASTICSEARCH' is set, since the
+#            documents of generated catalog are indexed into (and deleted
+#            from) the index of ProductItemDocument, so use a disposable
+#            cluster.
+
+# Set the size of generated catalog and the page size of search pagination.
+CATALOG_SIZE = {'products': 24, 'items': 2}
+PAGE_SIZE = 12
+
+# Set the count of measured requests of each query.
+REPEATS = 3
+
+BACKENDS = {
+    'postgres': 'core.search.PostgresSearchBackend',
+    'elasticsearch': 'core.search.ElasticsearchBackend'
+}
+
+
+def normalize(value):
+    """Return set of words of the given value normalized as
+    product_item_info"""
+
+    return set(re.sub(r"\W+", " ", value.lower()).split())
+
+
+def add_typo(query, kind):
+    """Return the query with a typo (deleted or swapped letters) in its
+    longest word"""
+
+    words = query.split(' ')
+    index = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[index]
+
+    if kind == 'deletion':
+        words[index] = word[:3] + word[4:]
+    else:
+        words[index] = word[:2] + word[3] + word[2] + word[4:]
+
+    return ' '.join(words)
+
+
+def get_queries(catalog):
+    """Return list of queries as tuples of (kind, query, correct query)"""
+
+    queries = []
+
+    for product in catalog.products[::4]:
+        queries.append(('exact', product.title, product.title))
+
+    for category in catalog.leaf_categories:
+        queries.append(('exact', category.title, category.title))
+
+    for options in catalog.options:
+        queries.append(('exact', options[0].title, options[0].title))
+
+    queries += [
+        (kind, add_typo(query, kind), query)
+        for kind in ('deletion', 'transposition')
+        for _, query, _ in list(queries)
+    ]
+
+    return queries
+
+
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    PRODUCT_LISTING_ENGINE='sql'
+)
+class SearchBackendsBenchmarkTest(TestCase):
+    """Benchmark class for the latency and relevance of search backends"""
+
+    def setUp(self):
+        """Create api client and the catalog with stored search columns"""
+
+        self.client = APIClient()
+        self.catalog = generate_catalog(label='B', **CATALOG_SIZE)
+
+        self.product_item_ids = [
+            item.pk for item in self.catalog.product_items
+        ]
+
+        with override_settings(SEARCH_BACKEND=BACKENDS['postgres']):
+            index_product_items(self.product_item_ids)
+
+        self.backends = ['postgres']
+
+        if os.environ.get('SEARCH_BENCHMARK_ELASTICSEARCH', None):
+            send_actions(get_index_actions(self.product_item_ids), 500)
+            ProductItemDocument._index.refresh()
+
+            self.backends.append('elasticsearch')
+
+    def tearDown(self):
+        """Delete the documents of catalog from elasticsearch"""
+
+        if 'elasticsearch' in self.backends:
+            send_actions(
+                [
+                    {
+                        '_op_type': 'delete',
+                        '_index': ProductItemDocument._index._name,
+                        '_id': pk
+                    } for pk in self.product_item_ids
+                ],
+                500
+            )
+
+    def get_expected(self, query):
+        """Return set of slugs of products those have all the words of the
+        given query"""
+
+        words = normalize(query)
+
+        return set(
+            item.product.slug for item in ProductItem.objects.filter(
+                pk__in=self.product_item_ids
+            ).select_related('product')
+            if words <= normalize(item.search_document)
+        )
+
+    def measure(self, backend, query, expected):
+        """Search the given query by the given backend and return the
+        measurements"""
+
+        url = reverse('store:store-search', kwargs={'query': query})
+
+        times = []
+
+        with override_settings(SEARCH_BACKEND=BACKENDS[backend]):
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                res = self.client.get(url)
+                times.append(time.perf_counter() - start)
+
+        slugs = [product['slug'] for product in res.data['results']]
+
+        return {
+            'status': res.status_code,
+            'count': res.data['count'],
+            'time_ms': round(statistics.median(times) * 1000, 2),
+            'recall': round(
+                len(set(slugs) & expected) /
+                min(len(expected), PAGE_SIZE), 2
+            ) if expected else None,
+            'top_hit': slugs[0] in expected if slugs and expected else None
+        }
+
+    def write_report(self, report):
+        """Write the JSON report in case the path has been set"""
+
+        path = os.environ.get('SEARCH_BENCHMARK_REPORT', None)
+
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    def summarize(self, measurements):
+        """Return the summary of latency and relevance of the given
+        measurements"""
+
+        times = sorted(
+            measurement['time_ms'] for measurement in measurements
+        )
+        recalls = [
+            measurement['recall'] for measurement in measurements
+            if measurement['recall'] is not None
+        ]
+
+        return {
+            'median_ms': round(statistics.median(times), 2),
+            'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))],
+            'mean_recall': round(statistics.mean(recalls), 2)
+            if recalls else None,
+            'top_hit_rate': round(
+                statistics.mean(
+                    measurement['top_hit'] is True
+                    for measurement in measurements
+                ),
+                2
+            )
+        }
+
+    def test_search_backends_latency_and_relevance(self):
+        """Test that the search backends find the expected products of the
+        exact queries, and report their latency and relevance"""
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'catalog_size': CATALOG_SIZE,
+            'queries': {},
+            'summary': {}
+        }
+
+        queries = get_queries(self.catalog)
+
+        for kind, query, correct_query in queries:
+            expected = self.get_expected(correct_query)
+
+            report['queries'][query] = {
+                'kind': kind,
+                'expected': len(expected),
+                'backends': {
+                    backend: self.measure(backend, query, expected)
+                    for backend in self.backends
+                }
+            }
+
+        for backend in self.backends:
+            for kind in ('exact', 'deletion', 'transposition'):
+                report['summary'][f'{backend}:{kind}'] = self.summarize([
+                    measurements['backends'][backend]
+                    for measurements in report['queries'].values()
+                    if measurements['kind'] == kind
+                ])
+
+        self.write_report(report)
+
+        for query, measurements in report['queries'].items():
+            for backend, measurement in measurements['backends'].items():
+                with self.subTest(backend=backend, query=query):
+                    self.assertEqual(measurement['status'], 200)
+
+        # The full text search finds all the expected products of the exact
+        # queries.
+        self.assertEqual(
+            report['summary']['postgres:exact']['mean_recall'],
+            1
+        )
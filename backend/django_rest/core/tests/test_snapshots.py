@@ -0,0 +1,229 @@
+""" Tests for the category tree snapshot and attribute index"""
+
+from core import models
+from core.category_tree import get_category_tree
+from core.attribute_index import get_attribute_index
+from core.tests.catalog import CatalogTestCase
+
+
+class CategoryTreeTest(CatalogTestCase):
+    """Test class for the category tree snapshot"""
+
+    def setUp(self):
+        """Create sample tree of categories"""
+
+        super().setUp()
+
+        self.root = models.Category.objects.create(title='Men')
+        self.shirts = models.Category.objects.create(
+            title='Shirts',
+            parent=self.root
+        )
+        self.jeans = models.Category.objects.create(
+            title='Jeans',
+            parent=self.root,
+            is_active=False
+        )
+        self.linen = models.Category.objects.create(
+            title='Linen',
+            parent=self.shirts
+        )
+        self.other = models.Category.objects.create(title='Women')
+
+        for category in (self.root, self.shirts, self.jeans, self.linen,
+                         self.other):
+            category.refresh_from_db()
+
+    def get_pks(self, queryset):
+        """Return list of primary keys of the given queryset"""
+
+        return [category.pk for category in queryset]
+
+    def test_lookups_match_tree_methods(self):
+        """Test that the lookups of snapshot return the same categories as
+        the methods of MPTT tree"""
+
+        tree = get_category_tree()
+
+        for category in (self.root, self.shirts, self.jeans, self.linen):
+            with self.subTest(category=category.title):
+                self.assertEqual(
+                    [node.pk for node in tree.get_children(category.pk)],
+                    self.get_pks(category.get_children())
+                )
+                self.assertEqual(
+                    [node.pk for node in tree.get_ancestors(
+                        category.pk,
+                        include_self=True
+                    )],
+                    self.get_pks(category.get_ancestors(include_self=True))
+                )
+                self.assertEqual(
+                    tree.get_root(category.pk).pk,
+                    category.get_root().pk
+                )
+                self.assertEqual(
+                    sorted(tree.get_leafnode_ids(
+                        category.pk,
+                        include_self=True
+                    )),
+                    sorted(self.get_pks(
+                        category.get_leafnodes(include_self=True)
+                    ))
+                )
+                self.assertEqual(
+                    sorted(tree.get_family_ids(category.pk)),
+                    sorted(self.get_pks(category.get_family()))
+                )
+
+        self.assertFalse(tree.get_node(self.jeans.pk).is_active)
+        self.assertEqual(tree.get_node_by_slug(self.linen.slug).pk,
+                         self.linen.pk)
+
+    def test_snapshot_is_refreshed_on_change(self):
+        """Test that the snapshot is reused until a category is saved"""
+
+        tree = get_category_tree()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_category_tree(), tree)
+
+        # Note: the generation is bumped after the transaction is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            silk = models.Category.objects.create(
+                title='Silk',
+                parent=self.shirts
+            )
+
+        self.assertEqual(
+            [node.pk for node in get_category_tree().get_children(
+                self.shirts.pk
+            )],
+            [self.linen.pk, silk.pk]
+        )
+
+
+class AttributeIndexTest(CatalogTestCase):
+    """Test class for the attribute index"""
+
+    def setUp(self):
+        """Create sample attribute tree"""
+
+        super().setUp()
+
+        self.root = models.Attribute.objects.create(title='Color')
+        self.red = models.Attribute.objects.create(
+            title='Red',
+            parent=self.root,
+            display_order=2
+        )
+        self.dark_red = models.Attribute.objects.create(
+            title='Dark Red',
+            parent=self.red
+        )
+        self.blue = models.Attribute.objects.create(
+            title='Blue',
+            parent=self.root,
+            display_order=1
+        )
+
+        for attribute in (self.root, self.red, self.dark_red, self.blue):
+            attribute.refresh_from_db()
+
+    def test_lookups_match_tree_methods(self):
+        """Test that the lookups of index return the same attributes as the
+        methods of MPTT tree"""
+
+        index = get_attribute_index()
+
+        for attribute in (self.root, self.red, self.dark_red, self.blue):
+            with self.subTest(attribute=attribute.title):
+                self.assertEqual(
+                    index.get_root_title(attribute.pk),
+                    attribute.get_root().title
+                )
+                self.assertEqual(
+                    index.get_parent_title(attribute.pk),
+                    attribute.parent.title if attribute.parent else None
+                )
+                self.assertEqual(
+                    sorted(index.get_leafnode_ids(
+                        attribute.pk,
+                        include_self=True
+                    )),
+                    sorted(
+                        item.pk for item in attribute.get_leafnodes(
+                            include_self=True
+                        )
+                    )
+                )
+
+        self.assertEqual(index.get_ancestor(self.dark_red.pk, 1).pk,
+                         self.red.pk)
+        self.assertIsNone(index.get_ancestor(self.root.pk, 1))
+
+    def test_index_is_refreshed_on_change(self):
+        """Test that the index is reused until an attribute is saved"""
+
+        index = get_attribute_index()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_attribute_index(), index)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.root.title = 'Colour'
+            self.root.save()
+
+        self.assertEqual(
+            get_attribute_index().get_root_title(self.dark_red.pk),
+            'Colour'
+        )
+
+    def test_new_attributes_rebuild_index(self):
+        """Test that each attribute newer than the index (its generation
+        isn't bumped yet) is found by a fresh index, which replaces the
+        index of process"""
+
+        index = get_attribute_index()
+
+        # Note: the callbacks aren't executed, so the generation of
+        #       attributes is still the same.
+        green = models.Attribute.objects.create(
+            title='Green',
+            parent=self.root
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(index.get_root_title(green.pk), 'Color')
+            self.assertEqual(index.get_parent_title(green.pk), 'Color')
+            self.assertEqual(
+                index.get_leafnode_ids(self.root.pk),
+                [self.dark_red.pk, self.blue.pk, green.pk]
+            )
+
+        with self.assertNumQueries(0):
+            fresh_index = get_attribute_index()
+
+            self.assertIsNot(fresh_index, index)
+            self.assertEqual(fresh_index.get_root_title(green.pk), 'Color')
+
+        # Another attribute that has been added after the fresh index.
+        dark_green = models.Attribute.objects.create(
+            title='Dark Green',
+            parent=green
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                index.get_ancestor(dark_green.pk, 1).pk,
+                green.pk
+            )
+
+        # The unknown attributes rebuild the index once.
+        with self.assertNumQueries(1):
+            with self.assertRaises(KeyError):
+                index.get_node(0)
+
+        with self.assertNumQueries(0):
+            with self.assertRaises(KeyError):
+                index.get_node(0)
@@ -33,6 +33,11 @@ urlpatterns = [
         'personal-info/check/',
         views.PersonalInfoCheckAPIView.as_view(),
         name='personal_info_check'
+    ),
+    path(
+        'search/metrics/',
+        views.SearchMetricsAPIView.as_view(),
+        name='search-metrics'
     )
 
     # path(
@@ -0,0 +1,290 @@
+"""Define the refresh of variant matrices of products of your project"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import (Product, ProductItem, ProductAttribute,
+                         ProductItemAttribute, ProductVariantMatrix)
+from core.attribute_index import get_attribute_index
+
+import logging
+
+
+# Note: the variant matrix of product has the same values of the following
+#       fields of product details (see ProductDetailsSerializer):
+#       1- 'related_product_items': the items of product with the attributes
+#          of each item grouped by their root title (with parent title and
+#          thumbnail of the attribute of item).
+#       2- 'available_attributes_combination': for each uncommon attribute
+#          of product, the attributes of other families those are available
+#          with it in the same items.
+#       In addition to the 'pk' of default item of product (the same of
+#       item_instance() method).
+
+# Important: postgres doesn't keep the order of keys of 'jsonb' objects, so
+#            the ordered dictionaries are stored as lists of [key, value]
+#            pairs, and they are converted back to dictionaries by
+#            get_matrix_items() and get_matrix_combinations().
+
+# Note: the variant structure only changes when the catalog is edited, so
+#       the signals (see core/signals.py) send the changed ids to celery
+#       task, which rebuilds the matrices of the affected products only.
+
+# Set the cache key (prefix) and timeout of the mark of queued refresh of
+# missing matrix of product.
+VARIANT_MATRIX_SCHEDULED_KEY = 'variants:scheduled'
+VARIANT_MATRIX_SCHEDULED_TIMEOUT = 60
+
+
+def get_affected_product_ids(product_ids=(), product_item_ids=(),
+                             tree_ids=()):
+    """Return set of ids of the products those their variant matrices depend
+    on the given products, product items and attribute trees"""
+
+    product_ids = set(product_ids)
+
+    if product_item_ids:
+        product_ids.update(
+            ProductItem.objects.filter(pk__in=product_item_ids).values_list(
+                'product_id',
+                flat=True
+            )
+        )
+
+    if tree_ids:
+        product_ids.update(
+            ProductAttribute.objects.filter(
+                attribute__tree_id__in=tree_ids
+            ).values_list('product_id', flat=True)
+        )
+
+    return product_ids
+
+
+def build_variant_matrices(product_ids):
+    """Return dictionary of the variant matrices of given products ids,
+    where all the products are read with fixed count of queries"""
+
+    index = get_attribute_index()
+
+    items = {}
+    items_of_products = {product_id: [] for product_id in product_ids}
+    matrices = {}
+
+    # Get the items of products ordered by 'pk'.
+    for item in ProductItem.objects.filter(
+        product__in=product_ids
+    ).order_by('pk').values('pk', 'slug', 'product_id', 'is_default'):
+        items[item['pk']] = {
+            'slug': item['slug'],
+            'is_default': item['is_default'],
+            'attributes': []
+        }
+        items_of_products[item['product_id']].append(
+            (item['pk'], items[item['pk']])
+        )
+
+    # Get the attributes of items in the tree order of attributes (as the
+    # attributes property of product item).
+    for item_attribute in ProductItemAttribute.objects.filter(
+        product_item__in=items
+    ).select_related('product_attribute').order_by(
+        'product_item',
+        'product_attribute__attribute__tree_id',
+        'product_attribute__attribute__lft',
+        'pk'
+    ):
+        attributes = items[item_attribute.product_item_id]['attributes']
+        product_attribute = item_attribute.product_attribute
+
+        # The thumbnail of the first product item attribute is used in case
+        # of duplicate attributes.
+        if product_attribute.attribute_id in [
+            attribute[1].attribute_id for attribute in attributes
+        ]:
+            continue
+
+        attributes.append((item_attribute, product_attribute))
+
+    for product_id, product_items in items_of_products.items():
+        # The default item is the one that has (is_default=True) or the last
+        # ordered item by 'pk' (same as item_instance() method).
+        default_item_id = next(
+            (pk for pk, item in product_items if item['is_default']),
+            product_items[-1][0] if product_items else None
+        )
+
+        matrix_items = []
+        combinations = {}
+
+        for pk, item in product_items:
+            item_attributes = {}
+
+            for item_attribute, product_attribute in item['attributes']:
+                attribute_id = product_attribute.attribute_id
+                node = index.get_node(attribute_id)
+
+                item_attributes.setdefault(node.root_title, []).append({
+                    'parent_attribute': node.parent_title,
+                    'child_attribute': node.title,
+                    'thumbnail': item_attribute.thumbnail.url
+                    if item_attribute.thumbnail else None
+                })
+
+            matrix_items.append({
+                'slug': item['slug'],
+                'attributes': list(item_attributes.items())
+            })
+
+        # Get the uncommon attributes of items ordered by 'pk' of their
+        # product attributes.
+        uncommon = sorted(
+            set(
+                (product_attribute.pk, product_attribute.attribute_id)
+                for _, item in product_items
+                for _, product_attribute in item['attributes']
+                if not product_attribute.is_common_attribute
+            )
+        )
+
+        for _, attribute_id in uncommon:
+            node = index.get_node(attribute_id)
+            related = {}
+
+            # Get the attributes of other families within the items those
+            # have the current attribute.
+            for _, item in product_items:
+                item_attribute_ids = [
+                    product_attribute.attribute_id
+                    for _, product_attribute in item['attributes']
+                ]
+
+                if attribute_id not in item_attribute_ids:
+                    continue
+
+                for pk in item_attribute_ids:
+                    other = index.get_node(pk)
+
+                    if other.tree_id == node.tree_id:
+                        continue
+
+                    titles = related.setdefault(other.root_title, [])
+
+                    # Append non-duplicate values for specified key.
+                    if other.title not in titles:
+                        titles.append(other.title)
+
+            combinations.setdefault(node.root_title, {})[node.title] = \
+                related
+
+        matrices[product_id] = {
+            'items': matrix_items,
+            'combinations': [
+                [root_title, [
+                    [title, list(related.items())]
+                    for title, related in attributes.items()
+                ]]
+                for root_title, attributes in combinations.items()
+            ],
+            'default_item_id': default_item_id
+        }
+
+    return matrices
+
+
+def refresh_variant_matrices(product_ids):
+    """Re-calculate the variant matrices of the given products ids, and
+    return dictionary of the matrices"""
+
+    # Note: remove the old records and create the new ones inside single
+    #       transaction, where the rows of products are locked
+    #       (select_for_update) before their matrices are built, so the
+    #       concurrent refreshes of the same products run one after another
+    #       and the last one writes the matrices of the latest committed
+    #       data.
+    with transaction.atomic():
+        # Lock the rows in the same order, so the refreshes don't deadlock.
+        # Note: the deleted products don't have matrices anymore.
+        product_ids = list(
+            Product.objects.select_for_update().filter(
+                pk__in=product_ids
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+
+        matrices = build_variant_matrices(product_ids)
+
+        ProductVariantMatrix.objects.filter(product__in=product_ids).delete()
+        ProductVariantMatrix.objects.bulk_create(
+            [
+                ProductVariantMatrix(product_id=product_id, matrix=matrix)
+                for product_id, matrix in matrices.items()
+            ],
+            batch_size=500
+        )
+
+    return matrices
+
+
+def schedule_variant_matrix_refresh(product_id):
+    """Add task to job queue to create the missing variant matrix of the
+    given product id, where the task is queued once within
+    VARIANT_MATRIX_SCHEDULED_TIMEOUT seconds"""
+
+    # Note: imported here, since the tasks module imports this module.
+    from core.tasks import refresh_product_variant_matrices
+
+    # Don't break the request in case redis (or the broker) is down.
+    try:
+        if cache.add(
+            f'{VARIANT_MATRIX_SCHEDULED_KEY}:{product_id}',
+            True,
+            VARIANT_MATRIX_SCHEDULED_TIMEOUT
+        ):
+            refresh_product_variant_matrices.delay([product_id])
+    except Exception as e:
+        logging.exception(e)
+
+
+def get_variant_matrix(product_id):
+    """Return the variant matrix of given product id, where the matrix is
+    built in case it doesn't exist yet"""
+
+    matrix = ProductVariantMatrix.objects.filter(
+        product=product_id
+    ).values_list('matrix', flat=True).first()
+
+    if matrix is None:
+        # Note: the request doesn't write the matrix, the matrix is built
+        #       for the response only and its record is created by celery
+        #       task, so the writes of matrices are serialized by
+        #       refresh_variant_matrices().
+        matrix = build_variant_matrices([product_id])[product_id]
+
+        schedule_variant_matrix_refresh(product_id)
+
+    return matrix
+
+
+def get_matrix_items(matrix):
+    """Return list of items of the given matrix with the attributes of each
+    item as dictionary (the value of 'related_product_items')"""
+
+    return [
+        {
+            'slug': item['slug'],
+            'attributes': dict(item['attributes'])
+        }
+        for item in matrix['items']
+    ]
+
+
+def get_matrix_combinations(matrix):
+    """Return dictionary of the available combinations of attributes of the
+    given matrix (the value of 'available_attributes_combination')"""
+
+    return {
+        root_title: {
+            title: dict(related) for title, related in attributes
+        }
+        for root_title, attributes in matrix['combinations']
+    }
@@ -1,20 +1,22 @@
 """Register the views for this backend"""
 
-from rest_framework import views, generics, status
+from rest_framework import views, generics, permissions
 from rest_framework.response import Response
 # from rest_framework.parsers import JSONParser
 from django.views.generic.base import TemplateView
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import (HttpResponseNotFound, HttpResponseForbidden,
                          HttpResponseServerError)
-from django.db.models import Subquery
+from django.db.models import Subquery, Case, When, IntegerField
+
+from django.utils.functional import cached_property
 
 from dal import autocomplete
 
-from core.models import Category, Attribute, ProductAttribute, Country
-from core import exceptions
-from core import serializers
+from core.models import Category, Attribute, ProductAttribute
+from core.search import get_search_backend_class, get_search_metrics
 from core import pagination
+from core import checkout
 
 import abc
 import logging
@@ -114,8 +116,120 @@ class AttributeAutocompleteView(autocomplete.Select2QuerySetView):
 
 # Elasticsearch
 
-class PaginatedElasticSearchListAPIView(generics.ListAPIView):
-    """List APIView to implement query search with elasticsearch engine"""
+class SearchResults:
+    """Sequence of the model instances matched by the search engine, where
+    the paginator slices it and only the instances of the sliced window are
+    read from the database (in the order of search hits)"""
+
+    # Note: the paginator calls count() then slices the sequence with the
+    #       window of requested page, the view executes the search of that
+    #       window before pagination (see get_search_response() method), so
+    #       the slice is served from the same response, and another search
+    #       is executed only if the paginator asks for a different window
+    #       (e.g. page=last).
+
+    def __init__(self, view, response):
+        """Initialize the sequence with the search response of the view"""
+
+        self.view = view
+        self.response = response
+
+    def count(self):
+        """Return the total count of matched instances"""
+
+        return self.view.get_search_total(self.response)
+
+    def __len__(self):
+        """Return the total count of matched instances"""
+
+        return self.count()
+
+    def __getitem__(self, key):
+        """Return list of model instances of the given slice"""
+
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        start = key.start or 0
+        size = (key.stop if key.stop is not None else self.count()) - start
+
+        if size <= 0:
+            return []
+
+        response = self.response
+        window_start, window_size = self.view.get_search_window()
+
+        # Note: the window of the last page is shorter than the page size.
+        if start != window_start or size > window_size:
+            response = self.view.execute_search(start, size)
+
+        return self.view.get_instances(response)
+
+
+class SearchPaginationMixin:
+    """Mixin of list APIViews those paginate the hits of search engine, where
+    the view executes the search of the current page window once per request
+    and returns SearchResults as its queryset"""
+
+    # Note: the view should implement these methods used by SearchResults:
+    #       1- execute_search(start, size): return the search response of the
+    #          given window of hits.
+    #       2- get_search_total(search_response): return the total count.
+    #       3- get_instances(search_response): return the model instances of
+    #          the hits in their order.
+
+    def get_search_window(self):
+        """Return tuple of (from, size) of the current page depending on the
+        pagination class of view"""
+
+        paginator = self.paginator
+
+        if paginator is None:
+            return 0, 10
+
+        size = paginator.get_page_size(self.request)
+
+        # Note: the invalid page numbers (e.g. 'last') are served by the
+        #       first page window, and SearchResults executes another search
+        #       for the window that the paginator asks for.
+        try:
+            page = int(
+                self.request.query_params.get(paginator.page_query_param, 1)
+            )
+        except (TypeError, ValueError):
+            page = 1
+
+        return (max(page, 1) - 1) * size, size
+
+    def get_search_response(self):
+        """Method to return response from search engine for a given query
+        string, the response is executed once per request"""
+
+        # Important: this class view implement pagination, so the method
+        #            get_queryset() doesn't return anything when you haven't
+        #            filled something in for query. Hence, it returns None
+        #            which isn't a valid QuerySet or iterable. As such Django
+        #            can't call len() on it for pagination process, so you have
+        #            to return an empty list or queryset.
+
+        # Note: if you want to know the elasticsearch parameters that can be
+        #       used with query, go to 'Search(Request)' class in search.py
+        #       file of 'elasticsearch_dsl' package and check its methods.
+
+        # Note: the serializer context and the browsable API read the
+        #       response again, so it's memoized on the view instance.
+        if not hasattr(self, '_search_response'):
+            self._search_response = self.execute_search(
+                *self.get_search_window()
+            )
+
+        return self._search_response
+
+
+class PaginatedElasticSearchListAPIView(SearchPaginationMixin,
+                                        generics.ListAPIView):
+    """List APIView to implement query search with search backend
+    (elasticsearch engine by default, see core/search.py)"""
 
     # Note: To use this class, we have to provide our:
     #       1-  url kwargs have query string value using given key.
@@ -126,11 +240,30 @@ class PaginatedElasticSearchListAPIView(generics.ListAPIView):
     #       5-  filter exclude argument that will exclude some result from
     #           filter search.
     #       6-  filter exclude value for filter exclude argument.
-    #       7-  filter order by value.
+    #       7-  filter order by value (optional, to break the ties of hits
+    #           those have the same keyword value).
     #       8-  serializer class.
     #       9-  document class.
     #       10- pagination class (optional).
-    #       11- override generate_q_expression() method.
+    #       11- collapse field (optional), the field of document that the
+    #           hits are collapsed by, so each keyword value is listed once
+    #           (e.g. product items are collapsed into their products).
+    #       12- source fields (optional), the fields of document those are
+    #           returned with the hits in addition to filter keyword.
+    #       13- override generate_q_expression() method.
+    #       14- override filter_search() method (optional).
+    #       15- override get_post_filters() and add_search_aggregations()
+    #           methods (optional).
+    #       16- override filter_search_queryset() method (optional), the
+    #           filters of database search backend (see core/search.py).
+    #       17- degraded search fields (optional), the fields of model those
+    #           are matched by the query words within database in case
+    #           elasticsearch is not available (degraded mode).
+
+    # Important: the pagination is done by search backend (from/size), so the
+    #            search response is for the current page only, and the
+    #            database query reads the instances of the current page only
+    #            in the order of relevance (score) of search hits.
 
     # Define attributes.
     kwargs_query = 'query'
@@ -140,6 +273,9 @@ class PaginatedElasticSearchListAPIView(generics.ListAPIView):
     filter_exclude_arg = None
     filter_exclude_val = None
     filter_order_by = None
+    collapse_field = None
+    source_fields = ()
+    degraded_search_fields = ()
     serializer_class = None
     document_class = None
     pagination_class = pagination.PageNumberPaginationNoCount
@@ -149,62 +285,105 @@ class PaginatedElasticSearchListAPIView(generics.ListAPIView):
         """This method should be overridden and return a Q() expression for
         elasticsearch"""
 
-    def get_search_response(self):
-        """Method to return response from search engine for a given query
-        string"""
+    def filter_search(self, search):
+        """Return the search object after applying the filters, this method
+        can be overridden to filter the documents within elasticsearch"""
 
-        # Important: this class view implement pagination, so the method
-        #            get_queryset() doesn't return anything when you haven't
-        #            filled something in for query. Hence, it returns None
-        #            which isn't a valid QuerySet or iterable. As such Django
-        #            can't call len() on it for pagination process, so you have
-        #            to return an empty list or queryset.
+        return search
 
-        # Note: if you want to know the elasticsearch parameters that can be
-        #       used with query, go to 'Search(Request)' class in search.py
-        #       file of 'elasticsearch_dsl' package and check its methods.
+    def get_post_filters(self):
+        """Return list of Q() expressions those filter the hits but not the
+        aggregations, this method can be overridden (e.g. the filters of
+        faceted search)"""
 
-        # Get query string as lower case from url parameter (argument).
-        kwarg_query = self.kwargs.get(self.kwargs_query, None)
+        return []
 
-        try:
-            # pass query to generate_q_expression() (the overriden version).
-            q = self.generate_q_expression(kwarg_query)
+    def add_search_aggregations(self, search, post_filters):
+        """Add the aggregations (e.g. facets) to the given search object
+        in place, this method can be overridden"""
 
-            # Set Q() expression query to be searched within provided document.
-            search = self.document_class.search().query(q)
+    def filter_search_queryset(self, queryset):
+        """Return the queryset of database search backend after applying the
+        filters, this method can be overridden to filter the model instances
+        as filter_search() and get_post_filters() methods do"""
 
-            # Exclude items from your query
-            # search = search.exclude('<field_name>', draft=True)
+        return queryset
 
-            # Filter documents that contain terms within a provided range.
-            # eg: the posts created for the past day (1d)
-            # search = search.filter('range', <field_name>={"gte": "now-1d"})
+    @cached_property
+    def search_backend(self):
+        """Return the search backend instance of SEARCH_BACKEND setting"""
 
-            # Ordering
-            # Note: prefixed by the - sign with specific field name to specify
-            #       a descending order.
-            # search = search.sort('<field_name>')
+        return get_search_backend_class()(self)
 
-            # Selectively control how the _source field is returned.
-            search = search.source(fields=[self.filter_keyword])
+    def execute_search(self, start, size):
+        """Return response from search backend for a given query string and
+        the window of hits"""
 
-            # Trigger the query search of elasticsearch.
-            # Note: Retrieved data will be list of document type (table)
-            #       instance that set as document_class property of this class.
-            elasticsearch_response = search.execute()
+        return self.search_backend.execute_search(start, size)
 
-            # print(
-            #     f"Found {elasticsearch_response.hits.total.value} "
-            #     f"hit(s) for query: {kwarg_query}"
-            # )
+    def get_search_total(self, search_response):
+        """Return the total count of matched instances of search response"""
 
-            return elasticsearch_response
+        return self.search_backend.get_search_total(search_response)
 
-        except Exception as e:
-            logging.exception(e)
+    def get_prefetch_related_lookups(self):
+        """Return list of lookups to prefetch for the queryset, this method can
+        be overridden to declare the prefetch plan of the view serializer"""
+
+        return []
+
+    def get_search_prefetch_related_lookups(self, search_response):
+        """Return list of lookups to prefetch for the queryset that depend on
+        the hits of search response, this method can be overridden (e.g. to
+        prefetch the matched related objects of hits)"""
+
+        return []
+
+    def get_instances(self, search_response):
+        """Return list of model instances of the given search response in
+        the order of its hits"""
+
+        # Create list of filter_keyword string from search response.
+        lookup_vals = [ele[self.filter_keyword] for ele in search_response]
+
+        if not lookup_vals:
             return []
 
+        # Construct the full lookup expression.
+        lookup = '__'.join([self.filter_lookup, 'in'])
+
+        # Get the filtered queryset for provided model class.
+        queryset = self.model_class.objects.filter(**{lookup: lookup_vals})
+
+        # if filter exclude argument is not None
+        if self.filter_exclude_arg:
+            queryset = queryset.exclude(
+                **{self.filter_exclude_arg: self.filter_exclude_val}
+            )
+
+        # Order the instances by the position of their hits (relevance).
+        ordering = [
+            Case(
+                *[
+                    When(**{self.filter_lookup: value}, then=position)
+                    for position, value in enumerate(lookup_vals)
+                ],
+                output_field=IntegerField()
+            )
+        ]
+
+        if self.filter_order_by:
+            ordering.append(self.filter_order_by)
+
+        # Apply the prefetch lookups of the view (if any), the prefetching
+        # will be done only for the instances of the current page.
+        return list(
+            queryset.distinct().order_by(*ordering).prefetch_related(
+                *self.get_prefetch_related_lookups(),
+                *self.get_search_prefetch_related_lookups(search_response)
+            )
+        )
+
     def get_queryset(self):
         """Return given model class instance/instances if there are hits from
         search engine"""
@@ -213,37 +392,22 @@ class PaginatedElasticSearchListAPIView(generics.ListAPIView):
         search_response = self.get_search_response()
 
         # Check that count of search hits is bigger than 0
-        if hasattr(search_response, "hits") and \
-                search_response.hits.total.value > 0:
+        if self.get_search_total(search_response) > 0:
+            return SearchResults(self, search_response)
+        else:
+            return []
 
-            # Construct the full lookup expression.
-            lookup = '__'.join([self.filter_lookup, 'in'])
 
-            # Create list of filter_keyword string from search response.
-            lookup_vals = [ele[self.filter_keyword] for ele in search_response]
+class SearchMetricsAPIView(views.APIView):
+    """APIView to return the metrics of search engine (latency, failures
+    and circuit breaker) for the admin users"""
 
-            # if filter exclude argument is not None
-            if self.filter_exclude_arg:
-                # Get the filtered queryset for provided model class.
-                queryset = self.model_class.objects.filter(
-                    **{lookup: lookup_vals}
-                ).exclude(
-                    **{self.filter_exclude_arg: self.filter_exclude_val}
-                ).distinct().order_by(self.filter_order_by)
+    permission_classes = [permissions.IsAdminUser]
 
-            else:
-                # Get the filtered queryset for provided model class.
-                queryset = self.model_class.objects.filter(
-                    **{lookup: lookup_vals}
-                ).distinct().order_by(self.filter_order_by)
+    def get(self, request):
+        """HTTP GET method"""
 
-            # make sure queryset return no-empty list
-            if queryset:
-                return queryset
-            else:
-                return []
-        else:
-            return []
+        return Response(get_search_metrics())
 
 
 #########################################################################
@@ -253,7 +417,7 @@ class PaginatedElasticSearchListAPIView(generics.ListAPIView):
 class CountryCheckAPIView(views.APIView):
     """APIView to check country"""
 
-    def post(self, request, data=None):
+    def post(self, request):
         """HTTP POST method"""
 
         # Data attribute value for this view POST method should be:
@@ -262,112 +426,15 @@ class CountryCheckAPIView(views.APIView):
         #   "iso_code": <value>
         # }
 
-        # Set what dictionary to use.
-        to_use = data if data else request.data
-
-        # Get the 'title' and 'iso_code' property value from data of HTTP POST
-        # request.
-        title = to_use.get('title', None)
-        iso_code = to_use.get('iso_code', None)
-
-        # Check if country title is not empty/zero/None
-        if title:
-            try:
-                # Get the country instance using ignore case for string of
-                # provided country title.
-                country_instance = Country.objects.get(
-                    title__iexact=title,
-                    is_available=True
-                )
-
-                # Check if country iso code is not empty/zero/None
-                if iso_code:
-
-                    # check that the retrieved instance iso code is the same
-                    # as provide iso code in HTTP request, otherwise raise an
-                    # exception.
-                    if country_instance.iso_code != iso_code:
-
-                        return Response(
-                            {
-                                'message':
-                                    exceptions.
-                                    InvalidCountryIsoCode.default_detail,
-                                'default_code':
-                                    exceptions.
-                                    InvalidCountryIsoCode.default_code,
-                                'iso_code': iso_code
-                            },
-                            status=exceptions.
-                            InvalidCountryIsoCode.status_code,
-                        )
-
-                # In case everything went ok.
-                return Response(
-                    {
-                        "title": country_instance.title,
-                        "iso_code": country_instance.iso_code
-                    },
-                    status=status.HTTP_200_OK
-                )
-
-            except ObjectDoesNotExist:
-                return Response(
-                    {
-                        'message':
-                            exceptions.InvalidCountryTitle.default_detail,
-                        'default_code':
-                            exceptions.InvalidCountryTitle.default_code,
-                        'title': title
-                    },
-                    status=exceptions.InvalidCountryTitle.status_code,
-                )
+        result = checkout.check_country(request.data)
 
-        # In case no country title is provided, check if country iso code is
-        # not empty/zero/None
-        elif iso_code:
-            try:
-                # Get the country iso code instance using ignore case for
-                # string of provided country title.
-                country_instance = Country.objects.get(
-                    iso_code__iexact=iso_code,
-                    is_available=True
-                )
-
-                # In case everything went ok.
-                return Response(
-                    {
-                        "title": country_instance.title,
-                        "iso_code": country_instance.iso_code
-                    },
-                    status=status.HTTP_200_OK
-                )
-
-            except ObjectDoesNotExist:
-                return Response(
-                    {
-                        'message':
-                            exceptions.InvalidCountryIsoCode.default_detail,
-                        'default_code':
-                            exceptions.InvalidCountryIsoCode.default_code,
-                        'iso_code': iso_code
-                    },
-                    status=exceptions.InvalidCountryIsoCode.status_code,
-                )
-        else:
-            # In case no country or iso code has provided
-            return Response(
-                {
-                    'message': "No country title or iso-code has provided"
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return Response(result.data, status=result.status_code)
 
 
 class AddressCheckAPIView(views.APIView):
     """ApiView to check address"""
 
-    def post(self, request, data=None):
+    def post(self, request):
         """HTTP post method"""
 
         # Data attribute value for this view POST method should be:
@@ -384,92 +451,16 @@ class AddressCheckAPIView(views.APIView):
         #       "postal_code": <value> # Not required
         #   }
         # }
-        #
-
-        # Set what dictionary to use.
-        to_use = data if data else request.data
-
-        country = to_use.get('country', None)
-        address_details = to_use.get('address_details', None)
-
-        try:
-            if country:
 
-                # Initialize an empty dictionary to hold data to use with other
-                # API view.
-                data = {}
+        result = checkout.check_address(request.data)
 
-                # Set required properties value.
-                if country.get('title', None):
-                    data['title'] = country['title']
-
-                if country.get('iso_code', None):
-                    data['iso_code'] = country['iso_code']
-
-                country_check_res = CountryCheckAPIView().post(
-                    request=request,
-                    data=data
-                )
-
-                if country_check_res.status_code != status.HTTP_200_OK:
-                    return Response(
-                        country_check_res.data,
-                        status=country_check_res.status_code
-                    )
-
-                # check if address details is provided.
-                if address_details:
-
-                    # Validate address details with serializer class.
-                    serializer = serializers.AddressCheckSerializer(
-                        data=address_details
-                    )
-
-                    if serializer.is_valid():
-                        return Response(
-                            {
-                                "country": country_check_res.data,
-                                "address_details": serializer.data
-                            },
-                            status=status.HTTP_200_OK
-                        )
-                    else:
-                        return Response(
-                            serializer.errors,
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-
-                else:
-                    return Response(
-                        {
-                            "message": "No address details have provided"
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-            else:
-                return Response(
-                    {
-                        "message": "No country title or iso code has provided"
-                    },
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        except Exception as e:
-            logging.exception(e)
-            return Response(
-                {
-                    "message": "Error is occurred while trying to check "
-                               "address"
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(result.data, status=result.status_code)
 
 
 class PersonalInfoCheckAPIView(views.APIView):
     """ApiView to check personal info"""
 
-    def post(self, request, data=None):
+    def post(self, request):
         """HTTP POST method"""
 
         # Data attribute value for this view POST method should be:
@@ -480,37 +471,6 @@ class PersonalInfoCheckAPIView(views.APIView):
         #   "phone_number": <value>
         # }
 
-        to_use = data if data else request.data
-
-        first_name = to_use.get("first_name", None)
-        last_name = to_use.get("last_name", None)
-        email = to_use.get("email", None)
-        phone_number = to_use.get("phone_number", None)
-
-        # Validate address details with serializer class.
-        serializer = serializers.ProfileCheckSerializer(
-            data={
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": email,
-                "phone_number": phone_number
-            }
-        )
+        result = checkout.check_personal_info(request.data)
 
-        if serializer.is_valid():
-            return Response(
-                {
-                    'personal_info': {
-                        "first_name": first_name,
-                        "last_name": last_name,
-                        "email": email,
-                        "phone_number": phone_number
-                    }
-                },
-                status=status.HTTP_200_OK
-            )
-        else:
-            return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return Response(result.data, status=result.status_code)
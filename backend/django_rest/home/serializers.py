@@ -3,8 +3,13 @@
 from rest_framework import serializers
 # from rest_framework.response import Response
 # from django.conf import settings
+from django.db.models import Prefetch, OuterRef, Subquery
+
 from core.models import (Card, Section, Banner, TopBanner, Product,
-                         ProductGroup, ProductItem, Attribute)
+                         ProductGroup, ProductItem, Attribute,
+                         ProductAttribute, ProductItemAttribute,
+                         PromotionItem)
+from core.attribute_index import get_context_attribute_index
 
 # Note: serializer class receive the queryset after filter class have done its
 #       process (in case View using filter class).
@@ -151,16 +156,103 @@ class SectionSerializer(serializers.ModelSerializer):
         """Return all serialized cards those related to current section
          instance"""
 
-        # Get all related Card instances that their category is active.
-        cards = Card.objects.filter(
-            section_cards_card__section=instance,
-            category__is_active=True
-        )
+        # Read the section cards if they have been prefetched by the view,
+        # otherwise get all related Card instances that their category is
+        # active.
+        if hasattr(instance, 'active_section_cards'):
+            cards = [
+                section_card.card
+                for section_card in instance.active_section_cards
+            ]
+        else:
+            cards = Card.objects.filter(
+                section_cards_card__section=instance,
+                category__is_active=True
+            ).select_related('category').order_by('pk')
 
         # Return the Card instances as JSON serializer object.
         return CardSerializer(instance=cards, many=True, read_only=True).data
 
 
+def is_prefetched(instance, lookup):
+    """Return True if the related objects of given lookup have been prefetched
+    for the instance (listing mode)"""
+
+    return lookup in getattr(instance, '_prefetched_objects_cache', {})
+
+
+def get_product_listing_prefetch():
+    """Return the prefetch plan of Product queryset for listing views, so
+    ProductSerializer and its nested ProductItemSerializer read only from the
+    prefetched objects"""
+
+    # Note: the views those list products (e.g. store products list, search,
+    #       home product groups and related products) should apply this plan
+    #       to their queryset using prefetch_related() method, then the count
+    #       of queries will be constant regardless of the count of products
+    #       in the page and their items and attributes.
+
+    # Get the title of root attribute of each product attribute.
+    root_attribute_title = Subquery(
+        Attribute.objects.filter(
+            tree_id=OuterRef('attribute__tree_id'),
+            parent__isnull=True
+        ).values('title')[:1]
+    )
+
+    return [
+        Prefetch(
+            'product_items_product',
+            queryset=ProductItem.objects.select_related(
+                'product_item_price_product_item'
+            ).prefetch_related(
+                Prefetch(
+                    'product_item_attributes_product_item',
+                    queryset=ProductItemAttribute.objects.select_related(
+                        'product_attribute__attribute'
+                    )
+                )
+            )
+        ),
+        Prefetch(
+            'product_attributes_product',
+            queryset=ProductAttribute.objects.select_related(
+                'attribute'
+            ).annotate(root_attribute_title=root_attribute_title)
+        )
+    ]
+
+
+def get_matched_items_prefetch(items_id):
+    """Return the prefetch of the given product items (e.g. the best matched
+    items of search hits) into 'matched_items' attribute of their products,
+    with their prices, promotions and attributes"""
+
+    # Note: the deal price and promotion are read from the annotations of
+    #       with_effective_price() and the prefetched promotion items in case
+    #       the price record is expired, so no query runs per item.
+    return Prefetch(
+        'product_items_product',
+        queryset=ProductItem.objects.filter(
+            pk__in=items_id
+        ).with_effective_price().select_related(
+            'product_item_price_product_item'
+        ).prefetch_related(
+            Prefetch(
+                'product_item_attributes_product_item',
+                queryset=ProductItemAttribute.objects.select_related(
+                    'product_attribute__attribute'
+                )
+            ),
+            Prefetch(
+                'promotion_items_product_item',
+                queryset=PromotionItem.objects.select_related('promotion')
+            )
+        ),
+        to_attr='matched_items'
+    )
+
+
 class ProductItemSerializer(serializers.ModelSerializer):
     """Serializer class of Product model"""
 
@@ -223,6 +315,22 @@ class ProductItemSerializer(serializers.ModelSerializer):
     def get_attributes(self, instance):
         """Return current instance attributes title"""
 
+        # In listing mode, read the attributes from prefetched product item
+        # attributes ordered as the tree of attributes.
+        if is_prefetched(instance, 'product_item_attributes_product_item'):
+
+            attributes = {
+                obj.product_attribute.attribute
+                for obj in instance.product_item_attributes_product_item.all()
+            }
+
+            return [
+                item.title for item in sorted(
+                    attributes,
+                    key=lambda attribute: (attribute.tree_id, attribute.lft)
+                )
+            ]
+
         attributes = instance.attributes
 
         return [item.title for item in attributes]
@@ -274,6 +382,25 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_product_items_variation(self, instance):
         """Return the attributes variation for certain Product instance"""
 
+        # In listing mode, read the root titles from prefetched product
+        # attributes those connected to prefetched product item attributes.
+        if is_prefetched(instance, 'product_items_product') and \
+                is_prefetched(instance, 'product_attributes_product'):
+
+            # Get the 'pk' of product attributes those connected to items.
+            product_attributes_pk = {
+                obj.product_attribute_id
+                for item in instance.product_items_product.all()
+                for obj in item.product_item_attributes_product_item.all()
+            }
+
+            return sorted({
+                obj.root_attribute_title
+                for obj in instance.product_attributes_product.all()
+                if not obj.is_common_attribute and
+                obj.pk in product_attributes_pk
+            })
+
         # Get the related product attribute instances that is_common_attribute
         # is True and is connected to product item attribute.
         uncommon_attributes = instance.product_attributes_product.filter(
@@ -290,13 +417,14 @@ class ProductSerializer(serializers.ModelSerializer):
         # initialize an empty list.
         titles = []
 
+        # Get the attribute index (see core/attribute_index.py), so the root
+        # titles are read without query.
+        index = get_context_attribute_index(self.context)
+
         # Loop over returned attribute instances to get root of each one.
         for attribute in attributes:
-            # Get root instance
-            root = attribute.get_root()
-
-            # Append title value titles list.
-            titles.append(root.title)
+            # Append title of root instance to titles list.
+            titles.append(index.get_root_title(attribute.pk))
 
         # Return the sorted list of non-duplicated titles of attributes.
         return sorted(set(titles))
@@ -338,26 +466,30 @@ class ProductSearchSerializer(ProductSerializer):
     """Serializer class of Product model that use for search purpose"""
 
     def get_product_item(self, instance):
-        """Return the related product item depending on 'items_sku' list in
-        context"""
+        """Return the best matched product item of search depending on
+        'matched_items' dictionary in context"""
 
-        # Get the items_sku list from context.
-        items_sku = self.context.get('items_sku', None)
+        # Get the matched items dictionary from context.
+        matched_items = self.context.get('matched_items', None)
 
         # Initialize instance variable.
         instance_var = None
 
-        if items_sku:
-            # Get product item instance for current product that related to the
-            # given list of sku, retrieve the first.
+        if hasattr(instance, 'matched_items'):
+            # In listing mode, the matched item has been prefetched by the
+            # view (see get_matched_items_prefetch() function).
+            instance_var = next(iter(instance.matched_items), None)
+        elif matched_items and instance.pk in matched_items:
+            # Get the matched product item instance for current product.
             instance_var = ProductItem.objects.filter(
                 product=instance,
-                sku__in=items_sku
-            ).distinct().first()
-        else:
+                pk=matched_items[instance.pk]['id']
+            ).first()
+
+        if instance_var is None:
             # By using item_instance property of 'Product' model get the
             # related product item instance.
-            instance_var = instance.item_instance(item=instance_var)
+            instance_var = instance.item_instance()
 
         # You can use Response class to return data or directly return
         # dictionary of data.
@@ -390,10 +522,15 @@ class ProductGroupSerializer(serializers.ModelSerializer):
         group instance"""
 
         # Get all related Product instances those are available.
-        products = Product.objects.filter(
-            product_group=instance,
-            is_available=True
-        )
+        # In listing mode, the products have been prefetched by the view.
+        if hasattr(instance, 'available_products'):
+            products = instance.available_products
+
+        else:
+            products = Product.objects.filter(
+                product_group=instance,
+                is_available=True
+            ).prefetch_related(*get_product_listing_prefetch())
 
         # Pass the context of this serializer class to child serializer class.
         return ProductSerializer(
@@ -0,0 +1,133 @@
+"""Create your api tasks"""
+
+from celery import shared_task
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import translation
+
+import logging
+import os
+import tempfile
+
+
+# Note: the home page payload is materialized as the rendered JSON of
+#       HomeListAPIView into redis (and optionally into a static file that
+#       nginx can serve), so the view responds with a single cache read.
+#       The payload is rebuilt by celery worker when the admin edits the
+#       home content (see core/signals.py).
+#       One payload is materialized per language of LANGUAGES setting, since
+#       the titles of content are translated (same as the language of cached
+#       responses, see core/cache.py).
+
+# Define the cache keys of home payload.
+HOME_PAYLOAD_KEY = 'home:payload'
+HOME_PAYLOAD_SCHEDULED_KEY = 'home:payload:scheduled'
+
+
+def get_home_payload_key(language):
+    """Return the cache key of home payload of the given language"""
+
+    return f'{HOME_PAYLOAD_KEY}:{language}'
+
+
+def get_home_payload_languages():
+    """Return list of the language codes those the home payload is
+    materialized for"""
+
+    return [code for code, name in settings.LANGUAGES]
+
+
+def get_home_payload(language):
+    """Return the materialized home payload (JSON bytes) of the given
+    language if exists"""
+
+    try:
+        return cache.get(get_home_payload_key(language))
+    except Exception as e:
+        logging.exception(e)
+
+
+def build_home_payload(language):
+    """Return the rendered JSON of home list view in the given language"""
+
+    # Import inside the function, because the view module imports this
+    # module.
+    from home.views import HomeListAPIView
+
+    request = RequestFactory().get(
+        reverse('home:home-list'),
+        HTTP_ACCEPT='application/json',
+        HTTP_ACCEPT_LANGUAGE=language
+    )
+
+    # Compute the payload from the database, not from the materialized one.
+    # Note: the request doesn't pass through LocaleMiddleware, so activate
+    #       the language while the response is rendered.
+    with translation.override(language):
+        response = HomeListAPIView.as_view(use_payload=False)(request)
+        response.render()
+
+    return response.content
+
+
+def write_home_payload_file(content, language):
+    """Write the payload into the static file of the given language
+    atomically, so nginx never serves a partially written file"""
+
+    path = settings.HOME_PAYLOAD_FILE.format(language=language)
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        file.write(content)
+
+    os.replace(file.name, path)
+
+
+@shared_task
+def rebuild_home_payload():
+    """Rebuild the materialized home payload when the signal of home content
+    models is emit"""
+
+    # Allow the changes made while building the payload to schedule another
+    # rebuild.
+    cache.delete(HOME_PAYLOAD_SCHEDULED_KEY)
+
+    for language in get_home_payload_languages():
+        # Don't let the failure of one language skip the others.
+        try:
+            content = build_home_payload(language)
+
+            cache.set(
+                get_home_payload_key(language),
+                content,
+                settings.HOME_PAYLOAD_TIMEOUT
+            )
+
+            if settings.HOME_PAYLOAD_FILE:
+                write_home_payload_file(content, language)
+        except Exception as e:
+            logging.exception(e)
+
+
+def schedule_home_payload_rebuild():
+    """Add task to job queue to rebuild the home payload after the current
+    transaction is committed"""
+
+    # Note: saving a section with its cards from the admin emits many
+    #       signals, so only one rebuild is scheduled until it starts.
+    def schedule():
+        try:
+            if cache.add(HOME_PAYLOAD_SCHEDULED_KEY, 1, timeout=60):
+                rebuild_home_payload.apply_async(
+                    countdown=settings.HOME_PAYLOAD_REBUILD_DELAY
+                )
+        except Exception as e:
+            logging.exception(e)
+
+    transaction.on_commit(schedule)
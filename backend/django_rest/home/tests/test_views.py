@@ -0,0 +1,116 @@
+""" Tests for home views"""
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from unittest import mock
+
+from core.tests.catalog import generate_catalog
+from core.tasks import refresh_product_item_prices
+from home.tasks import (rebuild_home_payload, get_home_payload,
+                        get_home_payload_key,
+                        HOME_PAYLOAD_SCHEDULED_KEY)
+
+import json
+
+
+# Disable the auto sync of elasticsearch documents, and use local memory
+# cache instead of redis, so the tests don't read the payload of another run.
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class HomeListAPIViewTest(TestCase):
+    """Test class for the materialized payload of home view"""
+
+    def setUp(self):
+        """Create api client and sample catalog with home content"""
+
+        cache.clear()
+
+        self.client = APIClient()
+        self.url = reverse('home:home-list')
+
+        self.catalog = generate_catalog(products=4, items=2)
+
+    def test_home_payload_served_from_cache(self):
+        """Test that the rebuilt payload is served with one cache read and
+        match the computed response"""
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+
+        # Clear the cached response of the computed one.
+        cache.clear()
+        rebuild_home_payload()
+
+        with self.assertNumQueries(0):
+            payload_res = self.client.get(self.url)
+
+        self.assertEqual(payload_res.status_code, 200)
+        self.assertEqual(payload_res['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(payload_res.content), res.json())
+
+    @override_settings(LANGUAGES=[('en', 'English'), ('fr', 'French')])
+    def test_home_payload_per_language(self):
+        """Test that the payload is rebuilt per configured language and
+        served in the language of request only"""
+
+        rebuild_home_payload()
+
+        self.assertIsNotNone(get_home_payload('en'))
+        self.assertIsNotNone(get_home_payload('fr'))
+
+        # Replace the payload of 'fr' language to tell them apart.
+        cache.set(get_home_payload_key('fr'), b'{"language": "fr"}')
+
+        with self.assertNumQueries(0):
+            fr_res = self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='fr')
+            en_res = self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='en')
+
+        self.assertEqual(json.loads(fr_res.content), {'language': 'fr'})
+        self.assertEqual(en_res.content, get_home_payload('en'))
+
+    @mock.patch('home.tasks.rebuild_home_payload.apply_async')
+    def test_item_changes_schedule_rebuild(self, apply_async):
+        """Test that the changes of product items and their attributes
+        schedule one rebuild of the payload"""
+
+        item = self.catalog.product_items[0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.stock = 5
+            item.save()
+            item.product_item_attributes_product_item.first().delete()
+
+        apply_async.assert_called_once()
+
+    @mock.patch('home.tasks.rebuild_home_payload.apply_async')
+    def test_price_refresh_is_debounced(self, apply_async):
+        """Test that the refresh of price records schedules the rebuild only
+        in case it isn't scheduled already"""
+
+        item_ids = [self.catalog.product_items[0].pk]
+
+        cache.set(HOME_PAYLOAD_SCHEDULED_KEY, 1)
+
+        # Note: the rebuild is scheduled after the transaction is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_product_item_prices(item_ids)
+
+        apply_async.assert_not_called()
+
+        cache.delete(HOME_PAYLOAD_SCHEDULED_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_product_item_prices(item_ids)
+
+        apply_async.assert_called_once()
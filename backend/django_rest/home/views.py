@@ -2,8 +2,19 @@
 
 from drf_multiple_model.views import ObjectMultipleModelAPIView
 
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.utils.translation import get_language
+
 from home import serializers
-from core.models import Banner, TopBanner, Section, ProductGroup
+from home.serializers import get_product_listing_prefetch
+from core.models import (Banner, TopBanner, Section, SectionCard, Card,
+                         Category, ProductGroup, Product, ProductAttribute,
+                         ProductItem, ProductItemAttribute, ProductItemImage,
+                         ProductItemPrice, Attribute, Promotion, PromotionItem)
+from core.cache import CachedResponseMixin
+from home.tasks import (get_home_payload, get_home_payload_languages,
+                        schedule_home_payload_rebuild)
 
 
 # Info: if you want to make queryset filtering for list APIView/ViewSet:
@@ -27,11 +38,46 @@ from core.models import Banner, TopBanner, Section, ProductGroup
 #     return queryset.filter(product_name=product_name)
 
 
-class HomeListAPIView(ObjectMultipleModelAPIView):
+class HomeListAPIView(CachedResponseMixin, ObjectMultipleModelAPIView):
     """APIView to combine multiple queryset with their serializers to list
       all images that are active & all active home Banners in the related
       model"""
 
+    # Specify the models those the home payload depends on, so the cached
+    # response is invalidated when one of them changes.
+    cache_models = (
+        Banner, TopBanner, Section, SectionCard, Card, Category, ProductGroup,
+        Product, ProductAttribute, ProductItem, ProductItemAttribute,
+        ProductItemImage, ProductItemPrice, Attribute, Promotion,
+        PromotionItem
+    )
+
+    # Respond with the materialized payload (see home/tasks.py), the task
+    # that rebuilds the payload sets it to False.
+    use_payload = True
+
+    def get(self, request, *args, **kwargs):
+        """HTTP GET method that responds with the materialized payload if
+        exists"""
+
+        # Note: the payload is the JSON representation, so requests with
+        #       query string (e.g. ?format=api) are computed as usual.
+        # Note: the payload is materialized per configured language, so
+        #       requests of other languages are computed as usual too.
+        language = get_language()
+
+        if self.use_payload and not request.query_params and \
+                language in get_home_payload_languages():
+            content = get_home_payload(language)
+
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+
+            # The payload doesn't exist yet (or has been expired).
+            schedule_home_payload_rebuild()
+
+        return super().get(request, *args, **kwargs)
+
     #     # Specify offset pagination.
     #     # pagination_class = pagination.LimitPagination
     #
@@ -114,7 +160,17 @@ class HomeListAPIView(ObjectMultipleModelAPIView):
             {
                 'queryset': Section.objects.filter(
                     is_active=True
-                ).order_by('display_order'),
+                ).order_by('display_order').prefetch_related(
+                    Prefetch(
+                        'section_cards_section',
+                        queryset=SectionCard.objects.filter(
+                            card__category__is_active=True
+                        ).select_related('card__category').order_by(
+                            'card__pk'
+                        ),
+                        to_attr='active_section_cards'
+                    )
+                ),
                 'serializer_class': serializers.SectionSerializer
             },
             # queryset with its serializer for products groups sliders.
@@ -122,7 +178,15 @@ class HomeListAPIView(ObjectMultipleModelAPIView):
                 'queryset': ProductGroup.objects.filter(
                     is_active=True,
                     products_product_group__isnull=False
-                ).distinct().order_by('display_order')[:3],
+                ).distinct().order_by('display_order').prefetch_related(
+                    Prefetch(
+                        'products_product_group',
+                        queryset=Product.objects.filter(
+                            is_available=True
+                        ).prefetch_related(*get_product_listing_prefetch()),
+                        to_attr='available_products'
+                    )
+                )[:3],
                 'serializer_class': serializers.ProductGroupSerializer
             }
         ]
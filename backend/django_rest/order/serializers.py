@@ -9,6 +9,7 @@ from django.conf import settings
 from datetime import date
 
 from core.models import POItem, PurchaseOrder, MetaItem, Address
+from core.attribute_index import get_context_attribute_index
 
 
 def get_home_url():
@@ -140,10 +141,14 @@ class POItemSerializer(serializers.ModelSerializer):
             # Initialize an empty dictionary
             returned_obj = {}
 
+            # Get the attribute index (see core/attribute_index.py), so the
+            # root titles are read without query.
+            index = get_context_attribute_index(self.context)
+
             for attr in attributes:
 
                 # Get root attribute title.
-                root_title = attr.get_root().title
+                root_title = index.get_root_title(attr.pk)
 
                 # In case 'root_title' doesn't exist as key yet.
                 if returned_obj.get(root_title) is None:
@@ -9,9 +9,11 @@ from django.core.mail import EmailMultiAlternatives
 
 from core.models import (PurchaseOrder, Promotion, POShipping, ShippingMethod,
                          POPayment, PaymentMethod, Address, Tax, Country,
-                         ProductItem, POItem, POProfile)
+                         Product, ProductItem, POItem, POProfile)
 
 from order.serializers import PurchaseOrderDetailsSerializer
+from core.cache import (get_model_label, get_instance_label,
+                        bump_generations)
 
 import logging
 # import requests
@@ -431,6 +433,7 @@ def set_purchase_order_details(po_code, **extra_fields):
                 product_item_bulk.append(
                     ProductItem(
                         id=product_item.id,
+                        product_id=product_item.product_id,
                         stock=new_p_i_stock,
                         limit_per_order=new_p_i_stock
                     )
@@ -439,6 +442,7 @@ def set_purchase_order_details(po_code, **extra_fields):
                 product_item_bulk.append(
                     ProductItem(
                         id=product_item.id,
+                        product_id=product_item.product_id,
                         stock=new_p_i_stock,
                         limit_per_order=product_item.limit_per_order
                     )
@@ -545,6 +549,21 @@ def set_purchase_order_details(po_code, **extra_fields):
                 fields=["stock", "limit_per_order"]
             )
 
+            # bulk_update() doesn't emit the signals, so invalidate the cached
+            # responses those depend on product items.
+            bump_generations([get_model_label(ProductItem)])
+
+            # Invalidate the cached details of products of the ordered items
+            # too (see product/views.py), since their stock has been changed.
+            # Note: 'product_id' is set to the bulk objects for this purpose
+            #       only, it isn't part of the updated fields.
+            bump_generations(
+                set(
+                    get_instance_label(Product, item.product_id)
+                    for item in product_item_bulk
+                )
+            )
+
         except Exception as e:
             # Here in case Anymail raise an exception while trying to send
             # the email, so you can define a way to deal with such
@@ -6,16 +6,12 @@ from rest_framework.response import Response
 from rest_framework.renderers import TemplateHTMLRenderer, JSONRenderer
 # from rest_framework.generics import get_object_or_404
 
-from cart.views import CartCheckApiView
-from shipping.views import ShippingCheckAPIView
-from payment.views import PaymentCheckApiView
-from core.models import round_money, PurchaseOrder, POProfile
+from core.models import PurchaseOrder, POProfile
+from core import checkout
 from order.tasks import set_purchase_order_details
 from order import serializers, throttles
 
 from django.urls import reverse
-from decimal import Decimal
-from django.conf import settings
 # from rest_framework.settings import api_settings
 # from rest_framework.exceptions import ParseError
 # from rest_framework import renderers
@@ -23,7 +19,6 @@ from django.conf import settings
 # from rest_framework.utils import json
 # import codecs
 
-import logging
 # import requests
 
 
@@ -80,6 +75,10 @@ import logging
 #            # Calling HTTP 'POST' method with DRF request object.
 #            a_http_response = a_view.post(request)
 
+# Note: the checkout APIViews don't call each other anymore, they are thin
+#       wrappers of the validation pipeline in core/checkout.py which returns
+#       result objects instead of HTTP responses.
+
 
 # class BodySavingJSONParser(BaseParser):
 #     """
@@ -127,9 +126,6 @@ class PurchaseOrderCheckAPIView(views.APIView):
 
     # parser_classes = [BodySavingJSONParser]
 
-    # Get the default value for money decimal digits from 'api' settings.
-    money_decimal_digits = settings.MONEY_DECIMAL_PLACES
-
     def post(self, request):
         """HTTP POST method"""
 
@@ -198,182 +194,9 @@ class PurchaseOrderCheckAPIView(views.APIView):
         #   "price_currency": <value> # not required
         # }
 
-        try:
-
-            # First step, check cart items by calling /cart/check/ with HTTP
-            # post request.
-
-            cart_check_res = CartCheckApiView().post(request)
-
-            if cart_check_res.status_code != status.HTTP_200_OK:
-                # We need additional info about which api is causing the error.
-                cart_check_res.data.update({
-                    "api": "cart"
-                })
-
-                return Response(
-                    cart_check_res.data,
-                    status=cart_check_res.status_code
-                )
-            elif not cart_check_res.data.get('items', None):
-                # In case cart was empty
-                cart_check_res.data.update({
-                    "message": "You can't create purchase order with empty "
-                               "cart",
-                    "api": "order"
-                })
-                return Response(
-                    cart_check_res.data,
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Get the info we need from cart api response if check went ok.
-            subtotal_currency = cart_check_res.data['price_currency']
-            subtotal_price_amount = cart_check_res.data['total_price_amount']
-
-            # Second step:
-            # 1- check shipping cost and
-            # 2- check the requested shipping method and
-            # 3- validate the shipping address by calling shipping cost view
-            # 4- Get the shipping cost.
-
-            shipping = request.data.get("shipping", None)
-            shipping_check_res = ShippingCheckAPIView().post(
-                request=request,
-                data=shipping
-            )
-
-            if shipping_check_res.status_code != status.HTTP_200_OK:
-                shipping_check_res.data.update({
-                    "api": "shipping"
-                })
-
-                return Response(
-                    shipping_check_res.data,
-                    status=shipping_check_res.status_code
-                )
-
-            # Get the info we need from shipping api if check went ok.
-            shipping_price_currency = shipping_check_res.data['price_currency']
-            shipping_cost_amount = \
-                shipping_check_res.data['shipping_cost_amount']
-
-            ################################################################
-            # Note: so far we don't have tax system, so we will ignore
-            #       it's cost
-            ################################################################
-
-            if subtotal_currency != shipping_price_currency:
-                return Response(
-                    {
-                        "message": "Error is occurred while trying to"
-                                   " create the order where shipping"
-                                   " cost currency is different from"
-                                   " subtotal currency",
-                        "shipping_cost_currency": shipping_price_currency,
-                        "cart_subtotal_currency": subtotal_currency
-                    },
-                    status=status.HTTP_409_CONFLICT
-                )
-
-            # Third step, calculate the grand total.
-
-            # Get Decimal value of shipping cost amount
-            cost_a = Decimal(shipping_cost_amount)
-
-            # Get Decimal value of subtotal amount
-            subtotal_a = Decimal(subtotal_price_amount)
-
-            # Find total price amount for (cart cost + shipping cost)
-            total_amount = cost_a + subtotal_a
-
-            # Set grand total price as money variable.
-            grand_total = round_money(amount=total_amount)
-
-            # Check that the grand total that calculated on server side is
-            # equal to the 'grand_total' argument of request POST data if
-            # exists while have same currency symbol, otherwise return error
-            # if they are not equals.
-
-            fr_grand_total = request.data.get("grand_total", None)
-            fr_price_currency = request.data.get("price_currency", None)
-
-            if fr_grand_total and fr_price_currency:
-
-                if fr_grand_total != grand_total or \
-                        fr_price_currency != grand_total.currency.code:
-
-                    return Response(
-                        {
-                            "message": "The sent frontend grand total is not "
-                                       "equal to value that calculated by "
-                                       "the server",
-                            "sent_price_currency": fr_price_currency,
-                            "sent_grand_total_amount": fr_grand_total,
-                            "price_currency": grand_total.currency.code,
-                            "price_currency_symbol": settings.CURRENCY_SYMBOLS[
-                                grand_total.currency.code
-                            ],
-                            "grand_total_amount": "{:.2f}".format(
-                                round(
-                                    grand_total.amount,
-                                    self.money_decimal_digits
-                                )
-                            ),
-                        },
-                        status=status.HTTP_409_CONFLICT
-                    )
-
-            # Fourth step, payment process.
-
-            # Get payment details from request POST data.
-            payment = request.data.get("payment", None)
-            payment_check_res = PaymentCheckApiView().post(
-                request=request,
-                data=payment
-            )
-
-            if payment_check_res.status_code != status.HTTP_200_OK:
-                payment_check_res.data.update({
-                    "api": "payment"
-                })
-
-                return Response(
-                    payment_check_res.data,
-                    status=payment_check_res.status_code
-                )
+        result = checkout.check_purchase_order(request.data)
 
-            # In case everything went ok.
-            return Response(
-                {
-                    'price_currency': grand_total.currency.code,
-                    'price_currency_symbol': settings.CURRENCY_SYMBOLS[
-                        grand_total.currency.code
-                    ],
-                    'grand_total_amount': "{:.2f}".format(
-                        round(
-                            grand_total.amount,
-                            self.money_decimal_digits
-                        )
-                    ),
-                    'cart_details': cart_check_res.data,
-                    'shipping_details': shipping_check_res.data,
-                    'payment_details': payment_check_res.data,
-                    'api': 'order'
-                },
-                status=status.HTTP_200_OK
-            )
-
-        except Exception as e:
-            logging.exception(e)
-
-            return Response(
-                {
-                    "message": "Error is occurred while trying to create the "
-                               "order"
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(result.data, status=result.status_code)
 
 
 class PurchaseOrderCreateAPIView(generics.CreateAPIView):
@@ -393,8 +216,8 @@ class PurchaseOrderCreateAPIView(generics.CreateAPIView):
 
         # Note: This method related to 'CreateAPIView' of 'generics' view that
         #       is the first method to trigger when HTTP POST request caught.
-        self.purchase_order_check_res = PurchaseOrderCheckAPIView().post(
-            request
+        self.purchase_order_check_res = checkout.check_purchase_order(
+            request.data
         )
 
         if self.purchase_order_check_res.status_code != status.HTTP_200_OK:
@@ -3,13 +3,17 @@
 from rest_framework import serializers
 # from rest_framework.response import Response
 
-from django.db.models import Subquery
+from django.db.models import prefetch_related_objects
 
 from itertools import chain
 # from operator import attrgetter
 
-from home.serializers import ProductSerializer
-from core.models import (Product, ProductItem, Supplier, ProductItemAttribute)
+from home.serializers import ProductSerializer, get_product_listing_prefetch
+from core.models import (Product, ProductItem, Supplier)
+from core.category_tree import get_category_tree
+from core.attribute_index import get_context_attribute_index
+from core.variants import (get_variant_matrix, get_matrix_items,
+                           get_matrix_combinations)
 
 
 class SupplierSerializer(serializers.ModelSerializer):
@@ -96,10 +100,14 @@ class ProductItemSerializer(serializers.ModelSerializer):
             # Initialize an empty dictionary
             returned_obj = {}
 
+            # Get the attribute index (see core/attribute_index.py), so the
+            # root titles are read without query.
+            index = get_context_attribute_index(self.context)
+
             for attr in attributes:
 
                 # Get root attribute title.
-                root_title = attr.get_root().title
+                root_title = index.get_root_title(attr.pk)
 
                 # In case 'root_title' doesn't exist as key yet.
                 if returned_obj.get(root_title) is None:
@@ -201,92 +209,6 @@ class ProductItemSerializer(serializers.ModelSerializer):
         return to_ret
 
 
-class ProductItemsSerializer(serializers.ModelSerializer):
-    """Serializer class of ProductItem model"""
-
-    class Meta:
-        """Serialize specific model fields"""
-
-        model = ProductItem
-        fields = ['slug', 'attributes']
-
-    # Define related/reverse model fields.
-    attributes = serializers.SerializerMethodField()
-
-    def get_product_item_attribute_thumbnail(self, instance, attribute):
-        """Return the thumbnail of instance if it's exists"""
-
-        # Get the related product item attribute.
-        product_item_attr = ProductItemAttribute.objects.filter(
-            product_item=instance,
-            product_attribute__attribute=attribute
-        ).first()
-
-        # if queryset return an object.
-        if product_item_attr:
-
-            # Get request object from 'context'.
-            # request = self.context.get("request")
-
-            # You can't use hasattr(instance, 'thumbnail') because instance has
-            # thumbnail field, but it could be blank.
-            if product_item_attr.thumbnail:
-                # Set the selected product item attribute thumbnail to
-                # thumbnail variable.
-                # thumbnail = request.build_absolute_uri(
-                #     product_item_attr.thumbnail.url
-                # )
-
-                thumbnail = product_item_attr.thumbnail.url
-
-                return thumbnail
-
-    def get_attributes(self, instance):
-        """Return dictionary of attributes for current ProductItem instance"""
-
-        # Get attributes of current instance.
-        queryset = instance.attributes
-
-        # Initialize an empty dictionary
-        attr_dict = {}
-
-        for attr in queryset:
-
-            # Get root attribute for current attribute
-            root_attr = attr.get_root()
-            # Get title of root attribute for current attribute instance.
-            root_title = root_attr.title
-
-            # In case 'root_title' doesn't exist as key yet.
-            if attr_dict.get(root_title) is None:
-                # 'root_title' key store list of related values.
-                attr_dict[root_title] = [
-                    {
-                        "parent_attribute": attr.parent.title,
-                        "child_attribute": attr.title,
-                        "thumbnail": self.get_product_item_attribute_thumbnail(
-                            instance=instance,
-                            attribute=attr
-                        )
-
-                    }
-                ]
-            else:
-                # Append new object for the exist list of attr_dict[root_title]
-                attr_dict[root_title].append(
-                    {
-                        "parent_attribute": attr.parent.title,
-                        "child_attribute": attr.title,
-                        "thumbnail": self.get_product_item_attribute_thumbnail(
-                            instance=instance,
-                            attribute=attr
-                        )
-                    }
-                )
-
-        return attr_dict
-
-
 class ProductDetailsSerializer(serializers.ModelSerializer):
     """Serialize class of Product category"""
 
@@ -326,11 +248,13 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
         # Initialize empty dictionary.
         attributes_dict = {}
 
+        index = get_context_attribute_index(self.context)
+
         # Loop over queryset.
         for item in queryset:
 
             # Get the root node title of the item instance.
-            root_title = item.attribute.get_root().title
+            root_title = index.get_root_title(item.attribute_id)
 
             # Check if attributes dictionary has root title as key or not.
             if attributes_dict.get(root_title) is None:
@@ -341,97 +265,32 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
 
         return attributes_dict
 
-    def get_related_product_items(self, instance):
-        """Return the uncommon attributes of current instance"""
+    def get_variant_matrix(self, instance):
+        """Return the variant matrix of current instance from the context of
+        view if exists (see core/variants.py)"""
 
-        # Get list of ProductItems of current instance.
-        queryset = instance.product_items_product.all()
+        if 'variant_matrix' not in self.context:
+            self.context['variant_matrix'] = get_variant_matrix(instance.pk)
 
-        return ProductItemsSerializer(
-            instance=queryset,
-            many=True,
-            read_only=True,
-            context=self.context
-        ).data
+        return self.context['variant_matrix']
 
-    def get_related_attributes(self, instance, prod_attr):
-        """Return related attributes of specific attribute overall product
-        items for current product"""
-
-        # Get list of ProductItems of current instance.
-        product_items = instance.product_items_product.filter(
-            product_item_attributes_product_item__product_attribute=prod_attr
-        )
-
-        # Initialize an empty dictionary.
-        attributes_dict = {}
-
-        # Loop over product items.
-        for item in product_items:
-
-            # Get attributes of current product items with exception to
-            # attribute family of provide product attribute.
-            attributes = item.attributes.exclude(
-                tree_id=prod_attr.attribute.tree_id
-            )
-
-            # Loop over attributes.
-            for attr in attributes:
-
-                # Get title of current attribute root.
-                attr_root_title = attr.get_root().title
-
-                # Check if attributes dictionary has root title as key or not.
-                if attributes_dict.get(attr_root_title) is None:
-                    attributes_dict[attr_root_title] = [attr.title]
-                elif attr.title not in attributes_dict[attr_root_title]:
-                    # Append non-duplicate values for specified key.
-                    attributes_dict[attr_root_title].append(attr.title)
+    def get_related_product_items(self, instance):
+        """Return the uncommon attributes of current instance"""
 
-        # Return dictionary where provided product attribute title as key,
-        # while its value is attributes dictionary.
-        return {prod_attr.attribute.title: attributes_dict}
+        # Note: the items of product with their attributes (and thumbnails)
+        #       are read from the precomputed variant matrix, instead of a
+        #       query for attributes of each item and a query for thumbnail
+        #       of each attribute.
+        return get_matrix_items(self.get_variant_matrix(instance))
 
     def get_available_attributes_combination(self, instance):
         """Return the available combination of product items attributes for
         current product"""
 
-        # Get list of uncommon ProductAttributes for current instance.
-        queryset = instance.product_attributes_product.filter(
-            is_common_attribute=False,
-            product_item_attributes_product_attribute__isnull=False
-        ).distinct()
-
-        # Initialize empty dictionary.
-        attributes_dict = {}
-
-        # Loop over queryset.
-        for item in queryset:
-
-            # Get root attribute of current product attribute.
-            root_attr = item.attribute.get_root()
-
-            # Get title if root attribute.
-            root_title = root_attr.title
-
-            # Check dictionary has specific key or not.
-            if attributes_dict.get(root_title) is None:
-
-                attributes_dict[root_title] = self.get_related_attributes(
-                    instance=instance,
-                    prod_attr=item
-                )
-            else:
-                # In case the 'root_title' is already found as key, then update
-                # its value.
-                attributes_dict[root_title].update(
-                    self.get_related_attributes(
-                        instance=instance,
-                        prod_attr=item
-                    )
-                )
-
-        return attributes_dict
+        # Note: the combinations are read from the precomputed variant matrix,
+        #       instead of a query for the items of each uncommon attribute
+        #       and a query for the attributes of each item.
+        return get_matrix_combinations(self.get_variant_matrix(instance))
 
     def get_selected_product_item(self, instance):
         """Return serialization of related product item"""
@@ -449,21 +308,23 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
     def get_related_products(self, instance):
         """Method to return 12 of related products for current product"""
 
-        # Get related attribute instances.
-        attributes = instance.attributes
-
         # Initialize an empty list.
         result = []
 
         # Get list of 12 (max) of the newest related products for current
         # instance with condition of same category and at least one of related
         # attributes.
+        # Note: the attributes are matched by the overlap (&&) lookup of the
+        #       attribute signature of products (see Product.attribute_ids)
+        #       instead of joining the attributes of products.
         queryset = Product.objects.filter(
-            category=instance.category,
+            category=instance.category_id,
             is_available=True,
-            product_attributes_product__attribute__in=attributes,
+            attribute_ids__overlap=instance.attribute_ids,
             product_items_product__isnull=False
-        ).exclude(pk=instance.pk).distinct().order_by('-created_at')[:12]
+        ).exclude(pk=instance.pk).distinct().order_by(
+            '-created_at'
+        )[:12]
 
         # Get queryset length.
         query_length = len(queryset)
@@ -471,8 +332,10 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
         # Check if length of queryset is less than 12.
         if query_length < 12:
 
-            # Get the category root node for current product instance.
-            root_node = instance.category.get_root()
+            # Get the category root node for current product instance from
+            # the category tree snapshot (see core/category_tree.py).
+            tree = get_category_tree()
+            root_node = tree.get_root(instance.category_id)
 
             # Set list of pk from queryset product instances.
             pk_list = [item.pk for item in queryset]
@@ -485,7 +348,7 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
             # where category is list of current product's root category family
             # and exclude the product instances these listed in 'pk_list'.
             extra_queryset = Product.objects.filter(
-                category__in=Subquery(root_node.get_family().values('pk')),
+                category__in=tree.get_family_ids(root_node.pk),
                 is_available=True,
                 product_items_product__isnull=False
             ).exclude(pk__in=pk_list).distinct().order_by(
@@ -493,7 +356,7 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
             )[:12-query_length]
 
             # Combine the two queryset.
-            result = chain(queryset, extra_queryset)
+            result = list(chain(queryset, extra_queryset))
 
             # In case wanted to sort the combined two queryset.
             # Note: no major deference between 'operator.attrgetter' and
@@ -508,7 +371,12 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
         # instances.
         if not result:
             # So set the main queryset value to 'result'.
-            result = queryset
+            result = list(queryset)
+
+        # Prefetch the related objects of combined instances at once, so the
+        # count of queries doesn't depend on how many products each queryset
+        # returns.
+        prefetch_related_objects(result, *get_product_listing_prefetch())
 
         # Serialize the instances of 'result'.
         return ProductSerializer(
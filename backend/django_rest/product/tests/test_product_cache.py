@@ -0,0 +1,197 @@
+""" Tests for the cached fragments of product details"""
+
+from django.urls import reverse
+
+from unittest import mock
+
+from core import models
+from core.tasks import refresh_product_item_prices
+from core.variants import refresh_variant_matrices
+from core.tests.catalog import CatalogTestCase
+
+
+class ProductDetailsCacheTest(CatalogTestCase):
+    """Test class for the cached fragments of product details"""
+
+    catalog_kwargs = {
+        'label': 'PC',
+        'categories': 1,
+        'depth': 1,
+        'products': 2,
+        'items': 2,
+        'attributes': 2,
+        'options': 2
+    }
+
+    def setUp(self):
+        """Generate sample catalog of products with items"""
+
+        super().setUp()
+
+        # Create the variant matrices as the task of celery worker does.
+        refresh_variant_matrices(
+            [product.pk for product in self.catalog.products]
+        )
+
+        self.product, self.other_product = self.catalog.products
+        self.items = [
+            item for item in self.catalog.product_items
+            if item.product_id == self.product.pk
+        ]
+
+    def get_details(self, product, **params):
+        """Request the details of the given product"""
+
+        return self.client.get(
+            reverse(
+                'product:specific-product-details',
+                kwargs={'slug': product.slug}
+            ),
+            params
+        )
+
+    def test_details_are_cached(self):
+        """Test that the second request of product details reads the product
+        and its fragments only"""
+
+        res = self.get_details(self.product)
+
+        # Note: the product and its variant matrix (the default item) are
+        #       read to build the cache keys.
+        with self.assertNumQueries(2):
+            cached_res = self.get_details(self.product)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(cached_res.data, res.data)
+        self.assertEqual(list(cached_res.data), list(res.data))
+
+    def test_only_item_reuses_item_fragment(self):
+        """Test that the 'only_item' request of the same item reuses the item
+        fragment of the full details"""
+
+        res = self.get_details(self.product, item_s=self.items[1].slug)
+
+        with self.assertNumQueries(2):
+            item_res = self.get_details(
+                self.product,
+                item_s=self.items[1].slug,
+                only_item='true'
+            )
+
+        self.assertEqual(
+            item_res.data,
+            {'selected_product_item': res.data['selected_product_item']}
+        )
+        self.assertEqual(
+            item_res.data['selected_product_item']['slug'],
+            self.items[1].slug
+        )
+
+    def test_item_edit_invalidates_its_product_only(self):
+        """Test that editing an item invalidates the details of its product
+        and keeps the details of other products"""
+
+        self.get_details(self.product)
+        self.get_details(self.other_product)
+
+        # Note: the generation is bumped after the transaction is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items[0].stock = 5
+            self.items[0].save()
+
+        res = self.get_details(self.product)
+
+        self.assertTrue(res.data['selected_product_item']['low_stock'])
+
+        with self.assertNumQueries(2):
+            self.get_details(self.other_product)
+
+    def test_image_and_promotion_invalidate_details(self):
+        """Test that adding an image or a promotion to the item invalidates
+        the details of its product"""
+
+        self.get_details(self.product)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image = models.ProductItemImage.objects.create(
+                product_item=self.items[0],
+                image='uploads/PC-image.jpg'
+            )
+
+        res = self.get_details(self.product)
+
+        self.assertEqual(
+            res.data['selected_product_item']['images'],
+            [image.image.url]
+        )
+
+        promotion = self.catalog.promotions[0]
+
+        with mock.patch('core.signals.refresh_product_item_prices.delay'):
+            with self.captureOnCommitCallbacks(execute=True):
+                promotion.title = 'PC Deal'
+                promotion.save()
+
+                models.PromotionItem.objects.get_or_create(
+                    promotion=promotion,
+                    product_item=self.items[0]
+                )
+
+        # Run the task of celery worker, which refreshes the price records of
+        # the items after the details have been invalidated.
+        self.get_details(self.product)
+        refresh_product_item_prices([self.items[0].pk])
+
+        res = self.get_details(self.product)
+
+        self.assertEqual(
+            res.data['selected_product_item']['promotion_title'],
+            'PC Deal'
+        )
+
+    def test_related_deal_invalidates_details(self):
+        """Test that a new deal of a related product invalidates the details
+        of product, since its fragment has the prices of related products"""
+
+        res = self.get_details(self.product)
+
+        self.assertEqual(
+            [obj['slug'] for obj in res.data['related_products']],
+            [self.other_product.slug]
+        )
+
+        deal_price = float(
+            res.data['related_products'][0]['product_item'][
+                'deal_price_amount'
+            ]
+        )
+
+        other_items = [
+            item for item in self.catalog.product_items
+            if item.product_id == self.other_product.pk
+        ]
+
+        with mock.patch('core.signals.refresh_product_item_prices.delay'):
+            with self.captureOnCommitCallbacks(execute=True):
+                promotion = models.Promotion.objects.create(
+                    title='PC Sale',
+                    discount_percentage=50,
+                    start_date=self.catalog.promotions[0].start_date,
+                    end_date=self.catalog.promotions[0].end_date
+                )
+
+                for item in other_items:
+                    models.PromotionItem.objects.get_or_create(
+                        promotion=promotion,
+                        product_item=item
+                    )
+
+        # Run the task of celery worker, which refreshes the price records of
+        # the items of related product only.
+        refresh_product_item_prices([item.pk for item in other_items])
+
+        res = self.get_details(self.product)
+        related_item = res.data['related_products'][0]['product_item']
+
+        # Note: the new deal is 50% off, which is more than the old deals.
+        self.assertLess(float(related_item['deal_price_amount']), deal_price)
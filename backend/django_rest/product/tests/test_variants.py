@@ -0,0 +1,172 @@
+""" Tests for the variant matrices of products"""
+
+from django.urls import reverse
+
+from unittest import mock
+
+from core import models
+from core.variants import (get_variant_matrix, refresh_variant_matrices,
+                           get_matrix_items, get_matrix_combinations)
+from core.tasks import refresh_product_variant_matrices
+from core.tests.catalog import CatalogTestCase
+
+
+class ProductVariantMatrixTest(CatalogTestCase):
+    """Test class for the variant matrices of products"""
+
+    catalog_kwargs = {
+        'label': 'V',
+        'categories': 1,
+        'depth': 1,
+        'products': 2,
+        'items': 2,
+        'attributes': 2,
+        'options': 2
+    }
+
+    def setUp(self):
+        """Generate sample catalog of products with items"""
+
+        super().setUp()
+
+        self.product = self.catalog.products[0]
+        self.items = [
+            item for item in self.catalog.product_items
+            if item.product_id == self.product.pk
+        ]
+
+    def test_matrix_of_product(self):
+        """Test that the matrix has the items of product with their
+        attributes, the combinations and the default item"""
+
+        matrix = get_variant_matrix(self.product.pk)
+        options = self.catalog.options
+
+        self.assertEqual(matrix['default_item_id'], self.items[0].pk)
+        self.assertEqual(
+            get_matrix_items(matrix),
+            [
+                {
+                    'slug': item.slug,
+                    'attributes': {
+                        root.title: [
+                            {
+                                'parent_attribute': root.title,
+                                'child_attribute': options[family][
+                                    index
+                                ].title,
+                                'thumbnail': None
+                            }
+                        ]
+                        for family, root in enumerate(
+                            self.catalog.attributes
+                        )
+                    }
+                }
+                for index, item in enumerate(self.items)
+            ]
+        )
+        self.assertEqual(
+            get_matrix_combinations(matrix)[self.catalog.attributes[0].title],
+            {
+                options[0][index].title: {
+                    self.catalog.attributes[1].title: [
+                        options[1][index].title
+                    ]
+                }
+                for index in range(2)
+            }
+        )
+
+    @mock.patch('core.tasks.refresh_product_variant_matrices.delay')
+    def test_missing_matrix_is_created_by_task(self, delay):
+        """Test that the missing matrix is built without saving it, its
+        creation is queued once, and then it's read with one query"""
+
+        models.ProductVariantMatrix.objects.all().delete()
+
+        matrix = get_variant_matrix(self.product.pk)
+        get_variant_matrix(self.product.pk)
+
+        self.assertFalse(
+            models.ProductVariantMatrix.objects.filter(
+                product=self.product
+            ).exists()
+        )
+        delay.assert_called_once_with([self.product.pk])
+
+        # Run the task of celery worker.
+        refresh_product_variant_matrices([self.product.pk])
+
+        with self.assertNumQueries(1):
+            saved_matrix = get_variant_matrix(self.product.pk)
+
+        self.assertEqual(
+            get_matrix_items(saved_matrix),
+            get_matrix_items(matrix)
+        )
+        self.assertEqual(
+            get_matrix_combinations(saved_matrix),
+            get_matrix_combinations(matrix)
+        )
+
+    def test_refresh_follows_deleted_item(self):
+        """Test that the refreshed matrix doesn't have the deleted item and
+        its attributes"""
+
+        self.items[1].delete()
+
+        matrix = refresh_variant_matrices([self.product.pk])[self.product.pk]
+
+        self.assertEqual(
+            [item['slug'] for item in matrix['items']],
+            [self.items[0].slug]
+        )
+        self.assertNotIn(
+            self.catalog.options[0][1].title,
+            get_matrix_combinations(matrix)[self.catalog.attributes[0].title]
+        )
+
+    @mock.patch('core.signals.refresh_product_variant_matrices.delay')
+    def test_item_attribute_save_queues_refresh(self, delay):
+        """Test that connecting product item to attribute queues the refresh
+        of matrix of its product"""
+
+        product_attribute = models.ProductAttribute.objects.filter(
+            product=self.product
+        ).first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.ProductItemAttribute.objects.create(
+                product_item=self.items[0],
+                product_attribute=product_attribute
+            )
+
+        delay.assert_called_once_with([], [self.items[0].pk], [])
+
+    def test_product_details_served_from_matrix(self):
+        """Test that the product details has the items and combinations of
+        the matrix and its default item"""
+
+        res = self.client.get(
+            reverse(
+                'product:specific-product-details',
+                kwargs={'slug': self.product.slug}
+            )
+        )
+
+        matrix = get_variant_matrix(self.product.pk)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.data['related_product_items'],
+            get_matrix_items(matrix)
+        )
+        self.assertEqual(
+            res.data['available_attributes_combination'],
+            get_matrix_combinations(matrix)
+        )
+        self.assertEqual(
+            res.data['selected_product_item']['slug'],
+            self.items[0].slug
+        )
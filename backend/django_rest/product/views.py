@@ -1,13 +1,24 @@
 """Create your api Views"""
 
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import get_language
+
 from rest_framework import generics
 from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
 
-from core.models import Product, ProductItem, Attribute
+from core.models import Product, ProductItem, ProductItemPrice, Attribute
+from core.attribute_index import get_attribute_index
+from core.variants import get_variant_matrix
+from core.cache import get_model_label, get_instance_label, get_generations
 
 from product import serializers
 from product import exceptions
 
+import logging
+
 
 class ProductRetrieveAPIView(generics.RetrieveAPIView):
     """APIView to retrieve specific product details"""
@@ -24,15 +35,21 @@ class ProductRetrieveAPIView(generics.RetrieveAPIView):
     # The default lookup_field is 'pk' and should be pass as argument in URL.
     lookup_field = 'slug'
 
-    def get_serializer_class(self):
-        """Override the super class method of selecting the appropriate
-        serializer class"""
+    def is_only_item(self):
+        """Return true in case only the selected item of product has been
+        requested"""
 
         # Get the value from 'only_item' url query parameter.
         only_item = self.request.query_params.get('only_item', None)
 
         # Check that if only_item value is equal to 'true' after strip/lower it
-        if (str(only_item).strip()).lower() == 'true':
+        return (str(only_item).strip()).lower() == 'true'
+
+    def get_serializer_class(self):
+        """Override the super class method of selecting the appropriate
+        serializer class"""
+
+        if self.is_only_item():
             return self.serializer_class['product_item_details']
 
         return self.serializer_class['product_details']
@@ -52,14 +69,35 @@ class ProductRetrieveAPIView(generics.RetrieveAPIView):
             product_items_product__isnull=False
         ).distinct()
 
-    @property
-    def get_product_item(self):
-        """Return the related product item depending on one of the following:
+    @cached_property
+    def get_product(self):
+        """Return the product instance of this retrieve view (or raise 404),
+        it's read once per request"""
+
+        return self.get_object()
+
+    def get_product_variant_matrix(self, product):
+        """Return the variant matrix of product (see core/variants.py), it's
+        read once per request"""
+
+        if not hasattr(self, '_variant_matrix'):
+            self._variant_matrix = get_variant_matrix(product.pk)
+
+        return self._variant_matrix
+
+    @cached_property
+    def get_product_item_ids(self):
+        """Return tuple of (pk, product pk) of the related product item
+        depending on one of the following:
             1- item_s query string.
             2- attr query string.
             3- default product item for current queryset.
         """
 
+        # Note: only the ids of product item are read here, since they are
+        #       enough to build the cache keys (see get_cache_keys()), and
+        #       the product item instance is read in case of cache miss only.
+
         # Get product item slug from 'item_s' url query parameter.
         item_slug = self.request.query_params.get('item_s', None)
 
@@ -68,40 +106,83 @@ class ProductRetrieveAPIView(generics.RetrieveAPIView):
         attr = self.request.query_params.get('attr', None)
 
         # Get the product instance of this retrieve view.
-        # Note: we use first() method to change queryset list that will contain
-        #       only one instance into just an instance.
-        product = self.get_queryset().first()
+        product = self.get_product
 
         # Initialize a none object.
-        instance = None
+        ids = None
 
         if item_slug:
-            instance = get_object_or_404(ProductItem, slug=item_slug)
+            # Note: the item of slug may belongs to another product, so its
+            #       product is read too.
+            ids = get_object_or_404(
+                ProductItem.objects.values_list('pk', 'product_id'),
+                slug=item_slug
+            )
 
         # In case no item slug has provided.
         elif attr:
             attr_set = set(item.strip() for item in attr.split(','))
 
-            attributes = Attribute.objects.filter(title__in=attr_set)
-
-            if attributes:
-
-                # Loop over all product items.
-                for item in product.product_items_product.all():
+            attribute_ids = list(
+                Attribute.objects.filter(title__in=attr_set).values_list(
+                    'pk',
+                    flat=True
+                )
+            )
+
+            if attribute_ids:
+
+                # Get the attribute index (see core/attribute_index.py), so
+                # the titles of attributes are read without query.
+                index = get_attribute_index()
+
+                # Loop over the product items those all their attributes are
+                # within the passed attributes, where the attribute signature
+                # of items (see ProductItem.attribute_ids) is matched by the
+                # contained by (<@) lookup instead of a query for the
+                # attributes of each item.
+                for pk, item_attribute_ids in \
+                        product.product_items_product.filter(
+                            attribute_ids__contained_by=attribute_ids
+                        ).order_by('pk').values_list('pk', 'attribute_ids'):
 
                     # Get title of current product item attributes.
-                    titles = set(attr.title for attr in item.attributes)
+                    titles = set(
+                        index.get_node(attribute_id).title
+                        for attribute_id in item_attribute_ids
+                    )
 
                     #  If the same elements are present in the two sets then
                     #  they are considered equal and True is returned,
                     #  otherwise False is returned.
                     if titles == attr_set:
-                        instance = item
+                        ids = (pk, product.pk)
                         break
 
-        # In case neither of 'attr' or 'item_slug' has provided
+        # In case neither of 'attr' or 'item_slug' has provided, get the
+        # default item of the variant matrix of product instead of
+        # item_instance() method.
         else:
-            instance = product.item_instance()
+            default_item_id = self.get_product_variant_matrix(
+                product
+            )['default_item_id']
+
+            if default_item_id:
+                ids = (default_item_id, product.pk)
+
+        if ids:
+            return tuple(ids)
+        else:
+            raise exceptions.ProductHasNoItem
+
+    @cached_property
+    def get_product_item(self):
+        """Return the related product item instance (see
+        get_product_item_ids())"""
+
+        instance = ProductItem.objects.filter(
+            pk=self.get_product_item_ids[0]
+        ).first()
 
         if instance:
             return instance
@@ -121,8 +202,139 @@ class ProductRetrieveAPIView(generics.RetrieveAPIView):
             }
         )
 
+        # Add the variant matrix in case it has been read already.
+        if hasattr(self, '_variant_matrix'):
+            context['variant_matrix'] = self._variant_matrix
+
         return context
 
+    # Note: the product details are cached as two fragments:
+    #       1- the product fragment: all the fields of product details except
+    #          'selected_product_item' (e.g. the variants and related
+    #          products).
+    #       2- the item fragment: the value of 'selected_product_item', which
+    #          is shared by the full details and 'only_item' requests of the
+    #          same item.
+    #       Both fragments are versioned by the generation counter of their
+    #       product (see core/signals.py), so an edit of product, its items,
+    #       images, attributes or promotions invalidates the fragments of
+    #       that product only, instead of the generation of whole model.
+
+    # Important: the product fragment has the prices and deals of the
+    #            related products too, which don't bump the generation of
+    #            product, so it's versioned by the generation of price
+    #            records (ProductItemPrice) too, which is bumped by the task
+    #            that refreshes the price records of any product (see
+    #            core/tasks.py). The other changes of related products (e.g.
+    #            titles) are kept for PRODUCT_DETAILS_CACHE_TIMEOUT seconds
+    #            only.
+
+    def get_cache_keys(self):
+        """Return dictionary of the cache keys of product and item fragments
+        of current request"""
+
+        product = self.get_product
+        item_id, item_product_id = self.get_product_item_ids
+
+        product_label = get_instance_label(Product, product.pk)
+        item_product_label = get_instance_label(Product, item_product_id)
+
+        price_label = get_model_label(ProductItemPrice)
+
+        generations = get_generations(
+            {product_label, item_product_label, price_label}
+        )
+
+        # The item fragment depends on the product of item too (in case of
+        # 'item_s' of another product).
+        item_version = '.'.join(
+            str(generations[label])
+            for label in sorted({product_label, item_product_label})
+        )
+
+        # The product fragment depends on the prices of related products.
+        product_version = f'{generations[product_label]}.' \
+                          f'{generations[price_label]}'
+
+        prefix = f'product-details:{product.slug}:{get_language()}'
+
+        return {
+            'product': f'{prefix}:{product_version}',
+            'item': f'{prefix}:item:{item_id}:{item_version}'
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the product details, where the fragments of product and its
+        selected item are read from cache if exist"""
+
+        product = self.get_product
+
+        # Don't cache the responses of authenticated users, since they may
+        # depend on the user (same as CachedResponseMixin).
+        if request.user.is_authenticated or \
+                not settings.PRODUCT_DETAILS_CACHE_TIMEOUT:
+            return Response(self.get_serializer(product).data)
+
+        # Resolve the selected item (or raise 404/400) before reading the
+        # cache.
+        self.get_product_item_ids
+
+        try:
+            keys = self.get_cache_keys()
+            fragments = cache.get_many(list(keys.values()))
+        except Exception as e:
+            # In case redis is down, respond without cache.
+            logging.exception(e)
+            return Response(self.get_serializer(product).data)
+
+        product_data = fragments.get(keys['product'], None)
+        item_data = fragments.get(keys['item'], None)
+
+        # Initialize empty dictionary of the missing fragments.
+        missing = {}
+
+        if self.is_only_item():
+            if item_data is None:
+                item_data = self.get_serializer(product).data[
+                    'selected_product_item'
+                ]
+                missing[keys['item']] = item_data
+
+            data = {'selected_product_item': item_data}
+
+        else:
+            if product_data is None:
+                data = self.get_serializer(product).data
+
+                # Keep the key of item in the product fragment, so the order
+                # of fields is the same as the serializer.
+                product_data = dict(data, selected_product_item=None)
+                missing[keys['product']] = product_data
+
+                if item_data is None:
+                    item_data = data['selected_product_item']
+                    missing[keys['item']] = item_data
+
+            elif item_data is None:
+                item_data = serializers.ProductOnlyItemDetailsSerializer(
+                    product,
+                    context=self.get_serializer_context()
+                ).data['selected_product_item']
+                missing[keys['item']] = item_data
+
+            data = dict(product_data, selected_product_item=item_data)
+
+        if missing:
+            try:
+                cache.set_many(
+                    missing,
+                    settings.PRODUCT_DETAILS_CACHE_TIMEOUT
+                )
+            except Exception as e:
+                logging.exception(e)
+
+        return Response(data)
+
 
 # class ProductRetrieveItemDetailsAPIView(generics.RetrieveAPIView):
 #     """APIView to retrieve specific product item details given product slug
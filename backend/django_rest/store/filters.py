@@ -3,12 +3,6 @@
 from django_filters import rest_framework as filters
 from django_filters.constants import EMPTY_VALUES
 
-from django.db.models import Q, Case, When
-
-from functools import reduce
-from operator import or_
-from itertools import product
-
 from core.models import Product, ProductItem
 from store import exceptions
 
@@ -109,6 +103,55 @@ from store import exceptions
 # )
 
 
+def validate_price_range(min_price, max_price):
+    """Validate the min and max price values (strings) of query parameters,
+    and raise an api exception if they are not valid"""
+
+    # Our price validation should be, we do the same to frontend validation
+    #
+    # Min price => 0 - 4999
+    # Max price => 0 - 5000
+
+    # Get the USD min and max prices amount from ProductItem model.
+    # Note: we do same validation on frontend.
+    usd_min_amount = ProductItem.USD_MIN_PRICE_AMOUNT
+    usd_max_amount = ProductItem.USD_MAX_PRICE_AMOUNT
+
+    # Note: "-1" and "1.5" are NOT considered numeric values, because all
+    #       the characters in the string must be numeric, and the - and
+    #       the . are not.
+
+    if min_price:
+        # Check if min_price value is numeric (also float) or not.
+        # Note: 1- is_numeric() only works with integer value otherwise
+        #          return false.
+        #       2- For non-negative (unsigned) integers only, use isdigit()
+        if not min_price.replace('.', '', 1).isdigit():
+            raise exceptions.InvalidPriceValueDataType
+
+        # Validate the value of min_price query string, and raise an
+        # api exception if it's not valid.
+        elif float(min_price) < usd_min_amount or \
+                float(min_price) >= usd_max_amount:
+            raise exceptions.InvalidMinPriceValue
+
+    if max_price:
+        # Check if max_price value is numeric or not.
+        if not max_price.replace('.', '', 1).isdigit():
+            raise exceptions.InvalidPriceValueDataType
+
+        # Validate the value of max_price query string, and raise an
+        # api exception if it's not valid.
+        if float(max_price) < usd_min_amount or \
+                float(max_price) > usd_max_amount:
+            raise exceptions.InvalidMaxPriceValue
+
+    if min_price and max_price:
+        # Validate that max price value is bigger than min price value.
+        if float(min_price) > float(max_price):
+            raise exceptions.InvalidMinMaxPriceValue
+
+
 class StringSeperatedByCommaFilter(filters.Filter):
     """Custom filter class to create a list of values from query_parameter of
     view url where its value is a string can contain a comma as mark to
@@ -222,7 +265,7 @@ class ProductFilter(filters.FilterSet):
         #     },
         # }
 
-    def __init__(self, titles=None, selected_items_dict=None, *args,
+    def __init__(self, families=None, selected_items_dict=None, *args,
                  **kwargs):
         """Do something with the filter or with the updated/added objects in
         backend filterset_kwargs"""
@@ -232,61 +275,20 @@ class ProductFilter(filters.FilterSet):
         # Note: self.data is QueryDict data type.
         data = self.data
 
-        # Set class attribute 'titles' with customized list of lists passed
-        # argument from backend filter class.
-        self.titles = titles
+        # Set class attribute 'families' with customized list of lists (the
+        # 'pk' of attribute leaf nodes grouped by their tree) passed argument
+        # from backend filter class.
+        self.families = families
 
         # Set class attribute 'selected_items_dict' with customized
         # dictionary variable => {'product_pk': 'item_instance'}.
         self.selected_items_dict = selected_items_dict
 
         # You can validate the data arguments.
-        min_price = data.get('min_price', None)
-        max_price = data.get('max_price', None)
-
-        # Our price validation should be, we do the same to frontend validation
-        #
-        # Min price => 0 - 4999
-        # Max price => 0 - 5000
-
-        # Get the USD min and max prices amount from ProductItem model.
-        # Note: we do same validation on frontend.
-        usd_min_amount = ProductItem.USD_MIN_PRICE_AMOUNT
-        usd_max_amount = ProductItem.USD_MAX_PRICE_AMOUNT
-
-        # Note: "-1" and "1.5" are NOT considered numeric values, because all
-        #       the characters in the string must be numeric, and the - and
-        #       the . are not.
-
-        if min_price:
-            # Check if min_price value is numeric (also float) or not.
-            # Note: 1- is_numeric() only works with integer value otherwise
-            #          return false.
-            #       2- For non-negative (unsigned) integers only, use isdigit()
-            if not min_price.replace('.', '', 1).isdigit():
-                raise exceptions.InvalidPriceValueDataType
-
-            # Validate the value of min_price query string, and raise an
-            # api exception if it's not valid.
-            elif float(min_price) < usd_min_amount or \
-                    float(min_price) >= usd_max_amount:
-                raise exceptions.InvalidMinPriceValue
-
-        if max_price:
-            # Check if max_price value is numeric or not.
-            if not max_price.replace('.', '', 1).isdigit():
-                raise exceptions.InvalidPriceValueDataType
-
-            # Validate the value of max_price query string, and raise an
-            # api exception if it's not valid.
-            if float(max_price) < usd_min_amount or \
-                    float(max_price) > usd_max_amount:
-                raise exceptions.InvalidMaxPriceValue
-
-        if min_price and max_price:
-            # Validate that max price value is bigger than min price value.
-            if float(min_price) > float(max_price):
-                raise exceptions.InvalidMinMaxPriceValue
+        validate_price_range(
+            data.get('min_price', None),
+            data.get('max_price', None)
+        )
 
     # Specify fields type of Meta.fields/extra which will be use as
     # 'query_parameter' for the view url to retrieve filtered queryset.
@@ -362,101 +364,56 @@ class ProductFilter(filters.FilterSet):
         # name: represent the field_name if had been set.
         # value: represent the argument value in URL.
 
-        # Construct the full lookup expression.
-        lookup = '__'.join([name, 'in'])
+        # Initialize the list of lists from class instance attribute
+        # 'families'.
+        families = self.families
 
-        # Initialize the list of lists from class instance attribute 'titles'.
-        titles = self.titles
-
-        # In case titles list is empty, return the None which means there
+        # In case families list is empty, return the None which means there
         # is no matching.
-        if not titles:
+        if not families:
             return queryset.none()
 
-        # No need to go through long process if there is only one item in set.
-        elif len(titles) > 1:
-
-            #############################################################
-
-            # This part of code for learn purpose:
-
-            # Get max length of list item inside list.
-            # Info: map(function, iterator) will execute function on iterator
-            #       items.
-            # length = max(map(len, titles))
-
-            # Get items count of list.
-            # items_count = len(looped_instances)
-
-            # Loop over range of items_count to create 2D array(list of lists)
-            # for i in range(items_count):
-            #     # Add an empty list defined list. Rows
-            #     list_of_lists.append([])
-            #
-            #     # Loop over range length.
-            #     for j in range(length):
-            #         # Add for each item [i] value of None. Columns
-            #         list_of_lists[i].append(None)
-
-            #############################################################
-
-            # Cartesian product: (this method for create dictionary of tuples
-            # that each tuple contain a unique values from a list of lists that
-            # provided).
-            # Note: Cartesian product returns duplicate tuples.
-
-            # Get Set of dictionary of tuples and convert it to list as
-            # Cartesian product.
-            cartesian_product = list(set(product(*titles)))
-
-            # Initialize empty list for queries, since we need to do
-            # queries on sub-tuple items of cartesian_product as AND
-            # (.filter) and between the sub-tuples as OR (Q(|)).
-            queries = []
-
-            # Loop over cartesian_product tuples.
-            for t_item in cartesian_product:
-                # We set new query as the provided queryset list.
-                query = queryset
-                # Loop over t_item
-                for attribute in t_item:
-                    # For each item in tuple in cartesian_product do
-                    # (.filter) on.
-                    # We use Q() object that can take a 2-tuple where first
-                    # item is string that specifies the "key" while second item
-                    # the "value".
-                    # Here key is the defined 'field_name' while value is
-                    # 'attribute':
-                    #
-                    # queryset.filter(<field_name>=attribute)
-                    #
-                    query = query.filter(Q((name, attribute)))
-
-                # Append list of query into queries list.
-                queries.append(query)
-
-            # Info: The reduce(fun,seq) function is used to apply
-            #       a particular function passed in its argument to all the
-            #       list elements mentioned in the sequence passed along,
-            #       can be combined with lambda or operator interface
-            #       functions e.g. add, mul, or_ ..etc
-
-            # Now for each query list in 'queries' we connect them with OR
-            # operator.
-            queryset = reduce(or_, queries)
-
+        # Note: the product should have any of the attributes of each family
+        #       (OR within the family) and all the families (AND between the
+        #       families), the old way was a cartesian product of the titles
+        #       of families where each combination is chained filter() (join)
+        #       and the combinations are connected with OR, so the query was
+        #       growing exponentially with the count of selected attributes.
+        #
+        #       Instead, the attribute signature of product (see
+        #       Product.attribute_ids) should overlap the attributes of each
+        #       family:
+        #
+        #       WHERE attribute_ids && ARRAY[...] AND attribute_ids && ...
+        #
+        #       So each family is one condition using the GIN index of
+        #       signatures without any join, whatever the count of selected
+        #       attributes is.
+        for family in families:
+            queryset = queryset.filter(attribute_ids__overlap=family)
+
+        return queryset
+
+    def annotate_price(self, queryset):
+        """Annotate the queryset with the effective price of the selected or
+        the default product item"""
+
+        # Note: the price of product depend on its item that selected in the
+        #       dictionary if exists, otherwise the default item of product,
+        #       and it's the deal price in case the item has active deal
+        #       promotion otherwise its list price.
+
+        # Check that the queryset has not been annotated already (e.g. both
+        # min_price and max_price have been provided).
+        if 'item_effective_price_amount' in queryset.query.annotations:
             return queryset
 
-        # In case only one value passed within query parameter.
-        else:
-            # This is in case you want to set lookup with value.
-            # Note: since our lookup expr using (in), so our value should be
-            #       iterable (list, set or tuple).
-            return queryset.filter(**{lookup: titles[0]})
+        items = None
 
-            # alternatively, you could opt to hardcode the lookup after remove
-            # 'field_name' from your argument filter. e.g.,
-            # return queryset.filter(published_on__isnull=False)
+        if self.selected_items_dict:
+            items = self.selected_items_dict.values()
+
+        return queryset.with_item_effective_price(items=items)
 
     def filter_min_price(self, queryset, name, value):
         """customized method for min_price argument of filter set"""
@@ -465,42 +422,12 @@ class ProductFilter(filters.FilterSet):
         # name: represent the field_name if had been set.
         # value: represent the argument value in URL.
 
-        # Initialize an empty list to store 'pk' of conditional products.
-        products = []
-
-        # Loop over queryset of products.
-        for prod in queryset:
-
-            # Loop over current product instance items.
-            # if you search depending on items, use 'break' when condition is
-            # true
-            # for item in product.product_items_product.all():
-
-            # Initialize instance variable.
-            instance_var = None
-
-            # Return the product item instance if this product 'pk' if found in
-            # the dictionary, or return None.
-            if self.selected_items_dict:
-                instance_var = self.selected_items_dict.get(prod.pk, None)
-
-            # Check if current product return a item_deal_price property value.
-            if prod.item_deal_price(item=instance_var):
-
-                # Check if item_deal_price is bigger than equal provided value.
-                if prod.item_deal_price(item=instance_var).amount >= value:
-
-                    # If so, append current product 'pk' into products list
-                    # and break the loop.
-                    products.append(prod.pk)
-
-            # In case the current item don't have item_deal_price, check its
-            # item_list_price is bigger than equal provided value or not.
-            elif prod.item_list_price(item=instance_var).amount >= value:
-                products.append(prod.pk)
-
-        # return the queryset for certain products.
-        return queryset.filter(pk__in=products)
+        # return the queryset for certain products, the effective price (deal
+        # price if exists otherwise list price) is bigger than equal provided
+        # value.
+        return self.annotate_price(queryset).filter(
+            item_effective_price_amount__gte=value
+        )
 
     def filter_max_price(self, queryset, name, value):
         """customized method for max_price argument of filter set"""
@@ -509,141 +436,26 @@ class ProductFilter(filters.FilterSet):
         # name: represent the field_name if had been set.
         # value: represent the argument value in URL.
 
-        # Initialize an empty list to store 'pk' of conditional products.
-        products = []
-
-        # Loop over queryset of products.
-        for prod in queryset:
-
-            # Initialize instance variable.
-            instance_var = None
-
-            # Return the product item instance if this product 'pk' if found in
-            # the dictionary, or return None.
-            if self.selected_items_dict:
-                instance_var = self.selected_items_dict.get(prod.pk, None)
-
-            # Check if current product return a item_deal_price property value.
-            if prod.item_deal_price(item=instance_var):
-
-                # Check if item_deal_price is less than equal provided
-                # value.
-                if prod.item_deal_price(item=instance_var).amount <= value:
-                    # If so, append current product 'pk' into products list
-                    # and break the loop.
-                    products.append(prod.pk)
-
-            # In case the current product don't have item_deal_price, check its
-            # item_instance is less than equal provided value or not.
-            elif prod.item_list_price(item=instance_var).amount <= value:
-                products.append(prod.pk)
-
-        # return the queryset for certain products.
-        return queryset.filter(pk__in=products)
+        # return the queryset for certain products, the effective price (deal
+        # price if exists otherwise list price) is less than equal provided
+        # value.
+        return self.annotate_price(queryset).filter(
+            item_effective_price_amount__lte=value
+        )
 
     def sorting_price(self, queryset, reverse=False):
         """Method to sort queryset of Product model depending on price"""
 
         # Info: if reverse is False, means sorting will be from low to high.
 
-        def get_list_price(prod):
-            """Return the list price as Money for product OR product_item
-            instance if exists in dictionary"""
-
-            # Initialize instance variable.
-            instance_var = self.selected_items_dict.get(prod.pk, None)
-
-            # Get list price as Money.
-            money = prod.item_list_price(item=instance_var)
-
-            return money
-
-        def get_is_has_deal_price(prod):
-            """Return True if product instance 'pk' is found in the dictionary
-            And the selected product item instance has deal price"""
-
-            # Initialize instance variable.
-            product_item = self.selected_items_dict.get(prod.pk, None)
-
-            if product_item and product_item.deal_price:
-                return True
-            else:
-                return False
+        ordering = 'item_effective_price_amount'
 
-        def get_deal_price(prod):
-            """Return the deal price as Money for product OR product_item
-            instance if exists in dictionary"""
+        if reverse:
+            ordering = f'-{ordering}'
 
-            # Initialize instance variable.
-            instance_var = self.selected_items_dict.get(prod.pk, None)
-
-            # Get deal price as Money.
-            money = prod.item_deal_price(item=instance_var)
-
-            return money
-
-        # Info: sorted()/sort() methods working fine with value of Money.
-
-        # if dictionary has selected item/items for current queryset products.
-        if self.selected_items_dict:
-
-            # Return a sorted list of model instances, in case they/their
-            # product item have deal price or list price.
-
-            # Important: Be careful here, you should return list/deal price for
-            #            product item of each query instance in case that
-            #            instance 'pk' is found in the dictionary.
-            sorted_products = sorted(
-                queryset,
-                key=lambda instance:
-                get_deal_price(prod=instance)
-                if get_is_has_deal_price(prod=instance)
-                else get_list_price(prod=instance),
-                reverse=reverse
-            )
-
-        else:
-            # Return a sorted list of model instances, in case they have deal
-            # price or item list price.
-
-            # This is in case you trying to sort against value of instance
-            # property, use:
-            #
-            # getattr(instance, '<property>')
-            #
-            # sorted_products = sorted(
-            #                 queryset,
-            #                 key=lambda instance:
-            #                 getattr(instance, 'item_deal_price')
-            #                 if instance.item_deal_price
-            #                 else getattr(instance, 'item_list_price'),
-            #                 reverse=reverse
-            #             )
-            #
-
-            sorted_products = sorted(
-                queryset,
-                key=lambda instance:
-                instance.item_deal_price()
-                if instance.item_deal_price()
-                else instance.item_list_price(),
-                reverse=reverse
-            )
-
-        # Get the list 'pk' of sorted products.
-        pk_list = [instance.pk for instance in sorted_products]
-
-        # Write a Case of list arguments (*) of pk for queryset, when value of
-        # current enumerate iterate is equal to 'pk' then set the position of
-        # current iterate as value to the 'preserved' list.
-        # Info: this will re-order the queryset list depending on position
-        #       value of enumerate.
-        preserved = Case(
-            *[When(pk=pk, then=pos) for pos, pk in enumerate(pk_list)]
-        )
-
-        # ORM order_by() is kind of sorted method.
-        return queryset.filter(pk__in=pk_list).order_by(preserved)
+        # ORM order_by() is kind of sorted method, and for products that have
+        # the same price keep the default ordering of view queryset.
+        return self.annotate_price(queryset).order_by(ordering, '-created_at')
 
     def filter_select_by(self, queryset, name, value):
         """customized method for select_by"""
@@ -664,32 +476,11 @@ class ProductFilter(filters.FilterSet):
             # Check if parameter string is 'deals'.
             if str(choice).lower() == 'deals':
 
-                # Initialize an empty list to store 'pk' of conditional
-                # products.
-                products = []
-
-                # Loop over queryset of products.
-                for prod in queryset:
-
-                    # Initialize instance variable.
-                    instance_var = None
-
-                    # Return the product item instance if this product 'pk' if
-                    # found in the dictionary, or return None.
-                    if self.selected_items_dict:
-                        instance_var = self.selected_items_dict.get(
-                            prod.pk,
-                            None
-                        )
-
-                    # Check if current item return a deal_price property value.
-                    if prod.item_deal_price(instance_var):
-                        # If so, append current product 'pk' into products
-                        # list
-                        products.append(prod.pk)
-
-                # return the queryset for certain products.
-                return queryset.filter(pk__in=products)
+                # return the queryset for certain products, the selected or
+                # default item of them has a deal price.
+                return self.annotate_price(queryset).filter(
+                    item_deal_price_amount__isnull=False
+                )
 
             # Check if parameter string is 'low-to-high'.
             if str(choice).lower() == 'price-low-to-high':
@@ -2,7 +2,8 @@
 
 from rest_framework import serializers
 
-from core.models import (Category, Attribute)
+from core.models import (Category, Attribute, CategoryFacet)
+from core.category_tree import get_context_category_tree
 
 # Note: the calling of serializer inside another one called 'Nested
 #       relationships'.
@@ -89,7 +90,14 @@ class CategorySerializer(serializers.ModelSerializer):
         # Note: You have multiple ways to achieve what you need :
         #
         # 1- You can use get_children() method of MPTTModel:
-        leaf_nodes = instance.get_children().filter(is_active=True)
+        # leaf_nodes = instance.get_children().filter(is_active=True)
+        #
+        #    Here the children are read from the category tree snapshot (see
+        #    core/category_tree.py) without any query.
+        tree = get_context_category_tree(self.context)
+        leaf_nodes = [
+            node for node in tree.get_children(instance.pk) if node.is_active
+        ]
         #
         # 2- You can use related_name of ForeignKey (it's 'leaf_nodes' in our
         #    Category model class of parent field) to serialize reverse
@@ -128,10 +136,13 @@ class CategoryDetailsSerializer(CategorySerializer):
     def ancestor_nodes(self, instance):
         """Return all ancestors of instance, including the instance itself"""
 
-        # Get all the ancestor model instances including current instance.
-        ancestor_nodes = instance.get_ancestors(include_self=True).filter(
-            is_active=True
-        )
+        # Get all the ancestor nodes including current instance from the
+        # category tree snapshot (as get_ancestors() without query).
+        tree = get_context_category_tree(self.context)
+        ancestor_nodes = [
+            node for node in tree.get_ancestors(instance.pk, include_self=True)
+            if node.is_active
+        ]
 
         # Serialize the 'ancestor_nodes' list.
         return CategoryChildSerializer(
@@ -166,90 +177,21 @@ class AttributeChildSerializer(serializers.ModelSerializer):
         ]
 
 
-class AttributeSerializer(serializers.ModelSerializer):
-    """Serialize class of Attribute model"""
+class CategoryFacetSerializer(serializers.ModelSerializer):
+    """Serialize class of CategoryFacet model"""
+
+    # Note: the options of each facet are the titles of attributes (level 1)
+    #       those connected to specific group of categories and have
+    #       products, which are precomputed (see core/facets.py), so the
+    #       serializer doesn't run any query.
 
     class Meta:
         """Serialize specific model fields"""
 
-        model = Attribute
+        model = CategoryFacet
         fields = [
             'title',
             'input_class',
             'display_order',
             'options'
         ]
-
-    # Define related/reverse model fields.
-    options = serializers.SerializerMethodField()
-
-    def get_options(self, instance):
-        """Return list of attributes title that are connected to specific group
-         of categories for filtering"""
-
-        # Get category_slug from the view request.
-        # kwarg_category_slug = self.context.get(
-        #     'request'
-        # ).parser_context['kwargs']['category_slug']
-
-        # Get the context of 'category_ancestors' that we add to the serializer
-        # context of the view.
-        category_ancestors = self.context.get('category_ancestors')
-
-        # Get conditional descendant instances of attributes for current
-        # instance ordered alphabetically.
-        # Info: it's important to not return attributes that not connected to
-        #       product.
-        # Note: get_descendants() doesn't include the current instance.
-        attributes = instance.get_descendants().filter(
-            category_attributes_attribute__category__in=category_ancestors,
-            product_attributes_attribute__product__isnull=False
-        ).distinct()
-
-        # initialize an empty list.
-        pk_list = []
-
-        # Loop over returned attribute instances to get family of each one.
-        for attribute in attributes:
-            # Add the title of instance to the list as parent and child
-            # title, in case its parent is a root node, otherwise use the
-            # parent title.
-            # if attribute.parent.is_root_node():
-            #     options.append(
-            #         {
-            #             'child_title': attribute.title
-            #         }
-            #     )
-            # elif attribute.parent.parent.is_root_node():
-            #     options.append(
-            #         {
-            #             'child_title': attribute.parent.title,
-            #             'grandchild_title': attribute.title
-            #         }
-            #     )
-            # else:
-            #     options.append(
-            #         {
-            #             'child_title': attribute.parent.parent.title,
-            #             'grandchild_title': attribute.parent.title
-            #         }
-            #     )
-
-            # Add the (level=1) in tree family instances for current attribute
-            # ancestor.
-            # Note: get_family() is iterable while get_root() is not.
-            pk_list += [
-                item.pk for item in attribute.get_family().filter(level=1)
-            ]
-
-        # Get attributes instances for non-duplicated pk and sort them.
-        sorted_attributes = Attribute.objects.filter(
-            pk__in=set(pk_list)
-        ).order_by('display_order').only('title')
-
-        # Loop over query of instances and get only title value.
-        options = [item.title for item in sorted_attributes]
-
-        # Return the sorted list of non-duplicated titles of attributes (level
-        # 1) as options.
-        return options
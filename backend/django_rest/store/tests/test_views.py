@@ -0,0 +1,833 @@
+""" Tests for your store app views code"""
+
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from elasticsearch import ConnectionError as ElasticsearchConnectionError
+from elasticsearch_dsl import Search
+from elasticsearch_dsl.response import Response
+
+from unittest import mock, skipUnless
+
+from core import models
+from core.category_tree import get_category_tree
+from core.documents import ProductDocument
+from core.indexer import (index_product_items, get_product_actions,
+                          send_actions)
+from core.tests.catalog import generate_catalog, CatalogTestCase
+from store.views import SearchAPIView, SuggestAPIView
+
+from datetime import timedelta
+
+import os
+
+
+# Define the url of products list for certain category.
+PRODUCT_LIST_URL = reverse(
+    'store:store-specific-product-list',
+    kwargs={'category_slug': 'shirts'}
+)
+
+
+# Disable the auto sync of elasticsearch documents, since the tests don't
+# connect to elasticsearch server.
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+class ProductListAPIViewTest(TestCase):
+    """Test class for ProductListAPIView"""
+
+    def setUp(self):
+        """Create sample product with items of different attributes"""
+
+        self.client = APIClient()
+
+        # Note: the snapshots of attributes and categories are refreshed
+        #       after the transaction is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            category = models.Category.objects.create(
+                title='Shirts',
+                slug='shirts',
+                is_active=True
+            )
+            supplier = models.Supplier.objects.create(title='Supplier')
+
+            self.product = models.Product.objects.create(
+                title='AXC Shirt',
+                slug='axc-shirt',
+                thumbnail='uploads/axc-shirt.jpg',
+                summary='Text',
+                category=category,
+                is_available=True
+            )
+
+            # Create attribute families (root and its leaf nodes) and connect
+            # the leaf nodes to the product.
+            product_attributes = {}
+
+            for root_title, titles in (('Color', ('Red', 'Blue')),
+                                       ('Size', ('Small', 'Large'))):
+                root = models.Attribute.objects.create(title=root_title)
+
+                for title in titles:
+                    attribute = models.Attribute.objects.create(
+                        title=title,
+                        parent=root
+                    )
+                    product_attributes[title] = \
+                        models.ProductAttribute.objects.create(
+                            product=self.product,
+                            attribute=attribute,
+                            is_common_attribute=False
+                        )
+
+            # Create the product items with their attributes.
+            self.items = []
+
+            for titles in (('Red', 'Small'), ('Blue', 'Large'),
+                           ('Red', 'Large')):
+                item = models.ProductItem.objects.create(
+                    product=self.product,
+                    supplier=supplier,
+                    list_price=10
+                )
+
+                for title in titles:
+                    models.ProductItemAttribute.objects.create(
+                        product_item=item,
+                        product_attribute=product_attributes[title]
+                    )
+
+                self.items.append(item)
+
+    def test_selected_item_has_most_matched_attributes(self):
+        """Test that the selected item of product is the one that has the
+        biggest count of matched attributes"""
+
+        res = self.client.get(PRODUCT_LIST_URL, {'attr': 'Red,Large'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'][0]['product_item']['slug'],
+            self.items[2].slug
+        )
+
+    def test_selected_item_of_equal_matched_attributes(self):
+        """Test that the selected item of product is the first one in case
+        of equal count of matched attributes"""
+
+        res = self.client.get(PRODUCT_LIST_URL, {'attr': 'Red'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'][0]['product_item']['slug'],
+            self.items[0].slug
+        )
+
+    def test_products_list_constant_queries(self):
+        """Test that the count of queries for products list doesn't depend on
+        the count of products in the page"""
+
+        models.ProductItemPrice.objects.refresh()
+
+        # Build the category tree snapshot of the process before counting.
+        get_category_tree()
+
+        with CaptureQueriesContext(connection) as single_product_queries:
+            self.client.get(PRODUCT_LIST_URL)
+
+        # Create more products with items.
+        for index in range(5):
+            product = models.Product.objects.create(
+                title=f'Shirt {index}',
+                slug=f'shirt-{index}',
+                thumbnail='uploads/shirt.jpg',
+                summary='Text',
+                category=self.product.category,
+                is_available=True
+            )
+            models.ProductItem.objects.create(
+                product=product,
+                supplier=self.items[0].supplier,
+                list_price=10
+            )
+
+        models.ProductItemPrice.objects.refresh()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(PRODUCT_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 6)
+        self.assertEqual(len(queries), len(single_product_queries))
+
+    @override_settings(PRODUCT_LISTING_ENGINE='elasticsearch')
+    @mock.patch('elasticsearch_dsl.Search.execute', autospec=True)
+    def test_products_list_by_search_engine(self, execute):
+        """Test that the products list is served by the listing documents,
+        sorted by the price of the selected item of database"""
+
+        execute.return_value = Response(Search(), {
+            'hits': {
+                'total': {'value': 1, 'relation': 'eq'},
+                'hits': [
+                    {
+                        '_index': 'products',
+                        '_id': str(self.product.pk),
+                        '_score': None
+                    }
+                ]
+            }
+        })
+
+        res = self.client.get(
+            PRODUCT_LIST_URL,
+            {'attr': 'Red,Large', 'select_by': 'price-low-to-high'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(
+            res.data['results'][0]['product_item']['slug'],
+            self.items[2].slug
+        )
+
+        # The search is executed once, filtered by the category and the
+        # families of the passed attributes.
+        self.assertEqual(execute.call_count, 1)
+
+        body = execute.call_args[0][0].to_dict()
+
+        self.assertIn(
+            {'term': {'category_ids': self.product.category.pk}},
+            body['query']['bool']['filter']
+        )
+        self.assertEqual(
+            len([
+                query for query in body['query']['bool']['filter']
+                if 'terms' in query
+            ]),
+            2
+        )
+
+        # The products are sorted by the price of their listed item, the
+        # selected item of database.
+        price_ordering = body['sort'][0]['items.effective_price']
+
+        self.assertIn(
+            {'terms': {'items.id': [self.items[2].pk]}},
+            price_ordering['nested']['filter']['bool']['should']
+        )
+
+    @override_settings(PRODUCT_LISTING_ENGINE='elasticsearch')
+    @mock.patch(
+        'elasticsearch_dsl.Search.execute',
+        autospec=True,
+        side_effect=ConnectionError('Elasticsearch is down')
+    )
+    def test_products_list_falls_back_to_database(self, execute):
+        """Test that the products list is served by the database in case
+        the search engine is down"""
+
+        res = self.client.get(PRODUCT_LIST_URL, {'attr': 'Red,Large'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(
+            res.data['results'][0]['product_item']['slug'],
+            self.items[2].slug
+        )
+
+
+# Important: the engines are compared only if the environment variable
+#            'PRODUCT_LISTING_ELASTICSEARCH' is set, since the listing
+#            documents of generated catalog are indexed into (and deleted
+#            from) the index of ProductDocument, so use a disposable cluster.
+@skipUnless(
+    os.environ.get('PRODUCT_LISTING_ELASTICSEARCH', None),
+    'The products listing engines are compared with elasticsearch server'
+)
+class ProductListEnginesTest(CatalogTestCase):
+    """Test class for the parity of 'sql' and 'elasticsearch' engines of
+    ProductListAPIView"""
+
+    catalog_kwargs = {
+        'label': 'LE',
+        'categories': 1,
+        'depth': 1,
+        'products': 9,
+        'items': 3,
+        'attributes': 2,
+        'options': 2
+    }
+
+    def setUp(self):
+        """Generate sample catalog, where the listed item of products varies,
+        and index its listing documents"""
+
+        super().setUp()
+
+        # Note: the generated items are the same for all products (the item
+        #       of index 1 has the second options of attributes), so:
+        #       1- every third product has no item with the second option of
+        #          first attribute, and lists its default item instead.
+        #       2- the default item of every third product (other ones) is
+        #          its last item.
+        #       3- the creation dates are distinct, so the products with the
+        #          same price are sorted in the same order by both engines.
+        now = timezone.now()
+
+        for index, product in enumerate(self.catalog.products):
+            items = list(product.product_items_product.order_by('pk'))
+
+            if index % 3 == 0:
+                models.ProductItemAttribute.objects.get(
+                    product_item=items[1],
+                    product_attribute__attribute=self.catalog.options[0][1]
+                ).delete()
+            elif index % 3 == 1:
+                models.ProductItem.objects.filter(pk=items[0].pk).update(
+                    is_default=False
+                )
+                models.ProductItem.objects.filter(pk=items[2].pk).update(
+                    is_default=True
+                )
+
+            models.Product.objects.filter(pk=product.pk).update(
+                created_at=now - timedelta(minutes=index)
+            )
+
+        self.product_ids = [product.pk for product in self.catalog.products]
+
+        if not ProductDocument._index.exists():
+            ProductDocument._index.create()
+
+        send_actions(get_product_actions(self.product_ids), 500)
+        ProductDocument._index.refresh()
+
+    def tearDown(self):
+        """Delete the listing documents of catalog from elasticsearch"""
+
+        send_actions(
+            [
+                {
+                    '_op_type': 'delete',
+                    '_index': ProductDocument._index._name,
+                    '_id': pk
+                } for pk in self.product_ids
+            ],
+            500
+        )
+
+    def get_listing(self, engine, params):
+        """Return list of (product slug, listed item slug) and the count of
+        products listed by the given engine"""
+
+        url = reverse(
+            'store:store-specific-product-list',
+            kwargs={'category_slug': self.catalog.leaf_categories[0].slug}
+        )
+
+        with override_settings(PRODUCT_LISTING_ENGINE=engine):
+            res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data['count'], [
+            (product['slug'], product['product_item']['slug'])
+            for product in res.data['results']
+        ]
+
+    def test_engines_list_same_products(self):
+        """Test that both engines filter, sort and check the deals of
+        products by the same listed item"""
+
+        first_option, second_option = [
+            options[1].title for options in self.catalog.options
+        ]
+        default_option = self.catalog.options[0][0].title
+
+        cases = [
+            {},
+            {'select_by': 'deals'},
+            {'select_by': 'price-low-to-high'},
+            {'select_by': 'price-high-to-low'},
+            {'min_price': 13, 'max_price': 17},
+            {'attr': first_option},
+            {'attr': first_option, 'select_by': 'deals'},
+            {'attr': first_option, 'select_by': 'price-low-to-high'},
+            {'attr': first_option, 'select_by': 'price-high-to-low'},
+            {'attr': first_option, 'min_price': 13, 'max_price': 17},
+            {
+                'attr': f'{first_option},{second_option}',
+                'select_by': 'price-high-to-low'
+            },
+            {'attr': default_option, 'select_by': 'deals'}
+        ]
+
+        for params in cases:
+            with self.subTest(params=params):
+                count, listing = self.get_listing('sql', params)
+
+                self.assertEqual(
+                    self.get_listing('elasticsearch', params),
+                    (count, listing)
+                )
+
+
+def get_search_response(product_items, total, facets=None):
+    """Return elasticsearch response of the given hits (product items in the
+    order of their score) and facet aggregations"""
+
+    facets = facets or {}
+
+    def get_facet(name):
+        return {
+            'doc_count': total,
+            'options': {'buckets': facets.get(name, [])}
+        }
+
+    return Response(Search(), {
+        'hits': {
+            'total': {'value': total * 2, 'relation': 'eq'},
+            'hits': [
+                {
+                    '_index': 'product-items',
+                    '_id': str(item.pk),
+                    '_score': len(product_items) - index,
+                    '_source': {'product_id': item.product_id, 'sku': item.sku}
+                } for index, item in enumerate(product_items)
+            ]
+        },
+        'aggregations': {
+            'total_collapsed': {'doc_count': total, 'count': {'value': total}},
+            'facet_attr': get_facet('facet_attr'),
+            'facet_attr_0': get_facet('facet_attr_0'),
+            'facet_category': get_facet('facet_category'),
+            'facet_price': get_facet('facet_price')
+        }
+    })
+
+
+# Use local memory cache instead of redis, so the tests don't read the cached
+# results of search of another run.
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class SearchAPIViewTest(TestCase):
+    """Test class for SearchAPIView"""
+
+    def setUp(self):
+        """Create api client and sample catalog"""
+
+        cache.clear()
+
+        self.client = APIClient()
+        self.catalog = generate_catalog(label='S', products=3, items=2)
+        self.url = reverse('store:store-search', kwargs={'query': 'product'})
+
+    def test_search_is_executed_once_with_page_window(self):
+        """Test that the search engine is requested once for the window of
+        current page, and the products are listed in the order of hits"""
+
+        # Score order is the opposite of creation order.
+        hits = [products[1] for products in reversed(
+            [self.catalog.product_items[i:i + 2] for i in range(0, 6, 2)]
+        )]
+
+        with mock.patch.object(
+            SearchAPIView,
+            'execute_search',
+            return_value=get_search_response(hits, total=15)
+        ) as execute_search:
+            res = self.client.get(self.url, {'page': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        execute_search.assert_called_once_with(12, 12)
+        self.assertEqual(res.data['count'], 15)
+        self.assertEqual(
+            [product['slug'] for product in res.data['results']],
+            [item.product.slug for item in hits]
+        )
+        self.assertEqual(
+            [product['product_item']['slug']
+             for product in res.data['results']],
+            [item.slug for item in hits]
+        )
+
+    def test_search_constant_queries(self):
+        """Test that the count of queries of search page doesn't depend on
+        the count of products in the page, even if the price records of the
+        matched items don't exist"""
+
+        models.ProductItemPrice.objects.all().delete()
+
+        queries_count = []
+
+        for hits in (self.catalog.product_items[:1],
+                     self.catalog.product_items[::2]):
+            with mock.patch.object(
+                SearchAPIView,
+                'execute_search',
+                return_value=get_search_response(hits, total=len(hits))
+            ), CaptureQueriesContext(connection) as queries:
+                res = self.client.get(self.url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), len(hits))
+
+            # The deal price of matched item (with deal promotion) is read
+            # without the price record.
+            self.assertEqual(
+                res.data['results'][0]['product_item']['promotion_title'],
+                hits[0].latest_deal_promotion_item_title
+            )
+            self.assertIsNotNone(
+                res.data['results'][0]['product_item']['deal_price_amount']
+            )
+
+            queries_count.append(len(queries))
+
+        self.assertEqual(queries_count[0], queries_count[1])
+
+    def test_faceted_search(self):
+        """Test that the facet filters are sent as post filter with the facet
+        aggregations in the same request, and the facets are returned"""
+
+        option = self.catalog.options[0][0]
+        hits = self.catalog.product_items[:1]
+
+        buckets = {
+            'facet_attr': [
+                {
+                    'key': f'S Attribute 1 >> {self.catalog.options[1][0]}',
+                    'doc_count': 2,
+                    'products': {'value': 1}
+                }
+            ],
+            'facet_attr_0': [
+                {
+                    'key': f'S Attribute 0 >> {option.title}',
+                    'doc_count': 2,
+                    'products': {'value': 1}
+                }
+            ],
+            'facet_category': [
+                {
+                    'key': hits[0].product.category.slug,
+                    'doc_count': 2,
+                    'products': {'value': 1}
+                }
+            ],
+            'facet_price': [
+                {'to': 25.0, 'doc_count': 2, 'products': {'value': 1}}
+            ]
+        }
+
+        with mock.patch(
+            'elasticsearch_dsl.Search.execute',
+            autospec=True,
+            return_value=get_search_response(hits, total=1, facets=buckets)
+        ) as execute:
+            res = self.client.get(self.url, {
+                'attr': option.title,
+                'category': self.catalog.root_categories[0].slug,
+                'min_price': '1',
+                'max_price': '100'
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        body = execute.call_args[0][0].to_dict()
+
+        self.assertEqual(
+            body['post_filter'],
+            {
+                'bool': {
+                    'filter': [
+                        {'terms': {'attributes': [option.title]}},
+                        {'term': {'category_slugs': (
+                            self.catalog.root_categories[0].slug
+                        )}},
+                        {'range': {'effective_price': {
+                            'gte': 1.0, 'lte': 100.0
+                        }}}
+                    ]
+                }
+            }
+        )
+        self.assertIn('facet_attr_0', body['aggs'])
+
+        facets = res.data['facets']
+
+        self.assertEqual(
+            [facet['title'] for facet in facets['attributes']],
+            ['S Attribute 0', 'S Attribute 1']
+        )
+        self.assertEqual(
+            facets['attributes'][0]['options'],
+            [{'title': option.title, 'count': 1}]
+        )
+        self.assertEqual(
+            facets['categories'][0]['title'],
+            hits[0].product.category.title
+        )
+        self.assertEqual(
+            facets['prices'],
+            [{'from': None, 'to': 25.0, 'count': 1}]
+        )
+
+    def test_invalid_price_filter(self):
+        """Test that invalid price filter returns an error response without
+        requesting the search engine"""
+
+        with mock.patch('elasticsearch_dsl.Search.execute') as execute:
+            res = self.client.get(self.url, {'min_price': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        execute.assert_not_called()
+
+    @override_settings(SEARCH_RESULTS_CACHE_TIMEOUT=0)
+    def test_degraded_search(self):
+        """Test that the last response of search is served in degraded mode
+        while elasticsearch is unavailable, otherwise the products are
+        matched by their title"""
+
+        hits = self.catalog.product_items[::2][:2]
+
+        with mock.patch(
+            'elasticsearch_dsl.Search.execute',
+            autospec=True,
+            return_value=get_search_response(hits, total=2)
+        ):
+            res = self.client.get(self.url)
+
+        self.assertFalse(res.data['degraded'])
+
+        with mock.patch(
+            'elasticsearch_dsl.Search.execute',
+            autospec=True,
+            side_effect=ElasticsearchConnectionError('Elasticsearch is down')
+        ):
+            res = self.client.get(self.url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(res.data['degraded'])
+            self.assertEqual(res.data['count'], 2)
+            self.assertEqual(
+                [product['product_item']['slug']
+                 for product in res.data['results']],
+                [item.slug for item in hits]
+            )
+
+            # The query without last response.
+            product = self.catalog.products[1]
+
+            res = self.client.get(
+                reverse('store:store-search', kwargs={'query': product.title})
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['degraded'])
+        self.assertEqual(
+            [result['slug'] for result in res.data['results']],
+            [product.slug]
+        )
+
+    def test_search_results_are_cached(self):
+        """Test that the same words of query (in any order and case) are
+        served from the cached results until the index is updated"""
+
+        hits = self.catalog.product_items[::2]
+
+        with mock.patch(
+            'elasticsearch_dsl.Search.execute',
+            autospec=True,
+            return_value=get_search_response(hits, total=len(hits))
+        ) as execute:
+            res = self.client.get(
+                reverse('store:store-search', kwargs={'query': 'Red Shirt'})
+            )
+            cached_res = self.client.get(
+                reverse('store:store-search', kwargs={'query': 'shirt, red'})
+            )
+
+            self.assertEqual(execute.call_count, 1)
+            self.assertEqual(cached_res.data, res.data)
+
+            # The other page of same query isn't cached.
+            self.client.get(
+                reverse('store:store-search', kwargs={'query': 'red shirt'}),
+                {'page': 2}
+            )
+
+            self.assertEqual(execute.call_count, 2)
+
+            # The indexer bumps the generation of search index.
+            with mock.patch('core.indexer.send_actions', return_value=1):
+                index_product_items([hits[0].pk])
+
+            self.client.get(
+                reverse('store:store-search', kwargs={'query': 'red shirt'})
+            )
+
+            self.assertEqual(execute.call_count, 3)
+
+
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    SEARCH_BACKEND='core.search.PostgresSearchBackend',
+    PRODUCT_LISTING_ENGINE='sql',
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class PostgresSearchBackendTest(TestCase):
+    """Test class for SearchAPIView with the postgres search backend"""
+
+    def setUp(self):
+        """Create api client and sample catalog with stored search
+        columns"""
+
+        cache.clear()
+
+        self.client = APIClient()
+        self.catalog = generate_catalog(label='P', products=3, items=2)
+
+        self.product = self.catalog.products[1]
+        self.product.title = 'Linen Shirt'
+        self.product.save()
+
+        # Note: elasticsearch is not enabled, so only the stored search
+        #       columns of product items are updated.
+        index_product_items(
+            [item.pk for item in self.catalog.product_items]
+        )
+
+    def search(self, query, data=None):
+        """Return the response of search page of the given query"""
+
+        with mock.patch('elasticsearch_dsl.Search.execute') as execute:
+            res = self.client.get(
+                reverse('store:store-search', kwargs={'query': query}),
+                data
+            )
+
+        execute.assert_not_called()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res
+
+    def test_search_matches_all_words(self):
+        """Test that the products those have all the query words (after
+        stemming) are listed once with their best item"""
+
+        res = self.search('linen shirts')
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['results'][0]['slug'], self.product.slug)
+        self.assertEqual(
+            res.data['results'][0]['product_item']['slug'],
+            self.product.product_items_product.order_by('pk')[0].slug
+        )
+
+        # All products are matched except the renamed one.
+        res = self.search('p product')
+
+        self.assertEqual(res.data['count'], len(self.catalog.products) - 1)
+        self.assertNotIn(
+            self.product.slug,
+            [product['slug'] for product in res.data['results']]
+        )
+
+    def test_search_typos_fall_back_to_trigram_similarity(self):
+        """Test that the query with typos matches the similar words"""
+
+        res = self.search('linnen')
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['results'][0]['slug'], self.product.slug)
+
+    def test_search_facet_filters(self):
+        """Test that the facet filters are applied to the product items, so
+        the best item of product is one of the filtered items"""
+
+        option = self.catalog.options[0][1]
+
+        res = self.search('linen', {'attr': option.title})
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(
+            res.data['results'][0]['product_item']['slug'],
+            self.product.product_items_product.get(**{
+                'product_item_attributes_product_item__product_attribute__'
+                'attribute': option
+            }).slug
+        )
+
+        res = self.search('linen', {'category': 'unknown'})
+
+        self.assertEqual(res.data['count'], 0)
+
+    def test_unavailable_products_are_excluded(self):
+        """Test that the products those are not available are not listed"""
+
+        self.product.is_available = False
+        self.product.save()
+
+        res = self.search('linen')
+
+        self.assertEqual(res.data['count'], 0)
+
+
+@override_settings(
+    ELASTICSEARCH_DSL_AUTOSYNC=False,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+)
+class SuggestAPIViewTest(TestCase):
+    """Test class for SuggestAPIView"""
+
+    def setUp(self):
+        """Create api client"""
+
+        cache.clear()
+
+        self.client = APIClient()
+
+    def test_suggestions_of_hot_prefix_are_cached(self):
+        """Test that the suggestions of the same (normalized) prefix are
+        requested once from the search engine"""
+
+        with mock.patch.object(
+            SuggestAPIView,
+            'get_suggestions',
+            return_value=['Shirts', 'Shirt AXC']
+        ) as get_suggestions:
+            res = self.client.get(
+                reverse('store:store-suggest', kwargs={'prefix': 'Sh'})
+            )
+            cached_res = self.client.get(
+                reverse('store:store-suggest', kwargs={'prefix': ' sh '})
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], ['Shirts', 'Shirt AXC'])
+        self.assertEqual(cached_res.data, res.data)
+        get_suggestions.assert_called_once_with('sh')
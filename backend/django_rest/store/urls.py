@@ -38,6 +38,11 @@ urlpatterns = [
         'store/search/<str:query>/',
         views.SearchAPIView.as_view(),
         name='store-search'
+    ),
+    path(
+        'store/suggest/<str:prefix>/',
+        views.SuggestAPIView.as_view(),
+        name='store-suggest'
     )
 
 ]
@@ -1,21 +1,43 @@
 """Create your api Views"""
 
-from rest_framework import generics
+from rest_framework import generics, views
+from rest_framework.response import Response
 from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import ValidationError
 # from rest_framework.filters import SearchFilter, OrderingFilter
 
 # from django_filters import rest_framework as rest_filters
 
-from django.db.models import Subquery
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Subquery, OuterRef, Exists, F
+from django.http import Http404
+from django.utils.functional import cached_property
 
 from elasticsearch_dsl import Q
 
-from core.models import (Category, Product, Attribute)
-from core.documents import ProductItemDocument
-from core.views import PaginatedElasticSearchListAPIView
-from home.serializers import ProductSerializer, ProductSearchSerializer
+from core.models import (Category, Product, ProductItem, Attribute,
+                         ProductAttribute,
+                         ProductItemAttribute, CategoryFacet)
+from core.documents import (ProductItemDocument, ProductDocument,
+                            SuggestionDocument)
+from core.views import (PaginatedElasticSearchListAPIView,
+                        SearchPaginationMixin, SearchResults)
+from core.cache import (CachedResponseMixin, get_model_label,
+                        get_generations)
+from core.category_tree import get_category_tree
+from core.attribute_index import get_attribute_index
+from core.search import (execute_elasticsearch, CachedSearchResponse,
+                         SEARCH_INDEX_GENERATION)
+from core.indexer import parse_attribute_facet
+from home.serializers import (ProductSerializer, ProductSearchSerializer,
+                              get_product_listing_prefetch,
+                              get_matched_items_prefetch)
 from store import serializers, pagination, filters
 
+import hashlib
+import json
+import logging
 import re
 
 
@@ -79,47 +101,498 @@ class SearchAPIView(PaginatedElasticSearchListAPIView):
     # Set required attributes value of inherit class.
     kwargs_query = 'query'
     model_class = Product
-    filter_lookup = 'product_items_product__sku'
-    filter_keyword = 'sku'
+    filter_lookup = 'pk'
+    filter_keyword = 'product_id'
     filter_exclude_arg = 'is_available'
     filter_exclude_val = 'False'
-    filter_order_by = '-created_at'
+    # Note: the matched items are collapsed into their products, so each
+    #       product is listed once with its best matched item.
+    collapse_field = 'product_id'
+    source_fields = ('sku',)
+    # Note: in degraded mode, the query words are matched with the titles
+    #       of products.
+    degraded_search_fields = ('product__title',)
     serializer_class = ProductSearchSerializer
     document_class = ProductItemDocument
     pagination_class = pagination.PageNumberPaginationWithCount
 
+    def filter_search(self, search):
+        """Override the search filters to exclude the unavailable products
+        within elasticsearch, so the pages are full"""
+
+        return search.filter('term', is_available=True)
+
+    def get_prefetch_related_lookups(self):
+        """Override the prefetch lookups of queryset"""
+
+        return get_product_listing_prefetch()
+
+    def get_matched_items(self, search_response):
+        """Return dictionary of {product id: {'id': item id, 'sku': item sku}}
+        of the best matched product item of each product in search response"""
+
+        # Note: the hits are collapsed by product, so each hit is the best
+        #       matched item of its product and the document id is the
+        #       primary key of product item.
+        return {
+            int(ele.product_id): {'id': int(ele.meta.id), 'sku': ele.sku}
+            for ele in search_response
+        }
+
+    def get_search_prefetch_related_lookups(self, search_response):
+        """Override the search prefetch lookups to read the matched product
+        items of the page with their promotions and attributes at once"""
+
+        items_id = [
+            item['id']
+            for item in self.get_matched_items(search_response).values()
+        ]
+
+        return [get_matched_items_prefetch(items_id)]
+
+    def get_query_tokens(self, query):
+        """Return the sorted list of words of query string after normalizing
+        them (lower case without special characters)"""
+
+        # Note: the words are matched in any order (see
+        #       generate_q_expression() method), so the sorted list is the
+        #       same for 'red shirt' and 'Shirt, Red'.
+        return sorted(re.sub(r"\W+", " ", str(query or '')).lower().split())
+
+    def get_search_cache_key(self, start, size):
+        """Return the cache key of results of current search and window of
+        hits (page), or None if the query doesn't have any word"""
+
+        tokens = self.get_query_tokens(self.kwargs.get(self.kwargs_query))
+
+        if not tokens:
+            return None
+
+        # The cached facets have the titles of categories.
+        generations = get_generations(
+            [SEARCH_INDEX_GENERATION, get_model_label(Category)]
+        )
+
+        versions = '.'.join(
+            str(generations[label]) for label in sorted(generations)
+        )
+
+        value = json.dumps(
+            [
+                settings.SEARCH_BACKEND,
+                tokens,
+                self.facet_values,
+                start,
+                size
+            ],
+            sort_keys=True
+        )
+
+        digest = hashlib.md5(value.encode()).hexdigest()
+
+        return f'search:results:{digest}:{versions}'
+
+    def execute_search(self, start, size):
+        """Override the search execution to serve the repeated queries from
+        the cached results of search"""
+
+        # Note: the cached results are the ids of products and their matched
+        #       items (not the rendered response), so the products are read
+        #       from database with their current prices and stock, and the
+        #       results are invalidated by bumping the generation of search
+        #       index (see core/indexer.py) whenever the documents change.
+        #       The results of rare queries just expire after
+        #       SEARCH_RESULTS_CACHE_TIMEOUT seconds.
+
+        # Note: validate the facet filters outside try block, so their
+        #       validation exceptions are returned to the client.
+        self.facet_values
+
+        timeout = settings.SEARCH_RESULTS_CACHE_TIMEOUT
+
+        if not timeout:
+            return super().execute_search(start, size)
+
+        try:
+            key = self.get_search_cache_key(start, size)
+            results = cache.get(key) if key else None
+        except Exception as e:
+            # In case redis is down, search without cache.
+            logging.exception(e)
+            key, results = None, None
+
+        if results is not None:
+            return self.get_cached_search_response(results)
+
+        search_response = super().execute_search(start, size)
+
+        # Don't cache the responses of degraded mode.
+        if key is None or self.search_backend.degraded:
+            return search_response
+
+        results = {
+            'hits': [
+                [int(ele.product_id), int(ele.meta.id), ele.sku]
+                for ele in search_response
+            ],
+            'total': self.get_search_total(search_response),
+            'facets': self.get_facets(search_response)
+        }
+
+        try:
+            cache.set(key, results, timeout)
+        except Exception as e:
+            logging.exception(e)
+
+        return self.get_cached_search_response(results)
+
+    def get_cached_search_response(self, results):
+        """Return search response of the given cached results of search"""
+
+        return CachedSearchResponse(
+            [
+                {
+                    'product_id': product_id,
+                    'sku': sku,
+                    'meta': {'id': item_id, 'score': None}
+                } for product_id, item_id, sku in results['hits']
+            ],
+            results['total'],
+            results['facets']
+        )
+
     def get_serializer_context(self):
         """Override the serializer context"""
 
         # Get current class instance serializer context
         context = super().get_serializer_context()
 
-        # Get value of search response.
+        # Get value of search response (memoized, not executed again).
         search_response = self.get_search_response()
 
-        # Create list of filter_keyword string from search response.
-        items_sku = [ele[self.filter_keyword] for ele in search_response]
-
         # Update the serializer context.
         context.update(
             {
-                'items_sku': items_sku
+                'matched_items': self.get_matched_items(search_response)
             }
         )
 
         return context
 
+    @cached_property
+    def facet_values(self):
+        """Return dictionary of {facet name: value} of the facet filters
+        those passed within url query strings"""
+
+        # Note: 'attr' titles are grouped by their root attribute (e.g.
+        #       'Red,Blue,Large' is (Red OR Blue) AND Large) as the filter of
+        #       products list does, where each group is a separate facet, so
+        #       the options of a facet are counted without its own filter.
+        params = self.request.query_params
+
+        facet_values = {}
+
+        attr = params.get('attr', None)
+
+        if attr:
+            titles = set(
+                item.strip() for item in attr.split(',') if item.strip()
+            )
+
+            groups = {}
+            for attribute in Attribute.objects.filter(
+                title__in=titles
+            ).annotate(
+                root_title=Subquery(
+                    Attribute.objects.filter(
+                        tree_id=OuterRef('tree_id'),
+                        parent__isnull=True
+                    ).values('title')[:1]
+                )
+            ).values('title', 'root_title'):
+                groups.setdefault(attribute['root_title'], set()).add(
+                    attribute['title']
+                )
+
+            # The unknown titles don't match any document.
+            for title in titles - set(
+                    title for group in groups.values() for title in group):
+                groups[title] = {title}
+
+            for root_title, group in groups.items():
+                facet_values[f'attr:{root_title}'] = sorted(group)
+
+        category = params.get('category', None)
+
+        if category:
+            facet_values['category'] = category
+
+        min_price = params.get('min_price', None)
+        max_price = params.get('max_price', None)
+
+        filters.validate_price_range(min_price, max_price)
+
+        price_range = {}
+        if min_price:
+            price_range['gte'] = float(min_price)
+        if max_price:
+            price_range['lte'] = float(max_price)
+
+        if price_range:
+            facet_values['price'] = price_range
+
+        return facet_values
+
+    @cached_property
+    def facet_filters(self):
+        """Return dictionary of {facet name: list of Q() expressions} of the
+        facet filters those passed within url query strings"""
+
+        facet_filters = {}
+
+        for name, value in self.facet_values.items():
+            if name.startswith('attr:'):
+                facet_filters[name] = [Q('terms', attributes=value)]
+            elif name == 'category':
+                facet_filters[name] = [Q('term', category_slugs=value)]
+            elif name == 'price':
+                facet_filters[name] = [Q('range', effective_price=value)]
+
+        return facet_filters
+
+    def filter_search_queryset(self, queryset):
+        """Override the filters of database search backend to exclude the
+        unavailable products and apply the facet filters to the product
+        items"""
+
+        queryset = queryset.filter(product__is_available=True)
+
+        for name, value in self.facet_values.items():
+            if name.startswith('attr:'):
+                # The product item has one of the attributes as common
+                # attribute of its product or as its own attribute.
+                queryset = queryset.filter(
+                    Exists(
+                        ProductAttribute.objects.filter(
+                            product=OuterRef('product'),
+                            is_common_attribute=True,
+                            attribute__title__in=value
+                        )
+                    ) | Exists(
+                        ProductItemAttribute.objects.filter(
+                            product_item=OuterRef('pk'),
+                            product_attribute__attribute__title__in=value
+                        )
+                    )
+                )
+
+            elif name == 'category':
+                # The category or any of its descendants.
+                tree = get_category_tree()
+                node = tree.get_node_by_slug(value)
+
+                if node is None:
+                    return queryset.none()
+
+                queryset = queryset.filter(
+                    product__category__in=tree.get_descendant_ids(
+                        node.pk,
+                        include_self=True
+                    )
+                )
+
+            elif name == 'price':
+                queryset = queryset.with_effective_price().filter(**{
+                    f'effective_price_amount__{lookup}': amount
+                    for lookup, amount in value.items()
+                })
+
+        return queryset
+
+    def get_post_filters(self):
+        """Override the post filters with the facet filters"""
+
+        return [
+            q for name in sorted(self.facet_filters)
+            for q in self.facet_filters[name]
+        ]
+
+    def get_facet_filter(self, *excluded_names):
+        """Return Q() expression of all the facet filters except the given
+        facet names"""
+
+        return Q('bool', filter=[
+            q for name in sorted(self.facet_filters)
+            if name not in excluded_names
+            for q in self.facet_filters[name]
+        ])
+
+    def add_search_aggregations(self, search, post_filters):
+        """Override the aggregations to compute the facet counts in the same
+        request of search"""
+
+        # Note: the hits are collapsed by product, so the count of each
+        #       option is the count of distinct products not the items.
+        def count_products(bucket):
+            bucket.metric('products', 'cardinality', field='product_id')
+
+        # The attributes those are not filtered, counted with all filters.
+        count_products(
+            search.aggs.bucket(
+                'facet_attr',
+                'filter',
+                filter=self.get_facet_filter()
+            ).bucket(
+                'options',
+                'terms',
+                field='attribute_facets',
+                size=settings.SEARCH_FACET_SIZE
+            )
+        )
+
+        # Each filtered attribute is counted without its own filter.
+        for index, name in enumerate(sorted(
+                name for name in self.facet_filters
+                if name.startswith('attr:'))):
+            count_products(
+                search.aggs.bucket(
+                    f'facet_attr_{index}',
+                    'filter',
+                    filter=self.get_facet_filter(name)
+                ).bucket(
+                    'options',
+                    'terms',
+                    field='attribute_facets',
+                    size=settings.SEARCH_FACET_SIZE
+                )
+            )
+
+        count_products(
+            search.aggs.bucket(
+                'facet_category',
+                'filter',
+                filter=self.get_facet_filter('category')
+            ).bucket(
+                'options',
+                'terms',
+                field='category_slug',
+                size=settings.SEARCH_FACET_SIZE
+            )
+        )
+
+        count_products(
+            search.aggs.bucket(
+                'facet_price',
+                'filter',
+                filter=self.get_facet_filter('price')
+            ).bucket(
+                'options',
+                'range',
+                field='effective_price',
+                ranges=[
+                    {
+                        key: value
+                        for key, value in (('from', start), ('to', end))
+                        if value is not None
+                    }
+                    for start, end in settings.SEARCH_PRICE_RANGES
+                ]
+            )
+        )
+
+    def get_facets(self, search_response):
+        """Return the facets (options and count of products) of search
+        response"""
+
+        if isinstance(search_response, CachedSearchResponse):
+            return search_response.facets
+
+        facets = {'attributes': [], 'categories': [], 'prices': []}
+
+        if not hasattr(search_response, 'aggregations'):
+            return facets
+
+        aggregations = search_response.aggregations
+
+        filtered_roots = sorted(
+            name.split(':', 1)[1] for name in self.facet_filters
+            if name.startswith('attr:')
+        )
+
+        # Get the options of each root attribute, where the options of
+        # filtered attribute are read from its own aggregation.
+        attributes = {}
+
+        for bucket in aggregations.facet_attr.options.buckets:
+            root_title, title = parse_attribute_facet(bucket.key)
+
+            if root_title not in filtered_roots:
+                attributes.setdefault(root_title, []).append(
+                    {'title': title, 'count': bucket.products.value}
+                )
+
+        for index, root in enumerate(filtered_roots):
+            for bucket in aggregations[
+                    f'facet_attr_{index}'].options.buckets:
+                root_title, title = parse_attribute_facet(bucket.key)
+
+                if root_title == root:
+                    attributes.setdefault(root_title, []).append(
+                        {'title': title, 'count': bucket.products.value}
+                    )
+
+        facets['attributes'] = [
+            {'title': root_title, 'options': options}
+            for root_title, options in sorted(attributes.items())
+        ]
+
+        # Get the titles of categories with one query.
+        category_buckets = aggregations.facet_category.options.buckets
+
+        titles = dict(
+            Category.objects.filter(
+                slug__in=[bucket.key for bucket in category_buckets]
+            ).values_list('slug', 'title')
+        )
+
+        facets['categories'] = [
+            {
+                'slug': bucket.key,
+                'title': titles.get(bucket.key, None),
+                'count': bucket.products.value
+            } for bucket in category_buckets
+        ]
+
+        facets['prices'] = [
+            {
+                'from': getattr(bucket, 'from', None),
+                'to': getattr(bucket, 'to', None),
+                'count': bucket.products.value
+            } for bucket in aggregations.facet_price.options.buckets
+        ]
+
+        return facets
+
+    def get_paginated_response(self, data):
+        """Override the paginated response to add the facets of search"""
+
+        response = super().get_paginated_response(data)
+
+        response.data['facets'] = self.get_facets(self.get_search_response())
+
+        # Let the client know that the results are not complete (e.g. the
+        # search engine is not available).
+        response.data['degraded'] = self.search_backend.degraded
+
+        return response
+
     def generate_q_expression(self, query):
         """Override the abstract method of inherit class"""
 
         # Normalize the query string by removing every special character with
-        # space.
+        # space, and get the list of its words in lower case.
         # Note: you can use r"\W+" regex for every special character.
-        normalized_query = re.sub(r"\W+", " ", query)
-
-        # Get normalized query string value and convert it into lower case and
-        # split it into list depending on space.
-        query_list = str(normalized_query).lower().split(" ")
+        query_list = self.get_query_tokens(query)
 
         # Return Q() expression for elasticsearch.
         # return Q(
@@ -229,22 +702,96 @@ class SearchAPIView(PaginatedElasticSearchListAPIView):
         )
 
 
+class SuggestAPIView(views.APIView):
+    """APIView to return the search suggestions (search-as-you-type) of given
+    prefix"""
+
+    # Note: the frontend requests this view on every keystroke, so it uses
+    #       the completion suggester of suggestions index (prefix lookup in
+    #       memory) instead of the full search query, and the suggestions of
+    #       hot prefixes are cached in redis for a short time.
+
+    def get_suggestions(self, prefix):
+        """Return list of suggestion texts of given prefix from the search
+        engine"""
+
+        search = SuggestionDocument.search().source(False).extra(size=0)
+
+        search = search.suggest(
+            'suggestions',
+            prefix,
+            completion={
+                'field': 'suggest',
+                'size': settings.SEARCH_SUGGEST_SIZE,
+                'skip_duplicates': True
+            }
+        )
+
+        response = execute_elasticsearch(search)
+
+        return [
+            option.text
+            for option in response.suggest.suggestions[0].options
+        ]
+
+    def get(self, request, prefix):
+        """HTTP GET method to return the suggestions of prefix"""
+
+        # Normalize the prefix (lower case and single spaces) and bound its
+        # length, so the cache keys are limited.
+        prefix = ' '.join(prefix.lower().split())[:50]
+
+        if not prefix:
+            return Response({'results': []})
+
+        key = f'suggest:{hashlib.md5(prefix.encode()).hexdigest()}'
+
+        try:
+            suggestions = cache.get(key)
+        except Exception as e:
+            logging.exception(e)
+            suggestions = None
+
+        if suggestions is None:
+            try:
+                suggestions = self.get_suggestions(prefix)
+            except Exception as e:
+                # Don't cache the empty suggestions of failed search.
+                logging.exception(e)
+                return Response({'results': []})
+
+            try:
+                cache.set(
+                    key,
+                    suggestions,
+                    settings.SEARCH_SUGGEST_CACHE_TIMEOUT
+                )
+            except Exception as e:
+                logging.exception(e)
+
+        return Response({'results': suggestions})
+
+
 #########################################################################
 
 
-class CategoryListAPIView(generics.ListAPIView):
+class CategoryListAPIView(CachedResponseMixin, generics.ListAPIView):
     """APIView to list all store's root nodes categories"""
 
     serializer_class = serializers.CategorySerializer
+    cache_models = (Category,)
+    # Note: the active children of root nodes are read from the category
+    #       tree snapshot by the serializer (see core/category_tree.py).
     queryset = Category.objects.root_nodes().filter(is_active=True).order_by(
         'display_order'
     )
 
 
-class CategoryRetrieveAPIView(generics.RetrieveAPIView):
+class CategoryRetrieveAPIView(CachedResponseMixin, generics.RetrieveAPIView):
     """APIView to retrieve specific category details"""
 
     serializer_class = serializers.CategoryDetailsSerializer
+    cache_models = (Category,)
     # The default lookup_field is 'pk' and should be pass as argument in URL.
     lookup_field = 'slug'
     queryset = Category.objects.filter(is_active=True).distinct()
@@ -262,73 +809,48 @@ class CategoryRetrieveAPIView(generics.RetrieveAPIView):
     #     )
 
 
-class AttributeListAPIView(generics.ListAPIView):
+class AttributeListAPIView(CachedResponseMixin, generics.ListAPIView):
     """APIView to list all store's attribute depending on category"""
 
-    serializer_class = serializers.AttributeSerializer
+    # Note: the root attributes of the attributes those connected to specific
+    #       category and its ancestors, and their options are precomputed as
+    #       facet records of each category (see core/facets.py), so the
+    #       response is read with single indexed query.
 
-    @property
-    def get_category(self):
-        """Return category instance if exists or raise 404"""
+    serializer_class = serializers.CategoryFacetSerializer
+    cache_models = (Category, CategoryFacet)
+
+    def get_queryset(self):
+        """Return the facet records of specific category"""
 
         # Get category slug from url parameter (argument).
         kwarg_category_slug = self.kwargs.get('category_slug', None)
 
-        # Get the wanted category model instance depending on its slug,
-        # otherwise return 404 response.
-        return get_object_or_404(
-            Category,
-            slug=kwarg_category_slug,
-            is_active=True
-        )
-
-    @property
-    def get_category_ancestors_pk(self):
-        """Return category instance ancestors"""
+        # Get the wanted category node depending on its slug from the
+        # snapshot of category tree, otherwise return 404 response.
+        node = get_category_tree().get_node_by_slug(kwarg_category_slug)
 
-        return self.get_category.get_ancestors(include_self=True).values('pk')
-
-    def get_queryset(self):
-        """Return root attributes that their leaf_nodes are connected to
-         specific category and its ancestors"""
-
-        # Get category ancestors pk list
-        ancestors = self.get_category_ancestors_pk
-
-        # Get the attribute instances these connected to specific category
-        # group.
-        # Note: We can't get attributes of level 0 (root) because we all family
-        #       tree of categories including leaf nodes.
-        attributes = Attribute.objects.filter(
-            category_attributes_attribute__category__in=ancestors
-        ).distinct().only('tree_id')
-
-        # Return all nodes that have level=0 (root node) and tree_id is in the
-        # retrieved attribute instances.
-        return Attribute.objects.filter(
-            level=0,
-            tree_id__in=[ele.tree_id for ele in attributes]
-        ).order_by('display_order')
-
-    def get_serializer_context(self):
-        """Override the serializer context"""
-
-        # Get current class instance serializer context
-        context = super(AttributeListAPIView, self).get_serializer_context()
+        if node is None or not node.is_active:
+            raise Http404
 
-        # Update the serializer context.
-        context.update(
-            {
-                'category_ancestors': self.get_category_ancestors_pk
-            }
+        return CategoryFacet.objects.filter(category_id=node.pk).order_by(
+            F('display_order').asc(nulls_last=True),
+            'attribute_id'
         )
 
-        return context
-
 
-class ProductListAPIView(generics.ListAPIView):
+class ProductListAPIView(SearchPaginationMixin, generics.ListAPIView):
     """APIView to list all store's products depending on category"""
 
+    # Note: the products list is served by one of two engines depending on
+    #       PRODUCT_LISTING_ENGINE setting:
+    #       1- 'sql': the queryset of category products filtered, sorted and
+    #          paginated by the database (see store/filters.py).
+    #       2- 'elasticsearch': the listing documents of products (see
+    #          ProductDocument) filtered, sorted, paginated and counted with
+    #          one query, in case elasticsearch is down the view falls back
+    #          to the 'sql' engine.
+
     serializer_class = ProductSerializer
     pagination_class = pagination.PageNumberPaginationWithCount
 
@@ -354,32 +876,65 @@ class ProductListAPIView(generics.ListAPIView):
     # Specify filter set class.
     filterset_class = filters.ProductFilter
 
-    def get_queryset(self):
-        """Return category's products for current request url"""
+    @cached_property
+    def use_search_engine(self):
+        """Return True if the products list is served by elasticsearch"""
+
+        return settings.PRODUCT_LISTING_ENGINE == 'elasticsearch'
+
+    @cached_property
+    def get_category(self):
+        """Return the category instance of current request url"""
 
         kwarg_category_slug = self.kwargs.get('category_slug', None)
 
         # Get the wanted category model instance depending on its slug,
         # otherwise return 404 response.
-        category = get_object_or_404(
+        return get_object_or_404(
             Category,
             slug=kwarg_category_slug,
             is_active=True
         )
 
-        # Limiting a subquery to a single column (id) and search using (in)
-        # lookup expression, the subquery returns the leaf nodes of
-        # categories (including the current one in case itself is a leaf
-        # node).
+    def get_queryset(self):
+        """Return category's products for current request url"""
+
+        if self.use_search_engine:
+            try:
+                search_response = self.get_search_response()
+            except Exception as e:
+                # Fall back to the database in case elasticsearch is down.
+                logging.exception(e)
+                self.use_search_engine = False
+            else:
+                if self.get_search_total(search_response) > 0:
+                    return SearchResults(self, search_response)
+
+                return []
+
+        return self.get_category_queryset().order_by(
+            '-created_at'
+        ).prefetch_related(
+            *get_product_listing_prefetch()
+        )
+
+    def get_category_queryset(self):
+        """Return queryset of the available products (those have items) of
+        current request category"""
+
+        # Search using (in) lookup expression with the ids of leaf nodes of
+        # category from the category tree snapshot (including the current
+        # one in case itself is a leaf node).
         return Product.objects.filter(
-            category__in=Subquery(
-                category.get_leafnodes(include_self=True).values('pk')
+            category__in=get_category_tree().get_leafnode_ids(
+                self.get_category.pk,
+                include_self=True
             ),
             is_available=True,
             product_items_product__isnull=False
-        ).distinct().order_by('-created_at')
+        ).distinct()
 
-    @property
+    @cached_property
     def get_attribute_leaf_nodes(self):
         """Return list of attribute leaf node instances depending on 'attr'
         query string that passed within url"""
@@ -409,20 +964,18 @@ class ProductListAPIView(generics.ListAPIView):
                 title__in=titles_set,
             )
 
-            # Initialize list to hold attribute leaf nodes 'pk'.
-            leaf_nodes = []
+            # Initialize set to hold attribute leaf nodes 'pk'.
+            pk_set = set()
 
-            # Loop over 'TreeQuerySet' of attributes.
-            for item in attributes:
-                # Note: get_leafnodes() method returns list of attributes
-                #       as Attribute instance not 'TreeQuerySet'.
-                leaf_nodes += item.get_leafnodes(include_self=True).values(
-                    'pk'
-                )
+            # Get the attribute index (see core/attribute_index.py), so the
+            # leaf nodes are read without query.
+            index = get_attribute_index()
 
-            # Convert leaf_nodes (list of dict for 'pk') into set value
-            # depending on 'pk' value.
-            pk_set = set([leaf['pk'] for leaf in leaf_nodes])
+            # Loop over the pk of attributes.
+            # Note: get_leafnodes() method of attribute returns the leaf nodes
+            #       with a query for every attribute.
+            for pk in attributes.values_list('pk', flat=True):
+                pk_set.update(index.get_leafnode_ids(pk, include_self=True))
 
             # Info: Maybe you will ask why we not return the leaf_nodes as it,
             #       this because leaf_nodes is list Attribute instances and in
@@ -436,109 +989,80 @@ class ProductListAPIView(generics.ListAPIView):
                 'pk', 'tree_id', 'title'
             )
 
-    @property
-    def get_attribute_titles_lists(self):
-        """Return list of lists for attribute titles that passed in 'attr'
-        query string where same attributes family fit in one list"""
-
-        attributes = self.get_attribute_leaf_nodes
-
-        if attributes:
+    @cached_property
+    def get_attribute_families(self):
+        """Return list of lists of 'pk' of attribute leaf nodes those passed
+        in 'attr' query string where same attributes family (tree) fit in one
+        list"""
 
-            # Initialize a list variable for store lists of titles.
-            titles = []
+        # Note: the leaf nodes are grouped by their tree_id without any
+        #       query, instead of a query for each family.
+        families = {}
 
-            # Initialize a list variable for items that we check.
-            looped_instances = []
+        for attribute in self.get_attribute_leaf_nodes or []:
+            families.setdefault(attribute.tree_id, []).append(attribute.pk)
 
-            # Loop over attributes.
-            for obj in attributes:
+        return list(families.values())
 
-                # Check if the current obj title already picked up and checked.
-                if not (obj.pk in looped_instances):
-
-                    # Get list of attribute instances (only title) that tree_id
-                    # is obj.tree_id and pk is (in) provided attributes.
-                    instances = Attribute.objects.filter(
-                        tree_id=obj.tree_id, pk__in=attributes
-                    ).only('title')
-
-                    # Check if instances is not empty list.
-                    if instances:
-                        # Loop over instances and extract title value and add
-                        # as list of titles (surround [] of for loop with
-                        # outside []).
-                        titles += [[ele.title for ele in instances]]
-
-                        # Add each obj pk of instances into looped_instances
-                        for item in instances:
-                            looped_instances.append(item.pk)
-
-            return titles
-
-    @property
+    @cached_property
     def get_selected_items_dict(self):
         """filter the passed attribute instances within 'attr' query string to
         be only related to product items"""
 
+        # Note: this property is used by both filter backend and serializer
+        #       context, so it's cached to be computed once per request.
+
         # Check if 'attr' query string is set.
         if self.get_attribute_leaf_nodes:
 
             # From attributes those set, check if any of them have
             # 'is_common_attribute=False' (means attributes for product item
             # instances).
-            product_item_attributes = self.get_attribute_leaf_nodes.filter(
-                product_attributes_attribute__is_common_attribute=False
-            ).distinct()
+            product_item_attributes = set(self.get_item_attribute_ids)
 
             # Check if there are product_item_attributes available.
             if product_item_attributes:
 
+                # Get the best item of each category product those have
+                # any of the passed attributes (the biggest count of matched
+                # attributes, and in case of equal count the item with lower
+                # 'pk') with one query, where the attribute signature of
+                # items (see ProductItem.attribute_ids) is matched by the
+                # overlap (&&) lookup using its GIN index instead of joining
+                # the attributes of items, and the first item of each
+                # product is kept by DISTINCT ON (product_id).
+                # Note: the items are read from database for both engines,
+                #       so the search engine filters and sorts the products
+                #       by the same selected items (see execute_search()).
+                product_items = ProductItem.objects.filter(
+                    product__in=self.get_category_queryset().values('pk'),
+                    attribute_ids__overlap=sorted(product_item_attributes)
+                ).with_matched_attributes_count(
+                    product_item_attributes
+                ).order_by(
+                    'product', '-matched_attributes_count', 'pk'
+                ).distinct('product')
+
                 # Create dictionary variable that store multiple keys in
                 # format:
                 #
                 # {'product_pk': 'item_instance'}
                 #
-                selected_items_dict = {}
-
-                # Get instances of view queryset.
-                product_instances = self.get_queryset()
-
-                # Loop over 'product_instances'.
-                for product in product_instances:
-
-                    # Initialize dictionary variable to store specific info.
-                    dict_var = {'item': None, 'length': 0}
-
-                    # Get product items of current product instance.
-                    product_items = product.product_items_product.all()
-
-                    # Loop over 'product_items'.
-                    for item in product_items:
+                selected_items_dict = {
+                    item.product_id: item for item in product_items
+                }
 
-                        # Get item attributes these are same as the ones these
-                        # passed within 'attr' query string.
-                        attributes = item.attributes.filter(
-                            pk__in=product_item_attributes
-                        )
+                # Return the dictionary.
+                return selected_items_dict
 
-                        # Check if current length of attribute instances is
-                        # bigger than current stored value in
-                        # dict_var['length'].
-                        if len(attributes) > dict_var['length']:
-                            # Update the dict_var with new data.
-                            dict_var = {
-                                'item': item,
-                                'length': len(attributes)
-                            }
+    def filter_queryset(self, queryset):
+        """Override the filter backends, since the search engine filters the
+        products by itself"""
 
-                    # Check if there is 'item' in dict_var.
-                    if dict_var['item']:
-                        # Set this item 'pk' to current product 'pk'.
-                        selected_items_dict[product.pk] = dict_var['item']
+        if self.use_search_engine:
+            return queryset
 
-                # Return the dictionary.
-                return selected_items_dict
+        return super().filter_queryset(queryset)
 
     def get_serializer_context(self):
         """Override the serializer context"""
@@ -557,13 +1081,200 @@ class ProductListAPIView(generics.ListAPIView):
 
         return context
 
+    @cached_property
+    def get_item_attribute_ids(self):
+        """Return list of 'pk' of the passed attributes those are attributes
+        of product items (not common attributes)"""
+
+        if not self.get_attribute_leaf_nodes:
+            return []
+
+        return sorted(
+            self.get_attribute_leaf_nodes.filter(
+                product_attributes_attribute__is_common_attribute=False
+            ).values_list('pk', flat=True).distinct()
+        )
+
+    def get_select_by(self):
+        """Return the valid choice of 'select_by' query string if exists"""
+
+        value = self.request.query_params.get('select_by', None)
+
+        if not value:
+            return None
+
+        choices = [
+            choice for choice, _ in filters.ProductFilter.base_filters[
+                'select_by'
+            ].extra['choices']
+        ]
+
+        # Note: as the ordering filter, the first choice is applied.
+        choice = value.split(',')[0].strip().lower()
+
+        if choice not in choices:
+            raise ValidationError({
+                'select_by': [
+                    f'Select a valid choice. {choice} is not one of the '
+                    f'available choices.'
+                ]
+            })
+
+        return choice
+
+    def execute_search(self, start, size):
+        """Return response of the listing documents of category products for
+        the given window of hits"""
+
+        params = self.request.query_params
+
+        min_price = params.get('min_price', None)
+        max_price = params.get('max_price', None)
+
+        filters.validate_price_range(min_price, max_price)
+
+        select_by = self.get_select_by()
+
+        search = ProductDocument.search().filter(
+            'term', category_ids=self.get_category.pk
+        ).filter(
+            'term', is_available=True
+        ).filter(
+            'term', has_items=True
+        )
+
+        # Filter the products those have one of the attributes of each
+        # family (OR between the attributes of family and AND between the
+        # families) as the 'attr' filter of products does.
+        for attribute_ids in self.get_attribute_families:
+            search = search.filter('terms', attribute_ids=attribute_ids)
+
+        # The listed item of product is its selected item (the best matched
+        # item by the attributes of items, see get_selected_items_dict) if
+        # exists, otherwise its default item, as the price annotation of
+        # 'sql' engine (see ProductQuerySet.with_item_effective_price()).
+        listed_item_query = None
+
+        if self.get_item_attribute_ids:
+            selected_items_dict = self.get_selected_items_dict or {}
+
+            listed_item_query = Q(
+                'bool',
+                should=[
+                    Q(
+                        'terms',
+                        items__id=[
+                            item.pk for item in selected_items_dict.values()
+                        ]
+                    ),
+                    Q(
+                        'bool',
+                        filter=[Q('term', items__is_default=True)],
+                        must_not=[
+                            Q(
+                                'terms',
+                                items__product_id=list(selected_items_dict)
+                            )
+                        ]
+                    )
+                ],
+                minimum_should_match=1
+            )
+
+        # The price and deal of product are the ones of its default item
+        # (see get_product_sources() in core/indexer.py), but in case of
+        # filtering by attributes of items, they are the ones of its listed
+        # item.
+        def filter_price(query, **kwargs):
+            if listed_item_query:
+                return search.filter(
+                    'nested',
+                    path='items',
+                    query=Q(
+                        'bool',
+                        filter=[
+                            listed_item_query,
+                            Q(query, **{
+                                f'items__{key}': value
+                                for key, value in kwargs.items()
+                            })
+                        ]
+                    )
+                )
+
+            return search.filter(query, **kwargs)
+
+        price_range = {}
+        if min_price:
+            price_range['gte'] = float(min_price)
+        if max_price:
+            price_range['lte'] = float(max_price)
+
+        if price_range:
+            search = filter_price('range', effective_price=price_range)
+
+        ordering = [{'created_at': {'order': 'desc'}}]
+
+        if select_by == 'deals':
+            search = filter_price('term', has_deal=True)
+
+        elif select_by in ('price-low-to-high', 'price-high-to-low'):
+            order = 'asc' if select_by == 'price-low-to-high' else 'desc'
+
+            if listed_item_query:
+                # Note: the filter matches one item of each product, so the
+                #       mode doesn't matter.
+                price_ordering = {
+                    'items.effective_price': {
+                        'order': order,
+                        'mode': 'min',
+                        'nested': {
+                            'path': 'items',
+                            'filter': listed_item_query.to_dict()
+                        }
+                    }
+                }
+            else:
+                price_ordering = {'effective_price': {'order': order}}
+
+            ordering.insert(0, price_ordering)
+
+        search = search.sort(*ordering).source(False).extra(
+            from_=start,
+            size=size,
+            track_total_hits=True
+        )
+
+        # Note: unlike the search view, the exceptions are raised so the
+        #       view can fall back to the database.
+        return execute_elasticsearch(search)
+
+    def get_search_total(self, search_response):
+        """Return the total count of matched products"""
+
+        return search_response.hits.total.value
+
+    def get_instances(self, search_response):
+        """Return list of Product instances of the given search response in
+        the order of its hits"""
+
+        positions = {
+            int(hit.meta.id): position
+            for position, hit in enumerate(search_response)
+        }
+
+        return sorted(
+            Product.objects.filter(pk__in=positions).prefetch_related(
+                *get_product_listing_prefetch()
+            ),
+            key=lambda product: positions[product.pk]
+        )
+
     def get_filterset_kwargs(self):
         """Override filter backend 'filterset_kwargs' with new data to pass
         to the backend class"""
 
-        titles = self.get_attribute_titles_lists
-
         return {
-            'titles': titles,
+            'families': self.get_attribute_families,
             'selected_items_dict': self.get_selected_items_dict
         }